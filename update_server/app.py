@@ -1,12 +1,271 @@
-from flask import Flask, send_from_directory
+"""Server phát hành bản cập nhật.
+
+Thư mục:
+    files/<gói>.zip                 gói đầy đủ (giữ URL cũ /download/<gói>)
+    releases/<phiên bản>/...        cây file của bản phát hành (cập nhật delta)
+    channels/<kênh>.json            {"tag_name", "name", "body", "published_at",
+                                     "package": "<gói>.zip", "release_dir": "<phiên bản>"}
+
+Endpoint:
+    /update.json?channel=stable, /<kênh>/update.json   thông tin bản mới (UI_CheckUpdate)
+    /<kênh>/manifest.json                               manifest từng file (update_manifest.py)
+    /download/<gói>, /releases/<phiên bản>/<file>       tải file, hỗ trợ Range/If-Range
+
+Mọi response có ETag/Last-Modified và trả 304 khi client đã có bản mới nhất.
+SHA-256 được tính sẵn lúc khởi động và lưu vào .hash_cache.json để lần chạy
+sau chỉ băm file mới/đổi.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import quote
+
+from flask import Flask, abort, request, send_file, url_for
+from werkzeug.security import safe_join
+
+BASE_DIR = os.path.dirname(os.path.abspath(__file__))
+FILES_DIR = os.path.join(BASE_DIR, "files")
+RELEASES_DIR = os.path.join(BASE_DIR, "releases")
+CHANNELS_DIR = os.path.join(BASE_DIR, "channels")
+HASH_CACHE = os.path.join(BASE_DIR, ".hash_cache.json")
+DEFAULT_CHANNEL = "stable"
+HASH_CHUNK = 1024 * 1024
+# Các file máy khách tự tạo (xem yt-dlp/update_manifest.py), không đưa vào manifest
+CLIENT_FILES = ("update_manifest.json", "update_delete.txt")
+# Client kiểm tra lại mỗi lần nhưng được dùng If-None-Match để nhận 304
+METADATA_MAX_AGE = 0
+# Manifest chỉ duyệt lại cây file khi thư mục bản phát hành đổi mtime hoặc
+# sau khoảng này (file bị ghi đè tại chỗ không đổi mtime thư mục)
+MANIFEST_RESCAN = 30
+# Gói đã phát hành không đổi nội dung (đổi nội dung = đổi tên/phiên bản)
+FILE_MAX_AGE = 3600
 
 app = Flask(__name__)
 
 
+class HashStore:
+    """SHA-256 của từng file, cache theo (kích thước, mtime). Thread-safe"""
+
+    def __init__(self, cache_path=HASH_CACHE):
+        self.cache_path = cache_path
+        self._lock = threading.Lock()
+        self._entries = {}
+        try:
+            with open(cache_path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+        except (OSError, ValueError):
+            pass
+
+    def info(self, path):
+        """{"size", "mtime", "sha256"} của file (băm lại nếu file đã đổi)"""
+        stat = os.stat(path)
+        key = os.path.abspath(path)
+        with self._lock:
+            entry = self._entries.get(key)
+        if entry and entry["size"] == stat.st_size and entry["mtime"] == stat.st_mtime:
+            return entry
+        digest = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+                digest.update(chunk)
+        entry = {"size": stat.st_size, "mtime": stat.st_mtime, "sha256": digest.hexdigest()}
+        with self._lock:
+            self._entries[key] = entry
+        return entry
+
+    def precompute(self, *roots):
+        """Băm trước mọi file trong các thư mục, trả về (số file, tổng byte)"""
+        count = total = 0
+        for root in roots:
+            for folder, _, names in os.walk(root):
+                for name in names:
+                    entry = self.info(os.path.join(folder, name))
+                    count += 1
+                    total += entry["size"]
+        self.save()
+        return count, total
+
+    def save(self):
+        with self._lock:
+            data = json.dumps(self._entries)
+        with open(self.cache_path, "w", encoding="utf-8") as f:
+            f.write(data)
+
+
+class ReleaseCatalog:
+    """Thông tin kênh + manifest (dựng lại khi cây file của bản phát hành đổi)"""
+
+    def __init__(self, hashes):
+        self.hashes = hashes
+        self._lock = threading.Lock()
+        # release_dir -> (mtime thư mục, lúc duyệt, chữ ký, mtime file mới nhất, manifest)
+        self._manifests = {}
+
+    def channel(self, name):
+        path = safe_join(CHANNELS_DIR, f"{name}.json")
+        if path is None or not os.path.isfile(path):
+            return None, 0
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f), os.path.getmtime(path)
+
+    def manifest(self, release_dir):
+        """(manifest, mtime file mới nhất); None nếu không có bản phát hành"""
+        root = safe_join(RELEASES_DIR, release_dir)
+        if root is None or not os.path.isdir(root):
+            return None
+        dir_mtime = os.path.getmtime(root)
+        now = time.monotonic()
+        with self._lock:
+            cached = self._manifests.get(release_dir)
+        if cached and cached[0] == dir_mtime and now - cached[1] < MANIFEST_RESCAN:
+            return cached[4], cached[3]
+        files = {}
+        newest = 0
+        for folder, _, names in os.walk(root):
+            for name in names:
+                path = os.path.join(folder, name)
+                rel = os.path.relpath(path, root).replace(os.sep, "/")
+                if rel in CLIENT_FILES:
+                    continue
+                entry = self.hashes.info(path)
+                files[rel] = {"size": entry["size"], "sha256": entry["sha256"]}
+                newest = max(newest, entry["mtime"])
+        signature = hashlib.sha256(json.dumps(files, sort_keys=True).encode()).hexdigest()
+        with self._lock:
+            if cached and cached[2] == signature:
+                manifest = cached[4]
+            else:
+                manifest = {"version": release_dir, "files": files}
+            self._manifests[release_dir] = (dir_mtime, now, signature, newest, manifest)
+            return manifest, newest
+
+
+hashes = HashStore()
+catalog = ReleaseCatalog(hashes)
+
+
+class ContentVersions:
+    """Last-Modified đi theo ETag: chỉ đổi khi nội dung (chữ ký) đổi.
+
+    Lần đầu thấy một response thì dùng mtime của các file nguồn; nội dung đổi
+    mà mtime không tăng (vd: file được chép giữ nguyên mtime) thì lấy giờ hiện tại.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._seen = {}   # khoá response -> (etag, last_modified)
+
+    def last_modified(self, key, etag, mtime):
+        with self._lock:
+            seen = self._seen.get(key)
+            if seen is not None and seen[0] == etag:
+                return seen[1]
+            modified = mtime
+            if seen is not None and modified <= seen[1]:
+                modified = max(time.time(), seen[1] + 1)
+            self._seen[key] = (etag, modified)
+            return modified
+
+
+versions = ContentVersions()
+
+
+def _json_response(key, data, mtime):
+    """JSON có ETag theo nội dung + Last-Modified cùng nguồn, trả 304 nếu client đã có"""
+    body = json.dumps(data, ensure_ascii=False, sort_keys=True).encode("utf-8")
+    response = app.response_class(body, mimetype="application/json")
+    etag = hashlib.sha256(body).hexdigest()[:32]
+    response.set_etag(etag)
+    # URL tuyệt đối trong body phụ thuộc Host nên khoá gồm cả host
+    response.last_modified = versions.last_modified((request.host, key), etag, mtime)
+    response.cache_control.public = True
+    response.cache_control.max_age = METADATA_MAX_AGE
+    return response.make_conditional(request)
+
+
+def _send(path, as_attachment=False):
+    """Gửi file với ETag = SHA-256, Last-Modified, 304 và Range/If-Range"""
+    if path is None or not os.path.isfile(path):
+        abort(404)
+    entry = hashes.info(path)
+    return send_file(path, as_attachment=as_attachment, conditional=True,
+                     etag=entry["sha256"], max_age=FILE_MAX_AGE)
+
+
+@app.route("/update.json")
+@app.route("/<channel>/update.json")
+def update_info(channel=None):
+    channel = channel or request.args.get("channel", DEFAULT_CHANNEL)
+    info, mtime = catalog.channel(channel)
+    if info is None:
+        abort(404)
+    data = {key: info.get(key, "") for key in ("tag_name", "name", "body", "published_at")}
+    package = info.get("package")
+    if package:
+        path = safe_join(FILES_DIR, package)
+        if path is None or not os.path.isfile(path):
+            abort(404)
+        entry = hashes.info(path)
+        mtime = max(mtime, entry["mtime"])
+        data.update({
+            "download_url": url_for("download_file", filename=package, _external=True),
+            "size": entry["size"],
+            "sha256": entry["sha256"],
+        })
+    if info.get("release_dir"):
+        data["manifest_url"] = url_for("release_manifest", channel=channel, _external=True)
+    return _json_response(("update", channel), data, mtime)
+
+
+@app.route("/<channel>/manifest.json")
+def release_manifest(channel):
+    info, mtime = catalog.channel(channel)
+    if info is None or not info.get("release_dir"):
+        abort(404)
+    result = catalog.manifest(info["release_dir"])
+    if result is None:
+        abort(404)
+    manifest, newest = result
+    base_url = request.host_url + f"releases/{quote(info['release_dir'])}/"
+    manifest = dict(manifest, base_url=base_url)
+    return _json_response(("manifest", channel), manifest, max(mtime, newest))
+
+
+@app.route("/releases/<release>/<path:rel>")
+def release_file(release, rel):
+    root = safe_join(RELEASES_DIR, release)
+    return _send(safe_join(root, rel) if root else None)
+
+
 @app.route('/download/<filename>')
 def download_file(filename):
-    return send_from_directory('files', filename, as_attachment=True)
+    return _send(safe_join(FILES_DIR, filename), as_attachment=True)
+
+
+def main():
+    import argparse
+
+    p = argparse.ArgumentParser()
+    p.add_argument("--host", default="0.0.0.0")
+    p.add_argument("--port", type=int, default=8000)
+    p.add_argument("--threads", type=int, default=32)
+    args = p.parse_args()
+
+    start = time.time()
+    count, total = hashes.precompute(FILES_DIR, RELEASES_DIR)
+    print(f"🔐 Đã băm {count} file ({total / (1024 * 1024):.1f} MB) "
+          f"trong {time.time() - start:.1f}s")
+    try:
+        from waitress import serve
+    except ImportError:
+        print("⚠️ Chưa cài waitress, dùng server dev của Flask (đa luồng)")
+        app.run(host=args.host, port=args.port, threaded=True)
+        return
+    print(f"🚀 Phục vụ tại http://{args.host}:{args.port} ({args.threads} luồng)")
+    serve(app, host=args.host, port=args.port, threads=args.threads)
 
 
 if __name__ == '__main__':
-    app.run(host='0.0.0.0', port=8000)
+    main()
@@ -0,0 +1,107 @@
+"""Đo tải server cập nhật: nhiều client đồng thời, in req/s, MB/s và độ trễ.
+
+    python load_test.py --url http://127.0.0.1:8000/update.json -c 50 -d 10
+    python load_test.py --url http://127.0.0.1:8000/update.json --conditional
+    python load_test.py --url http://127.0.0.1:8000/download/update_v1.7.0.zip -c 8 --range 1048576
+
+Chỉ dùng thư viện chuẩn; mỗi client giữ một kết nối keep-alive.
+"""
+import argparse
+import http.client
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+READ_CHUNK = 256 * 1024
+
+
+class Client(threading.Thread):
+    def __init__(self, url, deadline, headers, conditional):
+        super().__init__(daemon=True)
+        self.url = urlsplit(url)
+        self.deadline = deadline
+        self.headers = dict(headers)
+        self.conditional = conditional
+        self.latencies = []
+        self.statuses = Counter()
+        self.bytes = 0
+        self.errors = 0
+
+    def _connect(self):
+        cls = http.client.HTTPSConnection if self.url.scheme == "https" else http.client.HTTPConnection
+        return cls(self.url.hostname, self.url.port, timeout=30)
+
+    def run(self):
+        path = self.url.path + (f"?{self.url.query}" if self.url.query else "")
+        conn = self._connect()
+        while time.perf_counter() < self.deadline:
+            start = time.perf_counter()
+            try:
+                conn.request("GET", path, headers=self.headers)
+                response = conn.getresponse()
+                while True:
+                    chunk = response.read(READ_CHUNK)
+                    if not chunk:
+                        break
+                    self.bytes += len(chunk)
+                etag = response.getheader("ETag")
+                if self.conditional and etag:
+                    # Lần sau gửi If-None-Match như UI_CheckUpdate: server trả 304
+                    self.headers["If-None-Match"] = etag
+                self.statuses[response.status] += 1
+                self.latencies.append(time.perf_counter() - start)
+            except (OSError, http.client.HTTPException):
+                self.errors += 1
+                conn.close()
+                conn = self._connect()
+        conn.close()
+
+
+def percentile(values, fraction):
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * fraction))]
+
+
+def main():
+    p = argparse.ArgumentParser(description="Đo req/s và MB/s của update_server")
+    p.add_argument("--url", default="http://127.0.0.1:8000/update.json")
+    p.add_argument("-c", "--clients", type=int, default=50, help="số client đồng thời")
+    p.add_argument("-d", "--duration", type=float, default=10, help="thời gian đo (giây)")
+    p.add_argument("--conditional", action="store_true",
+                   help="gửi If-None-Match từ response trước (đo đường 304)")
+    p.add_argument("--range", type=int, default=0, metavar="BYTES",
+                   help="chỉ tải BYTES byte đầu (Range: bytes=0-BYTES-1)")
+    args = p.parse_args()
+
+    headers = {}
+    if args.range:
+        headers["Range"] = f"bytes=0-{args.range - 1}"
+    deadline = time.perf_counter() + args.duration
+    clients = [Client(args.url, deadline, headers, args.conditional)
+               for _ in range(args.clients)]
+    start = time.perf_counter()
+    for client in clients:
+        client.start()
+    for client in clients:
+        client.join()
+    elapsed = time.perf_counter() - start
+
+    latencies = [value for client in clients for value in client.latencies]
+    statuses = sum((client.statuses for client in clients), Counter())
+    total_bytes = sum(client.bytes for client in clients)
+    errors = sum(client.errors for client in clients)
+    print(f"🌐 {args.url} — {args.clients} client, {elapsed:.1f}s")
+    print(f"📊 {len(latencies)} request: {len(latencies) / elapsed:.1f} req/s, "
+          f"{total_bytes / (1024 * 1024) / elapsed:.1f} MB/s, lỗi kết nối: {errors}")
+    print(f"⏱️ Độ trễ p50 {percentile(latencies, 0.5) * 1000:.1f} ms, "
+          f"p95 {percentile(latencies, 0.95) * 1000:.1f} ms, "
+          f"p99 {percentile(latencies, 0.99) * 1000:.1f} ms")
+    print("📋 Mã trạng thái: " + ", ".join(f"{code}×{count}" for code, count in
+                                          sorted(statuses.items())))
+
+
+if __name__ == "__main__":
+    main()
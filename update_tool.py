@@ -5,6 +5,9 @@ import zipfile
 import shutil
 import subprocess
 
+# Gói delta (xem yt-dlp/update_manifest.py) kèm danh sách file bị bỏ ở bản mới
+DELETE_LIST = "update_delete.txt"
+
 
 class Updater:
     def __init__(self, app_path, zip_path, app_dir, restart=False, zip_password=None):
@@ -43,6 +46,7 @@ class Updater:
                 else:
                     zip_ref.extractall(self.app_dir)
             print("✅ Đã giải nén gói cập nhật.")
+            self.apply_delete_list()
             return True
         except RuntimeError:
             print("❌ Mật khẩu không đúng hoặc file zip bị lỗi.")
@@ -50,6 +54,20 @@ class Updater:
             print(f"⚠️ Lỗi khi giải nén: {e}")
         return False
 
+    def apply_delete_list(self):
+        list_path = os.path.join(self.app_dir, DELETE_LIST)
+        if not os.path.isfile(list_path):
+            return
+        with open(list_path, "r", encoding="utf-8") as f:
+            for rel in f.read().splitlines():
+                path = os.path.abspath(os.path.join(self.app_dir, rel.strip()))
+                # Chỉ xoá file nằm trong thư mục app
+                if (rel.strip() and os.path.commonpath([path, self.app_dir]) == self.app_dir
+                        and os.path.isfile(path)):
+                    os.remove(path)
+                    print(f"🗑️ Đã xóa file cũ: {rel.strip()}")
+        os.remove(list_path)
+
     def remove_zip(self):
         if os.path.exists(self.zip_path):
             os.remove(self.zip_path)
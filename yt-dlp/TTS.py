@@ -2,7 +2,7 @@ from PySide6.QtWidgets import (
     QApplication, QWidget, QVBoxLayout, QHBoxLayout, QLabel, QPushButton,
     QComboBox, QTextEdit, QSlider, QLineEdit, QFileDialog, QFrame, QRadioButton, QListWidget, QCheckBox, QMessageBox, QSpacerItem, QSizePolicy, QProgressBar, QMenu, QMenuBar
 )
-from PySide6.QtCore import Qt
+from PySide6.QtCore import Qt, QTimer
 import sys
 
 from PySide6.QtGui import QScreen, QAction, QIcon
@@ -30,9 +30,15 @@ class Main(QWidget):
         self.init_ui()
         self.update_checker = None
         self.is_manual_check = False
+        # Kiểm tra cập nhật chạy sau khi cửa sổ vẽ xong lần đầu (xem paintEvent)
+        self._update_check_started = False
 
-        # Thay đổi thành silent=True
-        self._start_update_check()
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not self._update_check_started:
+            # Khung hình đầu tiên không phải chờ mạng
+            self._update_check_started = True
+            QTimer.singleShot(0, self._start_update_check)
 
     def init_ui(self):
 
@@ -355,11 +361,10 @@ class Main(QWidget):
 
     def _start_update_check(self):
 
-        self.update_checker = UI_CheckUpdate()
+        self.update_checker = UI_CheckUpdate(force=self.is_manual_check)
         self.update_checker.update_available.connect(
             self._on_update_available)
-        self.update_checker.error_occurred.connect(
-            lambda error: QMessageBox.critical(self, "Lỗi", f"Có lỗi xảy ra khi kiểm tra cập nhật:\n{error}"))
+        self.update_checker.error_occurred.connect(self._on_update_error)
         self.update_checker.no_update.connect(
             lambda: self._on_no_update(silent=False))
         self.update_checker.start()
@@ -396,6 +401,14 @@ class Main(QWidget):
         # Hiển thị box phiên bản khi có update
         self.version_box.setVisible(True)
 
+    def _on_update_error(self, error):
+        if self.is_manual_check:
+            QMessageBox.critical(self, "Lỗi", f"Có lỗi xảy ra khi kiểm tra cập nhật:\n{error}")
+            self.is_manual_check = False
+        else:
+            # Tự kiểm tra lúc mở app: mất mạng không làm phiền người dùng
+            self.output_list.addItem(f"⚠️ Không kiểm tra được cập nhật: {error}")
+
     def _on_no_update(self, silent):
         """Xử lý khi không có update"""
 
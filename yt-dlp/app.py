@@ -1,13 +1,29 @@
 from PySide6.QtWidgets import (
     QApplication, QWidget, QLabel, QLineEdit, QPushButton, QTextEdit,
-    QVBoxLayout, QHBoxLayout, QComboBox, QTabWidget, QFormLayout, QListWidget, QGroupBox, QCheckBox, QFileDialog, QProgressBar, QMessageBox, QListWidgetItem, QMenuBar
+    QVBoxLayout, QHBoxLayout, QComboBox, QTabWidget, QFormLayout, QListView, QGroupBox, QCheckBox, QFileDialog, QProgressBar, QMessageBox, QMenuBar,
+    QListWidget, QTableWidget, QTableWidgetItem, QHeaderView, QAbstractItemView
 )
-from PySide6.QtCore import Signal, QTime, QTimer
-from PySide6.QtGui import QColor, QIcon, QAction
+from PySide6.QtCore import Signal, QTimer
+from PySide6.QtGui import QIcon, QAction
 from ui_setting import APP_VERSION, show_about_ui, _init_addStyle, resource_path
 from ui_checkupdate import UI_CheckUpdate
 from ui_updatedialog import UI_UpdateDialog
-from downloadWorker import DownloadVideo
+from job_scheduler import JobScheduler, Job
+from download_progress import ProgressAggregator, format_bytes, format_eta
+from log_sink import LogListModel, LogSink
+from playlist_expander import PlaylistExpander
+from download_archive import DownloadArchive, canonical_url_key, dedupe_urls
+from download_queue_store import DownloadQueueStore, BATCH_DONE, BATCH_STOPPED, JOB_POSTPROCESS
+from bandwidth_governor import BandwidthGovernor
+from download_acceleration import ACCEL_MODES, ACCEL_OFF, acceleration_args, pick_fragment_count
+from retry_policy import ERROR_LABELS, ERROR_UNKNOWN, RetryPolicy
+from info_cache import InfoCache
+from postprocess import AUDIO_FORMATS, AUDIO_MP3, AUDIO_ORIGINAL_MP3, TASK_MP3, PostProcessTask
+from media_library import MEDIA_EXTS, LibraryScanner, MediaLibrary
+from subtitle_harvest import SubtitleHarvest, chunk_entries, finish_harvest_job
+from ytdlp_engine import (
+    ENGINES, ENGINE_POOL, ENGINE_SUBPROCESS, downloader_class, inprocess_installed)
+from ytdlp_pool import WORKER_FLAG, YtdlpProcessPool
 import os
 import subprocess
 from datetime import datetime
@@ -18,19 +34,54 @@ import license_utils as lu
 class Tab_1(QWidget):
     progress_update = Signal(int, str)
 
-    def __init__(self, append_log,  log_widget, output_list, progress, tab_name="Tab 1"):
+    def __init__(self, append_log,  log_widget, output_list, progress, tab_name="Tab 1", log_sink=None):
         super().__init__()
         self.append_log = append_log
+        self.log_sink = log_sink
         self.worker = None
-        # Thread
-        self.index = 1
-        self.active_threads = []
+        # Thread: pool slot cố định + hàng đợi job
         self.max_workers = 4
-        self.running = 0
         self.stopped = False
+        # Ngân sách băng thông chung + giới hạn kết nối mỗi host
+        self.governor = BandwidthGovernor()
+        self.retry_policy = RetryPolicy()
+        # Info JSON đã phân tích: tải lại không cần chạy extractor, xem trước URL
+        self.info_cache = InfoCache.shared()
+        # Danh mục file đã tải: tìm kiếm, phát hiện trùng
+        self.library = MediaLibrary.shared()
+        self.scheduler = JobScheduler(
+            self._run_job, self.max_workers, self, admission=self.governor)
+        self.scheduler.job_started.connect(self.handle_thread_started)
+        self.scheduler.job_finished.connect(self.handle_thread_done)
+        self.scheduler.job_retrying.connect(self.handle_job_retrying)
+        self.scheduler.all_finished.connect(self.handle_all_done)
+        # Pool CPU riêng cho ffmpeg (merge, phụ đề, MP3): slot tải rảnh ngay khi tải xong
+        self.cpu_scheduler = JobScheduler(
+            self._run_postprocess_job, os.cpu_count() or 2, self)
+        self.cpu_scheduler.job_finished.connect(self.handle_postprocess_done)
+        self.cpu_scheduler.all_finished.connect(self.handle_all_done)
+        self.cpu_done = 0
+        self.cpu_failed = 0
+        # video_index -> [số bước ffmpeg còn chạy, số bước lỗi] (chỉ dùng ở thread UI)
+        self.postprocess_left = {}
+        self.harvest_done = 0
+        self.harvest_failed = 0
+        # Tiến trình tổng hợp của mọi worker, vẽ lại theo timer
+        self.aggregator = ProgressAggregator()
+        self.progress_timer = QTimer(self)
+        self.progress_timer.setInterval(250)
+        self.progress_timer.timeout.connect(self.refresh_overall_progress)
 
         self.download_folder = ""
         self.urls = []
+        self.total_jobs = 0
+        self.next_index = 1
+        self.expander = None
+        # Nhật ký hàng đợi trên đĩa để tải tiếp sau khi app tắt/crash
+        self.queue_store = DownloadQueueStore()
+        self.batch_id = None
+        self.closing = False
+        self._store_rows = []
         self.output_list = output_list
         self.log_widget = log_widget
         self.progress = progress
@@ -53,6 +104,16 @@ class Tab_1(QWidget):
             "https://www.youtube.com/watch?v=uqSF-h404jc\nhttps://www.youtube.com/watch?v=uqSF-h404jc\nhttps://www.youtube.com/watch?v=uqSF-h404jc")
         url_layout.addWidget(url_label)
         url_layout.addWidget(self.url_input)
+        # Xem trước tiêu đề/thời lượng/dung lượng từ cache, không gọi mạng
+        self.url_preview = QListWidget()
+        self.url_preview.setMaximumHeight(110)
+        url_layout.addWidget(self.url_preview)
+        self.preview_timer = QTimer(self)
+        self.preview_timer.setSingleShot(True)
+        self.preview_timer.setInterval(300)
+        self.preview_timer.timeout.connect(self.refresh_url_preview)
+        self.url_input.textChanged.connect(self.preview_timer.start)
+        self.preview_timer.start()
         layout.addLayout(url_layout)
 
         # Nhập tên thư mục
@@ -122,18 +183,61 @@ class Tab_1(QWidget):
         self.thread_combo = QComboBox()
         self.thread_combo.addItems([str(i) for i in range(1, 11)])  # 1 -> 10
         self.thread_combo.setCurrentText("2")
+        self.thread_combo.currentTextChanged.connect(self.on_thread_count_changed)
         row1_layout = QHBoxLayout()
-        self.audio_only = QCheckBox("🎵 Tải âm thanh MP3")
+        self.audio_only = QCheckBox("🎵 Chỉ tải âm thanh")
+        self.audio_format_combo = QComboBox()
+        for name, audio_format in AUDIO_FORMATS:
+            self.audio_format_combo.addItem(name, userData=audio_format)
+        self.audio_format_combo.setEnabled(False)
+        self.audio_only.toggled.connect(self.audio_format_combo.setEnabled)
         self.include_thumb = QCheckBox("🖼️ Tải ảnh thumbnail")
         self.subtitle_only = QCheckBox("📜 Chỉ tải phụ đề")
+        self.skip_archived = QCheckBox("⏭️ Bỏ qua video đã tải")
+        self.skip_archived.setChecked(True)
+        self.defer_postprocess = QCheckBox("⚙️ Xử lý ffmpeg ở pool CPU riêng")
+        self.defer_postprocess.setChecked(False)
         row1_layout.addStretch()
         row1_layout.addWidget(self.audio_only)
+        row1_layout.addWidget(self.audio_format_combo)
         row1_layout.addWidget(self.include_thumb)
         row1_layout.addWidget(self.subtitle_only)
+        row1_layout.addWidget(self.skip_archived)
+        row1_layout.addWidget(self.defer_postprocess)
         # row1_layout.addStretch()
+
         # layout_Thread = QHBoxLayout()
         # layout_Thread.addWidget(self.thread_combo)
         layout_chedo.addRow(self.thread_combo, row1_layout)
+
+        # Băng thông tổng (MB/s) và số kết nối tối đa mỗi host
+        self.rate_combo = QComboBox()
+        for name, rate in [("⚡ Không giới hạn", 0), ("1 MB/s", 1), ("2 MB/s", 2),
+                           ("5 MB/s", 5), ("10 MB/s", 10), ("20 MB/s", 20),
+                           ("50 MB/s", 50), ("100 MB/s", 100)]:
+            self.rate_combo.addItem(name, userData=rate * 1024 * 1024)
+        self.rate_combo.currentIndexChanged.connect(self.on_bandwidth_changed)
+        self.host_limit_combo = QComboBox()
+        self.host_limit_combo.addItem("Không giới hạn", userData=0)
+        for i in range(1, 9):
+            self.host_limit_combo.addItem(str(i), userData=i)
+        self.host_limit_combo.currentIndexChanged.connect(self.on_bandwidth_changed)
+        self.accel_combo = QComboBox()
+        for name, mode in ACCEL_MODES:
+            self.accel_combo.addItem(name, userData=mode)
+        # Engine: yt-dlp.exe hoặc thư viện yt_dlp (chỉ hiện khi đã cài)
+        self.engine_combo = QComboBox()
+        for name, engine in ENGINES:
+            if engine == ENGINE_SUBPROCESS or inprocess_installed():
+                self.engine_combo.addItem(name, userData=engine)
+        self.engine_combo.setVisible(self.engine_combo.count() > 1)
+        bandwidth_layout = QHBoxLayout()
+        bandwidth_layout.addStretch()
+        bandwidth_layout.addWidget(self.engine_combo)
+        bandwidth_layout.addWidget(self.accel_combo)
+        bandwidth_layout.addWidget(QLabel("Kết nối/host"))
+        bandwidth_layout.addWidget(self.host_limit_combo)
+        layout_chedo.addRow(self.rate_combo, bandwidth_layout)
         # layout.addWidget(layout_Thread)
         layout.addWidget(self.group_box_setting_video)
         layout.addStretch()
@@ -161,6 +265,23 @@ class Tab_1(QWidget):
         if folder:
             self.folder_name_input.setText(folder)
 
+    def refresh_url_preview(self):
+        """Hiện tiêu đề, thời lượng, dung lượng của các URL đã có trong cache"""
+        self.url_preview.clear()
+        urls = [u.strip() for u in self.url_input.toPlainText().splitlines() if u.strip()]
+        for url in urls[:200]:
+            info = self.info_cache.summary(url)
+            owned = " · 📚 đã có" if self.library.has_url(url) else ""
+            if not info or not info.get("title"):
+                self.url_preview.addItem(f"🔗 {url}{owned}")
+                continue
+            text = f"🎬 {info['title']} · {format_eta(info.get('duration'))}"
+            if info.get("filesize_approx"):
+                text += f" · ~{format_bytes(info['filesize_approx'])}"
+            text += owned
+            self.url_preview.addItem(text)
+        self.url_preview.setVisible(bool(urls))
+
     def _get_selected_language_code(self):
         selected_code = self.language_box.currentData()
         return selected_code
@@ -176,16 +297,18 @@ class Tab_1(QWidget):
         urls = self.url_input.toPlainText().splitlines()
         urls = [u.strip() for u in urls if u.strip()]
 
+        # Gộp các URL trỏ tới cùng một video
+        urls, duplicate_count = dedupe_urls(urls)
+        if duplicate_count:
+            self.append_log(f"♻️ Bỏ {duplicate_count} URL trùng lặp")
+
         self.urls = urls
         # self._prepare_ui_for_download()
-        # Lấy mã ngôn ngữ tương ứng khi người dùng chọn
-        selected_lang_code = self._get_selected_language_code()
-        # self.add_message(f"Mã ngôn ngữ tài liệu: {selected_lang_code}")
 
         # Hiển thị các tùy chọn khác
         options = []
         if self.audio_only.isChecked():
-            options.append("🎵 Audio MP3")
+            options.append(f"🎵 {self.audio_format_combo.currentText()}")
         if self.include_thumb.isChecked():
             options.append("🖼️ Thumbnail")
         if self.subtitle_only.isChecked():
@@ -213,6 +336,55 @@ class Tab_1(QWidget):
 
         self.append_log(f"📦 Tổng số link: {len(self.urls)}")
 
+        self.custom_folder_name = custom_folder
+        self._apply_options(self._collect_options())
+        self.download_folder = self._create_download_folder()
+        self.batch_id = self.queue_store.create_batch(
+            self.download_folder, self.urls, self.batch_options)
+        self._begin_batch()
+        self.download_next_batch()
+
+    def _collect_options(self):
+        """Tuỳ chọn tải hiện tại trên giao diện (lưu kèm lô tải)"""
+        subtitle_only = self.subtitle_only.isChecked()
+        return {
+            "video_mode": self.type_video.currentText(),
+            "audio_only": self.audio_only.isChecked(),
+            "audio_format": self.audio_format_combo.currentData(),
+            "sub_mode": self.sub_mode.currentData(),
+            "sub_lang": self._get_selected_language_code(),
+            "sub_lang_name": self.language_box.currentText(),
+            "include_thumb": self.include_thumb.isChecked(),
+            "subtitle_only": subtitle_only,
+            "use_archive": self.skip_archived.isChecked() and not subtitle_only,
+            "max_workers": int(self.thread_combo.currentText()),
+            "acceleration": self.accel_combo.currentData(),
+            "defer_postprocess": self.defer_postprocess.isChecked(),
+            "engine": self.engine_combo.currentData(),
+        }
+
+    def _apply_options(self, options):
+        self.batch_options = options
+        self.video_mode = options["video_mode"]
+        self.audio_only_flag = options["audio_only"]
+        self.audio_format_flag = options.get("audio_format", AUDIO_MP3)
+        self.sub_mode_flag = options["sub_mode"]
+        self.sub_lang_code_flag = options["sub_lang"]
+        self.sub_lang_name_flag = options["sub_lang_name"]
+        self.include_thumb_flag = options["include_thumb"]
+        self.subtitle_only_flag = options["subtitle_only"]
+        self.use_archive_flag = options["use_archive"]
+        self.max_workers = options["max_workers"]
+        self.acceleration_flag = options.get("acceleration", ACCEL_OFF)
+        self.defer_postprocess_flag = options.get("defer_postprocess", False)
+        self.engine_flag = options.get("engine", ENGINE_SUBPROCESS)
+
+    def _harvest_mode(self):
+        """Chỉ phụ đề: nhiều URL dùng chung một tiến trình yt-dlp (--batch-file)"""
+        return self.subtitle_only_flag and self.sub_mode_flag in ("1", "2")
+
+    def _begin_batch(self):
+        """Chuẩn bị UI và scheduler cho một lô tải mới/tải tiếp"""
         self.stopped = False
         self.download_button.setEnabled(False)
         self.stop_button.setEnabled(True)
@@ -220,65 +392,508 @@ class Tab_1(QWidget):
         self.progress.setValue(0)
 
         self.append_log("🚀 Bắt đầu tải video...")
-        self.index = 1
-        self.active_threads.clear()
-        self.running = 0
-        self.custom_folder_name = custom_folder
-        self.video_mode = self.type_video.currentText()
-
-        self.audio_only_flag = self.audio_only.isChecked()
-        self.sub_mode_flag = selected_sub_mode
-        self.sub_lang_code_flag = selected_lang_code
-        self.sub_lang_name_flag = self.language_box.currentText()
-        self.include_thumb_flag = self.include_thumb.isChecked()
-        self.subtitle_only_flag = self.subtitle_only.isChecked()
-        self.download_folder = self._create_download_folder()
-        self.download_next_batch()
+        self.scheduler.clear_finished()
+        self.scheduler.set_max_workers(self.max_workers)
+        self.scheduler.reset_stats()
+        self.cpu_scheduler.clear_finished()
+        self.cpu_scheduler.reset_stats()
+        self.cpu_done = 0
+        self.cpu_failed = 0
+        self.postprocess_left = {}
+        self.harvest_done = 0
+        self.harvest_failed = 0
+        self.governor.set_expected_active(self.max_workers)
+        if self.engine_flag == ENGINE_POOL:
+            # Khởi động worker yt-dlp trong lúc chuẩn bị hàng đợi
+            YtdlpProcessPool.shared().warm(self.max_workers)
+        self.aggregator.reset()
+        self.progress_timer.start()
+        self.total_jobs = 0
+        self.next_index = 1
+        self.seen_keys = set()
+        self.archived_count = 0
+
+    def offer_resume(self):
+        """Khi mở app: hỏi tải tiếp lô tải bị dở dang lần trước"""
+        batch = self.queue_store.find_unfinished_batch()
+        if batch is None:
+            return
+        counts = batch["counts"]
+        pending = (counts.get("queued", 0) + counts.get("running", 0)
+                   + counts.get(JOB_POSTPROCESS, 0))
+        need_expand = (batch["options"]["video_mode"] == "Playlist"
+                       and not batch["expanded"])
+        if not pending and not need_expand:
+            self.queue_store.finish_batch(batch["id"])
+            return
+        reply = QMessageBox.question(
+            self, "Tải tiếp",
+            f"Lần trước còn {pending} video chưa tải xong"
+            f" ({counts.get('done', 0)} đã xong).\n"
+            f"📂 {batch['folder']}\n\nBạn có muốn tải tiếp không?")
+        if reply != QMessageBox.Yes:
+            self.queue_store.discard_unfinished()
+            return
+        self.resume_batch(batch)
+
+    def resume_batch(self, batch):
+        """Tải tiếp lô dở dang vào đúng thư mục cũ, giữ file .part để tải nối"""
+        self.urls = batch["urls"]
+        self._apply_options(batch["options"])
+        self.download_folder = batch["folder"]
+        os.makedirs(self.download_folder, exist_ok=True)
+        self.batch_id = batch["id"]
+        self._begin_batch()
+
+        self.seen_keys = {canonical_url_key(url)
+                          for url in self.queue_store.job_urls(self.batch_id)}
+        self.next_index = self.queue_store.max_index(self.batch_id) + 1
+        self.total_jobs = self.next_index - 1
+        pending = self.queue_store.pending_jobs(self.batch_id)
+        if self._harvest_mode():
+            self._queue_harvest([(index, url) for index, url, _ in pending])
+        else:
+            for index, url, options in pending:
+                if "postprocess" in options:
+                    self._resume_postprocess(index, url, options)
+                    continue
+                job = self.scheduler.submit(url, video_index=index, **options)
+                self.aggregator.add_job(job.job_id)
+        self.append_log(
+            f"♻️ Tải tiếp lô dở dang: {self.scheduler.pending_count()} video"
+            f" → {self.download_folder}")
 
-    def download_next_batch(self):
+        if self.video_mode == "Playlist" and not batch["expanded"]:
+            self._start_expander()
+        elif self.scheduler.pending_count() == 0:
+            self.handle_all_done()
 
-        while self.running < self.max_workers and self.index <= len(self.urls) and not self.stopped:
-            url = self.urls[self.index - 1]
-            worker_id = self.running + 1
-            thread = DownloadVideo(
-                url=url,
-                video_index=self.index,
-                total_urls=len(self.urls),
-                worker_id=worker_id,
-                video_mode=self.video_mode,
-                audio_only=self.audio_only_flag,
-                sub_mode=self.sub_mode_flag,
-                sub_lang=self.sub_lang_code_flag,
-                sub_lang_name=self.sub_lang_name_flag,
-                include_thumb=self.include_thumb_flag,
-                subtitle_only=self.subtitle_only_flag,
-                custom_folder_name=self.download_folder
-            )
-            thread.message_signal.connect(self.append_log)
-            thread.finished_signal.connect(self.handle_thread_done)
-            thread.progress_signal.connect(self.update_progress)
-            thread.error_signal.connect(self.error_thread)
-            self.active_threads.append(thread)
-            thread.start()
-            self.running += 1
-            self.index += 1
-
-    def handle_thread_done(self):
-        self.running -= 1
-        if not self.stopped and self.index <= len(self.urls):
-            self.download_next_batch()
-        elif self.running == 0:
-            if self.stopped:
-                self.append_log("⏹ Đã dừng toàn bộ tiến trình.")
-            else:
-                self.progress.setValue(100)
-                self.append_log("✅ Tải xong tất cả video.")
+    def download_next_batch(self):
+        """Đưa toàn bộ URL vào hàng đợi, scheduler tự phân phối cho các slot"""
+        if self.video_mode == "Playlist":
+            self._start_expander()
+            return
+        if self._harvest_mode():
+            self._submit_harvest(self.urls)
+            self._flush_store()
+            return
+        archive = DownloadArchive.shared() if self.use_archive_flag else None
+        for url in self.urls:
+            if archive is not None and archive.contains(url):
+                self.archived_count += 1
+                continue
+            self._submit_url(url)
+        self._flush_store()
+        self._log_archived()
+        if self.total_jobs == 0:
+            # Mọi URL đều đã tải trước đó
+            self.handle_all_done()
+
+    def _start_expander(self):
+        """Tách playlist thành từng video để tải song song trên mọi slot"""
+        self.expander = PlaylistExpander(self.urls)
+        self.expander.entries_found.connect(self.on_playlist_entries)
+        self.expander.expand_failed.connect(self.on_playlist_failed)
+        self.expander.message_signal.connect(self.append_log)
+        self.expander.finished_signal.connect(self.on_expand_finished)
+        self.expander.start()
+
+    def _flush_store(self):
+        """Ghi các job vừa thêm vào nhật ký hàng đợi trong một transaction"""
+        if self.batch_id is not None and self._store_rows:
+            self.queue_store.add_jobs(self.batch_id, self._store_rows)
+        self._store_rows = []
+
+    def _log_archived(self):
+        if self.archived_count:
+            self.append_log(
+                f"⏭️ Bỏ qua {self.archived_count} video đã tải trước đó (archive)")
+            self.archived_count = 0
+
+    def _submit_url(self, url, **options):
+        self.total_jobs += 1
+        job = self.scheduler.submit(url, video_index=self.next_index, **options)
+        self._store_rows.append((self.next_index, url, options))
+        self.next_index += 1
+        self.aggregator.add_job(job.job_id)
+        return job
+
+    def _submit_harvest(self, urls):
+        """Đăng ký từng URL (nhật ký hàng đợi) nhưng chạy theo lô phụ đề"""
+        entries = []
+        for url in urls:
+            self.total_jobs += 1
+            entries.append((self.next_index, url))
+            self._store_rows.append((self.next_index, url, {}))
+            self.next_index += 1
+        self._queue_harvest(entries)
+
+    def _queue_harvest(self, entries):
+        for chunk in chunk_entries(entries):
+            job = self.scheduler.submit(chunk[0][1], video_index=chunk[0][0], entries=chunk)
+            self.aggregator.add_job(job.job_id, len(chunk))
+
+    def on_playlist_entries(self, source_url, entries):
+        if self.stopped:
+            return
+        archive = DownloadArchive.shared() if self.use_archive_flag else None
+        new_urls = []
+        for entry in entries:
+            key = canonical_url_key(entry["entry_url"])
+            if key in self.seen_keys:
+                continue
+            self.seen_keys.add(key)
+            if archive is not None and archive.contains_entry(
+                    entry.get("ie_key"), entry.get("id")):
+                self.archived_count += 1
+                continue
+            new_urls.append(entry["entry_url"])
+        if self._harvest_mode():
+            self._submit_harvest(new_urls)
+        else:
+            for url in new_urls:
+                self._submit_url(url)
+        self.info_cache.remember_many(
+            [(entry["entry_url"], entry) for entry in entries])
+        self._flush_store()
+        self._log_archived()
+
+    def on_playlist_failed(self, source_url, error):
+        """Không liệt kê được: tải nguyên URL trong một job như trước"""
+        if self.stopped:
+            return
+        self.append_log(
+            f"⚠️ Không tách được playlist ({error}), tải trực tiếp: {source_url}", "warning")
+        self._submit_url(source_url, no_playlist=False)
+        self._flush_store()
+
+    def on_expand_finished(self):
+        self.expander = None
+        if not self.stopped and self.batch_id is not None:
+            self.queue_store.set_expanded(self.batch_id)
+        if self.scheduler.pending_count() == 0:
+            self.handle_all_done()
+
+    def _run_job(self, job, slot_id):
+        """Chạy trong thread của slot: tải một URL"""
+        if "entries" in job.options:
+            return self._run_harvest_job(job, slot_id)
+        worker = downloader_class(self.engine_flag)(
+            url=job.url,
+            video_index=job.video_index,
+            total_urls=self.total_jobs,
+            worker_id=slot_id,
+            video_mode=self.video_mode,
+            audio_only=self.audio_only_flag,
+            sub_mode=self.sub_mode_flag,
+            sub_lang=self.sub_lang_code_flag,
+            sub_lang_name=self.sub_lang_name_flag,
+            include_thumb=self.include_thumb_flag,
+            subtitle_only=self.subtitle_only_flag,
+            custom_folder_name=self.download_folder,
+            no_playlist=job.options.get("no_playlist", True),
+            use_archive=self.use_archive_flag,
+            audio_format=self.audio_format_flag
+        )
+        worker.message_signal.connect(self.append_log)
+        worker.error_signal.connect(self.error_thread)
+        worker.log_sink = self.log_sink
+        worker.rate_limit = self.governor.assigned_rate(job.job_id)
+        if self.acceleration_flag != ACCEL_OFF:
+            # Số phân đoạn theo số job đang chạy và số slot còn trống
+            running = self.scheduler.running_count()
+            fragments = pick_fragment_count(
+                running, self.scheduler.max_workers() - running,
+                self.scheduler.queued_count())
+            worker.acceleration_args = acceleration_args(
+                self.acceleration_flag, fragments)
+        worker.progress_sink = self.aggregator
+        worker.info_cache = self.info_cache
+        worker.defer_postprocess = (self.defer_postprocess_flag
+                                    and job.options.get("no_playlist", True))
+        worker.job_id = job.job_id
+        job.worker = worker
+        if job.stop_flag:
+            worker.stop(job.cleanup_on_stop)
+        if worker.run():
+            tasks = self._postprocess_tasks(worker)
+            if tasks:
+                # Ghi nhật ký trước khi giao pool CPU: dừng/đóng app giữa chừng
+                # thì lần tải tiếp vẫn chạy nốt các bước ffmpeg
+                job.options["postprocess"] = tasks
+                job.options["info"] = worker.info
+                if self.batch_id is not None:
+                    self.queue_store.set_job_postprocess(
+                        self.batch_id, job.video_index, tasks, worker.info)
+            # File còn chờ ffmpeg sẽ được ghi vào thư viện khi pool CPU xong
+            pending = {path for _, sources in tasks for path in sources}
+            self._index_files([p for p in worker.final_files if p not in pending],
+                              job.url, worker.info)
+            return Job.DONE
+        if job.stop_flag:
+            return Job.STOPPED
+        # Lỗi: chỉ thử lại khi loại lỗi cho phép (vd: lỗi mạng tạm thời)
+        job.error_kind = worker.error_kind or ERROR_UNKNOWN
+        job.error_message = worker.error_message
+        if self.retry_policy.should_retry(job.error_kind, job.attempt):
+            job.retry_delay = self.retry_policy.delay(job.attempt)
+            return Job.RETRY
+        return Job.FAILED
+
+    def _run_harvest_job(self, job, slot_id):
+        """Chạy trong thread của slot: phụ đề cho cả lô URL trong một tiến trình"""
+        harvest = SubtitleHarvest(job.options["entries"], slot_id, self.sub_mode_flag,
+                                  self.sub_lang_code_flag, self.download_folder)
+        harvest.message_signal.connect(self.append_log)
+        harvest.log_sink = self.log_sink
+        harvest.progress_sink = self.aggregator
+        harvest.job_id = job.job_id
+        harvest.rate_limit = self.governor.assigned_rate(job.job_id)
+        job.worker = harvest
+        if job.stop_flag:
+            harvest.stop()
+        harvest.run()
+        state = finish_harvest_job(job, harvest, self.retry_policy)
+        if state in (Job.DONE, Job.FAILED):
+            self.aggregator.finish_job(job.job_id)
+        return state
+
+    def _postprocess_tasks(self, worker):
+        """Các bước ffmpeg [(kind, [file nguồn])] của job vừa tải, chạy ở pool CPU"""
+        tasks = list(worker.postprocess_tasks)
+        if (not worker.defer_postprocess and self.audio_only_flag
+                and self.audio_format_flag == AUDIO_ORIGINAL_MP3):
+            tasks += [(TASK_MP3, [path]) for path in worker.final_files
+                      if not path.lower().endswith(".mp3")]
+        return tasks
+
+    def _submit_postprocess(self, video_index, url, info, tasks):
+        """Giao các bước ffmpeg cho pool CPU (gọi ở thread UI)"""
+        self.postprocess_left[video_index] = [len(tasks), 0]
+        # "Âm thanh gốc + MP3": giữ file gốc bên cạnh bản MP3
+        keep_audio = self.audio_format_flag == AUDIO_ORIGINAL_MP3
+        for kind, sources in tasks:
+            self.cpu_scheduler.submit(sources[0], video_index=video_index,
+                                      kind=kind, sources=sources,
+                                      source_url=url, info=info,
+                                      remove_source=not (keep_audio and kind == TASK_MP3))
+
+    def _resume_postprocess(self, video_index, url, options):
+        """Job đã tải xong ở lần trước nhưng còn bước ffmpeg: chỉ chạy nốt các bước đó"""
+        # Bước đã xong thì file nguồn đã bị xoá
+        tasks = [(kind, sources) for kind, sources in options["postprocess"]
+                 if all(os.path.exists(path) for path in sources)]
+        if tasks:
+            self._submit_postprocess(video_index, url, options.get("info"), tasks)
+        else:
+            self.queue_store.set_job_state(self.batch_id, video_index, Job.DONE)
+
+    def _index_files(self, paths, url, info):
+        """Ghi file media vừa tải vào thư viện (chạy trong thread slot)"""
+        for path in paths:
+            if path.lower().endswith(MEDIA_EXTS):
+                self.library.add_file(path, url, info)
+
+    def _run_postprocess_job(self, job, slot_id):
+        """Chạy trong thread của pool CPU: một bước ffmpeg"""
+        task = PostProcessTask(job.options["kind"], job.options["sources"],
+                               worker_id=slot_id,
+                               remove_source=job.options.get("remove_source", True))
+        task.message_signal.connect(self.append_log)
+        task.log_sink = self.log_sink
+        job.worker = task
+        if job.stop_flag:
+            task.stop()
+        if not task.run():
+            return Job.FAILED
+        # File gốc được giữ lại (MP3 từ âm thanh gốc) cũng vào thư viện
+        kept = [] if task.remove_source else task.sources
+        self._index_files([task.output] + kept, job.options.get("source_url"),
+                          job.options.get("info"))
+        return Job.DONE
+
+    def on_thread_count_changed(self, text):
+        """Đổi số luồng ngay cả khi đang tải"""
+        self.max_workers = int(text)
+        self.scheduler.set_max_workers(self.max_workers)
+        self._update_expected_active()
+
+    def on_bandwidth_changed(self, *_):
+        """Áp dụng ngân sách băng thông cho các job bắt đầu từ giờ"""
+        self.governor.set_total_rate(self.rate_combo.currentData())
+        self.governor.set_per_host_limit(self.host_limit_combo.currentData())
+        # Giới hạn host có thể vừa được nới: job đang chờ host được xét lại
+        self.scheduler.requeue_deferred()
+
+    def _update_expected_active(self):
+        self.governor.set_expected_active(
+            min(self.max_workers, max(self.scheduler.pending_count(), 1)))
+
+    def handle_thread_started(self, job_id, slot_id):
+        job = self.scheduler.get_job(job_id)
+        if job and self.batch_id is not None:
+            self.queue_store.set_job_state(
+                self.batch_id, job.video_index, Job.RUNNING)
+
+    def handle_thread_done(self, job_id, slot_id, state):
+        self._update_expected_active()
+        job = self.scheduler.get_job(job_id)
+        if job and "entries" in job.options:
+            self._handle_harvest_done(job, state)
+            return
+        tasks = job.options.get("postprocess") if job and state == Job.DONE else None
+        if job and self.batch_id is not None and not self.closing and not tasks:
+            # Đóng app: giữ trạng thái cũ để lần sau tải tiếp. Còn bước ffmpeg
+            # thì job chỉ xong khi pool CPU xong (handle_postprocess_done)
+            self.queue_store.set_job_state(self.batch_id, job.video_index, state)
+        if tasks and not self.closing:
+            self._submit_postprocess(job.video_index, job.url,
+                                     job.options.get("info"), tasks)
+        if state != Job.DONE:
+            self.aggregator.remove_job(job_id)
+        if state == Job.FAILED:
+            if job:
+                reason = ERROR_LABELS.get(job.error_kind, ERROR_LABELS[ERROR_UNKNOWN])
+                self.append_log(
+                    f"[Thread {slot_id}] ❌ Lỗi khi tải ({reason}, {job.attempt} lần): "
+                    f"{job.url}", "error")
+        elif state == Job.STOPPED and job and job.stop_latency is not None:
+            self.append_log(
+                f"[Thread {slot_id}] ⏹ Luồng được giải phóng sau "
+                f"{job.stop_latency * 1000:.0f} ms")
+
+    def _handle_harvest_done(self, job, state):
+        """Ghi trạng thái từng URL của lô phụ đề (URL chưa chạy vẫn chờ tải tiếp)"""
+        results = job.options.get("results", [])
+        if self.batch_id is not None and not self.closing:
+            for index, _, ok, _, _ in results:
+                self.queue_store.set_job_state(
+                    self.batch_id, index, Job.DONE if ok else Job.FAILED)
+        done = sum(1 for r in results if r[2])
+        self.harvest_done += done
+        self.harvest_failed += len(results) - done
+        if state == Job.STOPPED:
+            self.aggregator.remove_job(job.job_id)
+
+    def handle_job_retrying(self, job_id, slot_id, delay):
+        job = self.scheduler.get_job(job_id)
+        if job is None:
+            return
+        self.aggregator.add_job(job_id)
+        if "entries" in job.options:
+            self.append_log(
+                f"[Thread {slot_id}] 🔁 {ERROR_LABELS.get(job.error_kind, '')}, thử lại"
+                f" {len(job.options['entries'])} URL phụ đề sau {delay:.0f}s", "blue")
+            return
+        if self.batch_id is not None and not self.closing:
+            self.queue_store.set_job_state(self.batch_id, job.video_index, Job.QUEUED)
+        self.append_log(
+            f"[Thread {slot_id}] 🔁 {ERROR_LABELS.get(job.error_kind, '')}, thử lại sau "
+            f"{delay:.0f}s (lần {job.attempt + 1}): {job.url}", "blue")
+
+    def handle_postprocess_done(self, job_id, slot_id, state):
+        if state == Job.DONE:
+            self.cpu_done += 1
+        elif state == Job.FAILED:
+            self.cpu_failed += 1
+        job = self.cpu_scheduler.get_job(job_id)
+        left = self.postprocess_left.get(job.video_index) if job else None
+        if left is None or state not in (Job.DONE, Job.FAILED):
+            # Bị dừng: nhật ký vẫn ở trạng thái postprocess để lần sau chạy nốt
+            return
+        left[0] -= 1
+        left[1] += state == Job.FAILED
+        if left[0]:
+            return
+        del self.postprocess_left[job.video_index]
+        if self.batch_id is not None and not self.closing:
+            self.queue_store.set_job_state(
+                self.batch_id, job.video_index, Job.FAILED if left[1] else Job.DONE)
+
+    def handle_all_done(self):
+        if self.scheduler.pending_count() or self.cpu_scheduler.pending_count():
+            # Tải xong nhưng pool CPU còn việc (hoặc ngược lại)
+            return
+        if not self.progress_timer.isActive():
+            # Cả hai pool cùng báo xong: chỉ xử lý một lần
+            return
+        if self.expander is not None:
+            # Vẫn đang liệt kê playlist, chưa phải kết thúc
+            return
+        if self.closing:
+            return
+        self.progress_timer.stop()
+        if self.batch_id is not None:
+            if self.stopped and self.postprocess_left:
+                # Dừng khi còn bước ffmpeg: giữ lô để lần mở app sau chạy nốt
                 self.append_log(
-                    f"📂 Video được lưu tại: {self.download_folder}")
-            self.download_button.setEnabled(True)
-            self.stop_button.setEnabled(False)
-            self.progress.setValue(0)
-            self.progress.hide()
+                    f"⚙️ Còn {len(self.postprocess_left)} video chưa xử lý ffmpeg,"
+                    " sẽ được xử lý tiếp khi mở lại ứng dụng.", "blue")
+            else:
+                self.queue_store.finish_batch(
+                    self.batch_id, BATCH_STOPPED if self.stopped else BATCH_DONE)
+            self.batch_id = None
+        if self.stopped:
+            self.append_log("⏹ Đã dừng toàn bộ tiến trình.")
+        else:
+            self.progress.setValue(100)
+            self.append_log("✅ Tải xong tất cả video.")
+            self.append_log(
+                f"📂 Video được lưu tại: {self.download_folder}")
+        self._log_slot_utilisation()
+        if self.cpu_done or self.cpu_failed:
+            self.append_log(
+                f"⚙️ Pool CPU: {self.cpu_done} bước ffmpeg xong, {self.cpu_failed} lỗi")
+        if self.harvest_done or self.harvest_failed:
+            self.append_log(
+                f"📝 Phụ đề: {self.harvest_done} URL xong, {self.harvest_failed} URL lỗi")
+        self.scheduler.clear_finished()
+        self.cpu_scheduler.clear_finished()
+        self.download_button.setEnabled(True)
+        self.stop_button.setEnabled(False)
+        self.progress.setValue(0)
+        self.progress.resetFormat()
+        self.progress.hide()
+
+    def refresh_overall_progress(self):
+        """Cập nhật thanh tiến trình chung (theo byte) cho mọi job"""
+        snap = self.aggregator.snapshot()
+        rate_cap = self.governor.total_rate
+        speed = f"{format_bytes(snap['speed'])}/s"
+        if rate_cap:
+            speed += f" / {format_bytes(rate_cap)}/s"
+        self.progress.setValue(int(snap["percent"]))
+        text = (f"%p% | {snap['done']}/{snap['done'] + snap['active'] + snap['queued']}"
+                f" | ⚡ {speed} | ETA {format_eta(snap['eta'])}")
+        cpu_pending = self.cpu_scheduler.pending_count()
+        cpu_total = self.cpu_done + self.cpu_failed + cpu_pending
+        if cpu_total:
+            text += (f" | ⚙️ {self.cpu_done + self.cpu_failed}/{cpu_total}"
+                     f" ({self.cpu_scheduler.running_count()} đang xử lý)")
+        self.progress.setFormat(text)
+
+    def _log_slot_utilisation(self):
+        """Ghi log mức sử dụng từng luồng trong lượt tải vừa xong"""
+        stats = self.scheduler.slot_utilisation()
+        if not stats:
+            return
+        parts = [f"#{s['slot']}: {s['utilisation'] * 100:.0f}% ({s['jobs']} job)"
+                 for s in stats]
+        average = sum(s["utilisation"] for s in stats) / len(stats)
+        self.append_log(
+            f"📊 Mức sử dụng luồng (TB {average * 100:.0f}%): {', '.join(parts)}", "blue")
+
+    def shutdown(self):
+        """Dừng scheduler khi đóng ứng dụng (lô tải dở vẫn được giữ để tải tiếp)"""
+        self.closing = True
+        self.stopped = True
+        if self.expander is not None:
+            self.expander.stop()
+            self.expander.wait(3000)
+        self.scheduler.shutdown()
+        self.cpu_scheduler.shutdown()
+        YtdlpProcessPool.shared().shutdown()
+        self.queue_store.close()
 
     def update_progress(self, value):
         self.progress.setValue(value)
@@ -289,9 +904,10 @@ class Tab_1(QWidget):
 
     def stop_download(self):
         self.stopped = True
-
-        for thread in self.active_threads:
-            thread.stop_flag = True
+        if self.expander is not None:
+            self.expander.stop()
+        self.scheduler.stop_all()
+        self.cpu_scheduler.stop_all()
 
         self.append_log("⏹ Đang dừng các tiến trình tải...")
         self.stop_button.setEnabled(False)
@@ -400,6 +1016,113 @@ class TranslateTab(QWidget):
         self.setLayout(layout)
 
 
+class LibraryTab(QWidget):
+    """Thư viện file đã tải: tìm tức thì, tìm trùng, quét lại thư mục Video"""
+
+    COLUMNS = ["Tiêu đề", "Thời lượng", "Dung lượng", "Đường dẫn"]
+
+    def __init__(self, library):
+        super().__init__()
+        self.library = library
+        self.scanner = None
+        layout = QVBoxLayout()
+
+        search_layout = QHBoxLayout()
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("🔍 Tìm theo tiêu đề, đường dẫn hoặc URL...")
+        self.scan_button = QPushButton("🔄 Quét thư mục Video")
+        self.duplicates_button = QPushButton("♻️ Tìm trùng lặp")
+        search_layout.addWidget(self.search_input)
+        search_layout.addWidget(self.scan_button)
+        search_layout.addWidget(self.duplicates_button)
+        layout.addLayout(search_layout)
+
+        self.table = QTableWidget(0, len(self.COLUMNS))
+        self.table.setHorizontalHeaderLabels(self.COLUMNS)
+        self.table.horizontalHeader().setSectionResizeMode(0, QHeaderView.Stretch)
+        self.table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        self.table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.table.verticalHeader().setVisible(False)
+        layout.addWidget(self.table)
+        self.status_label = QLabel()
+        layout.addWidget(self.status_label)
+        self.setLayout(layout)
+
+        # Tìm sau 200ms kể từ lần gõ cuối
+        self.search_timer = QTimer(self)
+        self.search_timer.setSingleShot(True)
+        self.search_timer.setInterval(200)
+        self.search_timer.timeout.connect(self.refresh)
+        self.search_input.textChanged.connect(self.search_timer.start)
+        self.scan_button.clicked.connect(self.start_scan)
+        self.duplicates_button.clicked.connect(self.show_duplicates)
+        self.table.cellDoubleClicked.connect(self.open_folder)
+
+    def showEvent(self, event):
+        self.refresh()
+        super().showEvent(event)
+
+    def refresh(self):
+        rows = self.library.search(self.search_input.text())
+        self._fill(rows)
+        stats = self.library.stats()
+        self.status_label.setText(
+            f"📚 {stats['files']} file · {format_bytes(stats['bytes'])}"
+            f" · hiển thị {len(rows)}")
+
+    def _fill(self, rows):
+        self.table.setRowCount(0)
+        self.table.setRowCount(len(rows))
+        for row, media in enumerate(rows):
+            values = [media["title"] or "", format_eta(media["duration"]),
+                      format_bytes(media["size"]), media["path"]]
+            for column, value in enumerate(values):
+                self.table.setItem(row, column, QTableWidgetItem(value))
+
+    def show_duplicates(self):
+        groups = self.library.duplicates()
+        rows = [media for _, group in groups for media in group]
+        self._fill(rows)
+        wasted = sum(sum(m["size"] for m in group[1:]) for _, group in groups)
+        self.status_label.setText(
+            f"♻️ {len(groups)} nhóm trùng · có thể giải phóng ~{format_bytes(wasted)}")
+
+    def start_scan(self):
+        if self.scanner is not None:
+            return
+        self.scan_button.setEnabled(False)
+        self.status_label.setText("🔄 Đang quét thư mục Video...")
+        self.scanner = LibraryScanner(self.library)
+        self.scanner.progress_signal.connect(
+            lambda count, path: self.status_label.setText(
+                f"🔄 Đã thêm {count}: {os.path.basename(path)}"))
+        self.scanner.finished_signal.connect(self.on_scan_finished)
+        self.scanner.start()
+
+    def on_scan_finished(self, changed, removed):
+        self.scanner.wait()
+        self.scanner = None
+        self.scan_button.setEnabled(True)
+        self.refresh()
+        self.status_label.setText(
+            self.status_label.text() + f" · quét xong: +{changed}, -{removed}")
+
+    def stop_scan(self):
+        if self.scanner is not None:
+            self.scanner.stop()
+            self.scanner.wait(3000)
+
+    def open_folder(self, row, column):
+        item = self.table.item(row, 3)
+        folder = os.path.dirname(item.text()) if item else ""
+        if not os.path.isdir(folder):
+            return
+        if sys.platform == "win32":
+            os.startfile(folder)
+        else:
+            subprocess.Popen(["xdg-open", folder])
+
+
 class MainWindow(QWidget):
     def __init__(self):
         super().__init__()
@@ -427,8 +1150,13 @@ class MainWindow(QWidget):
         # Log widget
         self.log_widget = QWidget()
         self.layout_log = QVBoxLayout(self.log_widget)
-        self.output_list = QListWidget()
+        # Log: ring buffer N dòng cuối, cập nhật theo lô ~30 khung hình/giây
+        self.output_list = QListView()
         self.output_list.setObjectName("logListWidget")
+        self.output_list.setUniformItemSizes(True)
+        self.log_model = LogListModel(parent=self)
+        self.output_list.setModel(self.log_model)
+        self.log_sink = LogSink(self.log_model, self.output_list, parent=self)
         self.layout_log.addWidget(QLabel("📝 Nhật ký hoạt động"))
         self.layout_log.addWidget(self.output_list)
 
@@ -439,14 +1167,15 @@ class MainWindow(QWidget):
         self.progress.setVisible(False)
 
         # Thêm Tab
-        self.tabs.addTab(
-            Tab_1(self.append_log,
-                  self.log_widget,
-                  self.output_list,
-                  self.progress,
-                  "Video Downloader"),
-            "Video Downloader"
-        )
+        self.download_tab = Tab_1(self.append_log,
+                                  self.log_widget,
+                                  self.output_list,
+                                  self.progress,
+                                  "Video Downloader",
+                                  log_sink=self.log_sink)
+        self.tabs.addTab(self.download_tab, "Video Downloader")
+        self.library_tab = LibraryTab(self.download_tab.library)
+        self.tabs.addTab(self.library_tab, "📚 Thư viện")
         self.tabs.addTab(TranslateTab(), "Dịch Văn bản / Prompt Tùy chỉnh")
 
         # Gom Tabs + Log + Progress vào chung layout
@@ -477,7 +1206,7 @@ class MainWindow(QWidget):
 
         # Thêm layout gom vào layout chính
         self.layout.addLayout(self.main_content_layout)
-        self._start_update_check()
+        # Kiểm tra cập nhật chạy sau khi cửa sổ vẽ xong lần đầu (xem paintEvent)
 
         self.ytdlp_path = resource_path(os.path.join("data", "yt-dlp.exe"))
         self.ytdlp_path_1 = resource_path("data\yt-dlp.exe")
@@ -561,11 +1290,10 @@ class MainWindow(QWidget):
         # print(data)  # data lúc này là chuỗi báo lỗi
 
     def _start_update_check(self):
-        self.update_checker = UI_CheckUpdate()
+        self.update_checker = UI_CheckUpdate(force=self.is_manual_check)
         self.update_checker.update_available.connect(
             self._on_update_available)
-        self.update_checker.error_occurred.connect(
-            lambda error: QMessageBox.critical(self, "Lỗi", f"Có lỗi xảy ra khi kiểm tra cập nhật:\n{error}"))
+        self.update_checker.error_occurred.connect(self._on_update_error)
         self.update_checker.no_update.connect(
             lambda: self._on_no_update())
         self.update_checker.start()
@@ -585,6 +1313,13 @@ class MainWindow(QWidget):
 
         # Hiển thị box phiên bản khi có update
         # self.version_box.setVisible(True)
+    def _on_update_error(self, error):
+        if self.is_manual_check:
+            QMessageBox.critical(self, "Lỗi", f"Có lỗi xảy ra khi kiểm tra cập nhật:\n{error}")
+        else:
+            # Tự kiểm tra lúc mở app: mất mạng không làm phiền người dùng
+            self.append_log(f"⚠️ Không kiểm tra được cập nhật: {error}", "warning")
+
     def _on_no_update(self):
         """Xử lý khi không có update"""
 
@@ -631,23 +1366,33 @@ class MainWindow(QWidget):
                 QMessageBox.warning(
                     self, "Thông báo", "Sai mã kích hoạt")
 
-    def append_log(self, message, level=""):
-        current_time = QTime.currentTime().toString("HH:mm:ss")
-        message = f"[{current_time}] {message}"
-        item = QListWidgetItem(message)
-        if level == "info":
-            item.setForeground(QColor("#05df60"))
-        elif level == "warning":
-            item.setForeground(QColor("orange"))
-        elif level == "error":
-            item.setForeground(QColor("red"))
-        elif level == "blue":
-            item.setForeground(QColor("#4a5568"))
-        self.output_list.addItem(item)
-        self.output_list.scrollToBottom()
+    def showEvent(self, event):
+        super().showEvent(event)
+        if not getattr(self, "_resume_offered", False):
+            self._resume_offered = True
+            QTimer.singleShot(0, self.download_tab.offer_resume)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if not getattr(self, "_update_check_started", False):
+            # Khung hình đầu tiên không phải chờ mạng
+            self._update_check_started = True
+            QTimer.singleShot(0, self._start_update_check)
+
+    def closeEvent(self, event):
+        self.library_tab.stop_scan()
+        self.download_tab.shutdown()
+        self.log_sink.close()
+        super().closeEvent(event)
 
+    def append_log(self, message, level=""):
+        self.log_sink.write(message, level)
 
 if __name__ == "__main__":
+    if WORKER_FLAG in sys.argv:
+        # Bản đóng gói: app được gọi lại làm worker của pool yt-dlp
+        from ytdlp_pool import worker_main
+        sys.exit(worker_main())
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
@@ -0,0 +1,88 @@
+import threading
+from urllib.parse import urlsplit
+
+
+def url_host(url):
+    """Tên host (không có www.) của URL, dùng cho giới hạn kết nối mỗi host"""
+    try:
+        host = urlsplit(url).netloc.lower().split("@")[-1].split(":")[0]
+    except ValueError:
+        return ""
+    return host[4:] if host.startswith("www.") else host
+
+
+class BandwidthGovernor:
+    """Ngân sách băng thông chung cho mọi worker + giới hạn kết nối mỗi host.
+
+    Dùng làm bộ kiểm soát nhận job của JobScheduler: try_admit() được gọi
+    trong lock của scheduler trước khi giao job cho slot, release() khi job
+    kết thúc. Phần băng thông của job được chốt lúc job bắt đầu (yt-dlp
+    nhận qua --limit-rate, không đổi được khi đang tải): tổng ngân sách chia
+    cho số job dự kiến chạy cùng lúc, nên khi hàng đợi cạn thì job bắt đầu
+    sau được phần lớn hơn, còn job đang chạy giữ nguyên phần cũ.
+    """
+
+    def __init__(self, total_rate=0, per_host_limit=0):
+        self._lock = threading.Lock()
+        self.total_rate = total_rate            # byte/giây, 0 = không giới hạn
+        self.per_host_limit = per_host_limit    # 0 = không giới hạn
+        self.expected_active = 1                # Số job dự kiến chạy cùng lúc
+        self._active = {}                       # job_id -> host
+        self._hosts = {}                        # host -> số job đang chạy
+        self._assigned = {}                     # job_id -> rate lúc bắt đầu
+
+    def set_total_rate(self, rate):
+        with self._lock:
+            self.total_rate = max(0, int(rate or 0))
+
+    def set_per_host_limit(self, limit):
+        with self._lock:
+            self.per_host_limit = max(0, int(limit or 0))
+
+    def set_expected_active(self, count):
+        """Số job dự kiến chạy cùng lúc (min(số luồng, số job còn lại))"""
+        with self._lock:
+            self.expected_active = max(1, int(count))
+
+    def try_admit(self, job):
+        host = url_host(job.url)
+        with self._lock:
+            if (self.per_host_limit and host
+                    and self._hosts.get(host, 0) >= self.per_host_limit):
+                return False
+            self._active[job.job_id] = host
+            self._hosts[host] = self._hosts.get(host, 0) + 1
+            self._assigned[job.job_id] = self._fair_share()
+            return True
+
+    def defer_key(self, job):
+        """Job bị try_admit từ chối chỉ chạy được khi host của nó có job kết thúc"""
+        return url_host(job.url)
+
+    def release(self, job):
+        with self._lock:
+            host = self._active.pop(job.job_id, None)
+            self._assigned.pop(job.job_id, None)
+            if host is not None:
+                self._hosts[host] -= 1
+                if self._hosts[host] <= 0:
+                    del self._hosts[host]
+
+    def _fair_share(self):
+        if not self.total_rate:
+            return 0
+        return int(self.total_rate / max(len(self._active), self.expected_active, 1))
+
+    def assigned_rate(self, job_id):
+        """Phần băng thông được cấp khi job bắt đầu (dùng cho --limit-rate)"""
+        with self._lock:
+            return self._assigned.get(job_id, 0)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "total_rate": self.total_rate,
+                "active": len(self._active),
+                "share": self._fair_share(),
+                "hosts": dict(self._hosts),
+            }
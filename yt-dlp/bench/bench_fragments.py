@@ -0,0 +1,180 @@
+"""Đo tốc độ tải phân đoạn song song (-N) và aria2c với server HTTP cục bộ.
+
+Server giả lập độ trễ mỗi request và giới hạn tốc độ mỗi kết nối (giống
+CDN), phục vụ một playlist HLS nhiều phân đoạn và một file MP4 thường.
+
+    python bench/bench_fragments.py --segments 60 --segment-kb 512
+    python bench/bench_fragments.py --ytdlp "python -m yt_dlp"
+"""
+import argparse
+import http.server
+import json
+import os
+import shlex
+import shutil
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from download_acceleration import ACCEL_ARIA2C, acceleration_args, find_aria2c  # noqa: E402
+
+
+class ThrottledHandler(http.server.SimpleHTTPRequestHandler):
+    """Trả file với độ trễ mỗi request, giới hạn byte/giây mỗi kết nối, hỗ trợ Range"""
+
+    latency = 0.05
+    rate = 2 * 1024 * 1024
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        path = self.translate_path(self.path)
+        if not os.path.isfile(path):
+            self.send_error(404)
+            return
+        time.sleep(self.latency)
+        size = os.path.getsize(path)
+        start, end = 0, size - 1
+        range_header = self.headers.get("Range")
+        if range_header and range_header.startswith("bytes="):
+            first, _, last = range_header[6:].partition("-")
+            start = int(first) if first else 0
+            end = int(last) if last else size - 1
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        else:
+            self.send_response(200)
+        self.send_header("Content-Type", self.guess_type(path))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.end_headers()
+
+        chunk = 64 * 1024
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = f.read(min(chunk, remaining))
+                if not data:
+                    break
+                began = time.monotonic()
+                try:
+                    self.wfile.write(data)
+                except (BrokenPipeError, ConnectionResetError):
+                    return
+                remaining -= len(data)
+                wait = len(data) / self.rate - (time.monotonic() - began)
+                if wait > 0:
+                    time.sleep(wait)
+
+
+def make_media(root, segments, segment_kb):
+    """Tạo playlist HLS + file MP4 có cùng tổng dung lượng"""
+    payload = os.urandom(segment_kb * 1024)
+    lines = ["#EXTM3U", "#EXT-X-VERSION:3", "#EXT-X-TARGETDURATION:2",
+             "#EXT-X-MEDIA-SEQUENCE:0"]
+    for i in range(segments):
+        with open(os.path.join(root, f"seg{i:04d}.ts"), "wb") as f:
+            f.write(payload)
+        lines += ["#EXTINF:2.0,", f"seg{i:04d}.ts"]
+    lines.append("#EXT-X-ENDLIST")
+    with open(os.path.join(root, "stream.m3u8"), "w") as f:
+        f.write("\n".join(lines) + "\n")
+    with open(os.path.join(root, "video.mp4"), "wb") as f:
+        for _ in range(segments):
+            f.write(payload)
+    return segments * segment_kb * 1024
+
+
+def start_server(root, latency, rate):
+    handler = type("Handler", (ThrottledHandler,), {
+        "latency": latency, "rate": rate})
+
+    def factory(*args, **kwargs):
+        return handler(*args, directory=root, **kwargs)
+
+    server = http.server.ThreadingHTTPServer(("127.0.0.1", 0), factory)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def run_ytdlp(ytdlp, url, out_dir, extra):
+    shutil.rmtree(out_dir, ignore_errors=True)
+    os.makedirs(out_dir)
+    cmd = ytdlp + [url, "--quiet", "--no-warnings", "--fixup", "never",
+                   "--no-part", "-o", os.path.join(out_dir, "out.%(ext)s")] + extra
+    began = time.monotonic()
+    result = subprocess.run(cmd, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+                            text=True)
+    elapsed = time.monotonic() - began
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip() or f"yt-dlp exit {result.returncode}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--ytdlp", default="yt-dlp",
+                        help='lệnh yt-dlp, vd: "python -m yt_dlp"')
+    parser.add_argument("--segments", type=int, default=40)
+    parser.add_argument("--segment-kb", type=int, default=512)
+    parser.add_argument("--latency", type=float, default=0.05,
+                        help="độ trễ mỗi request (giây)")
+    parser.add_argument("--rate-mb", type=float, default=2.0,
+                        help="giới hạn tốc độ mỗi kết nối (MB/s)")
+    parser.add_argument("--fragments", default="1,4,8,16")
+    parser.add_argument("--output", help="ghi kết quả JSON ra file")
+    args = parser.parse_args()
+
+    ytdlp = shlex.split(args.ytdlp)
+    root = tempfile.mkdtemp(prefix="bench_frag_")
+    results = []
+    try:
+        media_dir = os.path.join(root, "media")
+        os.makedirs(media_dir)
+        total = make_media(media_dir, args.segments, args.segment_kb)
+        server = start_server(media_dir, args.latency, args.rate_mb * 1024 * 1024)
+        base = f"http://127.0.0.1:{server.server_address[1]}"
+        out_dir = os.path.join(root, "out")
+        print(f"📦 {args.segments} phân đoạn x {args.segment_kb} KB = "
+              f"{total / 1024 / 1024:.1f} MB, độ trễ {args.latency * 1000:.0f} ms, "
+              f"{args.rate_mb} MB/s mỗi kết nối")
+
+        cases = [("hls", f"{base}/stream.m3u8", n)
+                 for n in (int(x) for x in args.fragments.split(","))]
+        if find_aria2c():
+            cases += [("http+aria2c", f"{base}/video.mp4", n)
+                      for n in (1, 8, 16)]
+        else:
+            print("ℹ️ Không tìm thấy aria2c, bỏ qua phần HTTP nhiều kết nối")
+
+        baseline = {}
+        for kind, url, fragments in cases:
+            extra = ["--concurrent-fragments", str(fragments)]
+            if kind == "http+aria2c" and fragments > 1:
+                extra = acceleration_args(ACCEL_ARIA2C, fragments)
+            elapsed = run_ytdlp(ytdlp, url, out_dir, extra)
+            baseline.setdefault(kind, elapsed)
+            speedup = baseline[kind] / elapsed
+            results.append({"kind": kind, "fragments": fragments,
+                            "seconds": round(elapsed, 3),
+                            "mb_per_s": round(total / elapsed / 1024 / 1024, 2),
+                            "speedup": round(speedup, 2)})
+            print(f"{kind:12} N={fragments:<3} {elapsed:7.2f}s "
+                  f"{total / elapsed / 1024 / 1024:7.2f} MB/s  x{speedup:.2f}")
+        server.shutdown()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,229 @@
+"""Benchmark giao diện: chạy Tab_1 offscreen với yt-dlp giả (fake_ytdlp.py).
+
+Đo độ trễ event loop, số signal/giây GUI thread nhận, mức tăng bộ nhớ và
+tổng thời gian cho 1/4/8/16 luồng. Kết quả lưu trong bench/results/ để so
+sánh giữa các phiên bản.
+
+    python bench/bench_ui.py
+    python bench/bench_ui.py --urls 64 --rate 100 --workers 4,16
+    python bench/bench_ui.py --compare bench/results/ui-1.6.0-....json
+"""
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+APP_DIR = os.path.dirname(BENCH_DIR)
+RESULTS_DIR = os.path.join(BENCH_DIR, "results")
+sys.path.insert(0, APP_DIR)
+
+from PySide6.QtCore import QElapsedTimer, QEvent, QObject, QTimer  # noqa: E402
+from PySide6.QtWidgets import QApplication  # noqa: E402
+
+from process_utils import rss_bytes  # noqa: E402
+
+
+class EventCounter(QObject):
+    """Đếm sự kiện MetaCall (signal queued từ thread khác) tới GUI thread"""
+
+    def __init__(self):
+        super().__init__()
+        self.meta_calls = 0
+        self.events = 0
+
+    def eventFilter(self, obj, event):
+        self.events += 1
+        if event.type() == QEvent.MetaCall:
+            self.meta_calls += 1
+        return False
+
+
+class LoopLatencyProbe:
+    """Timer 10 ms: độ trễ = khoảng thời gian thực tế - khoảng dự kiến"""
+
+    INTERVAL_MS = 10
+
+    def __init__(self):
+        self.samples = []
+        self.clock = QElapsedTimer()
+        self.timer = QTimer()
+        self.timer.setInterval(self.INTERVAL_MS)
+        self.timer.timeout.connect(self._tick)
+
+    def start(self):
+        self.clock.start()
+        self.timer.start()
+
+    def stop(self):
+        self.timer.stop()
+
+    def _tick(self):
+        elapsed = self.clock.restart()
+        self.samples.append(max(elapsed - self.INTERVAL_MS, 0))
+
+    def summary(self):
+        if not self.samples:
+            return {"p50_ms": 0, "p95_ms": 0, "max_ms": 0}
+        ordered = sorted(self.samples)
+        return {
+            "p50_ms": statistics.median(ordered),
+            "p95_ms": ordered[int(len(ordered) * 0.95) - 1] if len(ordered) > 1 else ordered[0],
+            "max_ms": ordered[-1],
+        }
+
+
+def install_stub(workdir):
+    """Đặt yt-dlp giả vào data/yt-dlp.exe mà resource_path() sẽ tìm thấy"""
+    data_dir = os.path.join(workdir, "data")
+    os.makedirs(data_dir, exist_ok=True)
+    stub = os.path.join(BENCH_DIR, "fake_ytdlp.py")
+    target = os.path.join(data_dir, "yt-dlp.exe")
+    if sys.platform == "win32":
+        # Không chạy được script .py dưới tên .exe: chèn python vào đầu lệnh
+        import downloadWorker
+        original = downloadWorker.DownloadVideo._build_command
+
+        def build_command(self, ytdlp_path, output):
+            cmd = original(self, ytdlp_path, output)
+            return [sys.executable, stub] + cmd[1:]
+
+        downloadWorker.DownloadVideo._build_command = build_command
+        open(target, "wb").close()
+    else:
+        with open(target, "w") as f:
+            f.write(f'#!/bin/sh\nexec "{sys.executable}" "{stub}" "$@"\n')
+        os.chmod(target, 0o755)
+
+
+def run_case(app, window, workers, urls, timeout):
+    tab = window.download_tab
+    if tab.thread_combo.findText(str(workers)) < 0:
+        tab.thread_combo.addItem(str(workers))
+    tab.thread_combo.setCurrentText(str(workers))
+    tab.skip_archived.setChecked(False)
+    tab.defer_postprocess.setChecked(False)
+    tab.url_input.setPlainText("\n".join(urls))
+
+    counter = EventCounter()
+    probe = LoopLatencyProbe()
+    app.installEventFilter(counter)
+    memory_before = rss_bytes()
+    probe.start()
+    started = time.monotonic()
+    tab.start_download()
+    while not tab.download_button.isEnabled():
+        app.processEvents()
+        time.sleep(0.001)
+        if time.monotonic() - started > timeout:
+            tab.stop_download()
+            raise TimeoutError(f"{workers} luồng: quá {timeout}s")
+    wall = time.monotonic() - started
+    probe.stop()
+    app.removeEventFilter(counter)
+    memory_after = rss_bytes()
+    # Cho LogSink ghi nốt phần còn lại
+    for _ in range(10):
+        app.processEvents()
+
+    result = {
+        "workers": workers,
+        "urls": len(urls),
+        "wall_s": round(wall, 3),
+        "event_loop_latency": probe.summary(),
+        "signals_per_s": round(counter.meta_calls / wall, 1),
+        "events_per_s": round(counter.events / wall, 1),
+        "log_rows": window.log_model.rowCount() if hasattr(window, "log_model") else None,
+    }
+    if memory_before is not None and memory_after is not None:
+        result["memory_growth_mb"] = round((memory_after - memory_before) / 1024 / 1024, 2)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=APP_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def compare(current, baseline_path):
+    with open(baseline_path, encoding="utf-8") as f:
+        baseline = {r["workers"]: r for r in json.load(f)["results"]}
+    print(f"\nSo với {os.path.basename(baseline_path)}:")
+    for result in current:
+        old = baseline.get(result["workers"])
+        if not old:
+            continue
+        print(f"  {result['workers']:>2} luồng: wall {old['wall_s']}s -> {result['wall_s']}s,"
+              f" p95 {old['event_loop_latency']['p95_ms']} -> "
+              f"{result['event_loop_latency']['p95_ms']} ms,"
+              f" signal/s {old['signals_per_s']} -> {result['signals_per_s']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark giao diện với yt-dlp giả")
+    parser.add_argument("--workers", default="1,4,8,16")
+    parser.add_argument("--urls", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=2.0,
+                        help="thời gian tải giả lập mỗi URL")
+    parser.add_argument("--rate", type=float, default=50,
+                        help="số dòng tiến trình yt-dlp in mỗi giây")
+    parser.add_argument("--noise", type=int, default=1,
+                        help="số dòng log thường sau mỗi dòng tiến trình")
+    parser.add_argument("--timeout", type=float, default=600)
+    parser.add_argument("--compare", help="file kết quả cũ để so sánh")
+    args = parser.parse_args()
+
+    os.environ["FAKE_YTDLP_SECONDS"] = str(args.seconds)
+    os.environ["FAKE_YTDLP_RATE"] = str(args.rate)
+    os.environ["FAKE_YTDLP_NOISE"] = str(args.noise)
+
+    workdir = tempfile.mkdtemp(prefix="bench_ui_")
+    cwd = os.getcwd()
+    os.chdir(workdir)
+    try:
+        install_stub(workdir)
+        from app import MainWindow
+        from ui_setting import APP_VERSION
+
+        app = QApplication.instance() or QApplication(sys.argv[:1])
+        window = MainWindow()
+        results = []
+        for workers in (int(w) for w in args.workers.split(",")):
+            urls = [f"https://bench.invalid/video/{workers}-{i}" for i in range(args.urls)]
+            result = run_case(app, window, workers, urls, args.timeout)
+            results.append(result)
+            latency = result["event_loop_latency"]
+            print(f"{workers:>2} luồng: {result['wall_s']:7.2f}s | loop p50 {latency['p50_ms']} ms"
+                  f" p95 {latency['p95_ms']} ms max {latency['max_ms']} ms"
+                  f" | {result['signals_per_s']} signal/s"
+                  f" | RAM +{result.get('memory_growth_mb', '?')} MB")
+        window.download_tab.shutdown()
+        window.log_sink.close()
+    finally:
+        os.chdir(cwd)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    os.makedirs(RESULTS_DIR, exist_ok=True)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    path = os.path.join(RESULTS_DIR, f"ui-{APP_VERSION}-{stamp}.json")
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump({"version": APP_VERSION, "revision": git_revision(),
+                   "platform": sys.platform, "params": vars(args),
+                   "results": results}, f, indent=2)
+    print(f"💾 Đã lưu: {path}")
+    if args.compare:
+        compare(results, args.compare)
+
+
+if __name__ == "__main__":
+    main()
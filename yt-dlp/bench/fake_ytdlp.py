@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""yt-dlp giả cho benchmark: in dòng metadata/tiến trình giống output máy thật.
+
+Tốc độ in điều khiển bằng biến môi trường:
+    FAKE_YTDLP_SECONDS      thời gian "tải" mỗi URL (mặc định 2)
+    FAKE_YTDLP_RATE         số dòng tiến trình mỗi giây (mặc định 50)
+    FAKE_YTDLP_SIZE         dung lượng giả lập (byte, mặc định 50 MB)
+    FAKE_YTDLP_NOISE        số dòng log thường xen giữa mỗi dòng tiến trình (mặc định 1)
+"""
+import json
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ytdlp_protocol import (  # noqa: E402
+    DOWNLOAD_PREFIX, FILE_PREFIX, META_PREFIX, POSTPROCESS_PREFIX)
+
+
+def _arg(argv, name, default=None):
+    if name in argv:
+        position = argv.index(name)
+        if position + 1 < len(argv):
+            return argv[position + 1]
+    return default
+
+
+def main(argv):
+    seconds = float(os.environ.get("FAKE_YTDLP_SECONDS", "2"))
+    rate = float(os.environ.get("FAKE_YTDLP_RATE", "50"))
+    size = int(os.environ.get("FAKE_YTDLP_SIZE", str(50 * 1024 * 1024)))
+    noise = int(os.environ.get("FAKE_YTDLP_NOISE", "1"))
+
+    url = next((a for a in argv if a.startswith("http")), "https://example.com/0")
+    video_id = url.rstrip("/").rsplit("/", 1)[-1]
+    # Lấy template -o của file tải (bỏ "infojson:...")
+    templates = [argv[i + 1] for i, a in enumerate(argv[:-1]) if a == "-o"]
+    template = next((t for t in reversed(templates) if not t.startswith("infojson:")),
+                    "%(title)s.%(ext)s")
+    title = f"Fake video {video_id}"
+    output = template.replace("%(title)s", title).replace("%(ext)s", "mp4")
+
+    def out(line):
+        sys.stdout.write(line + "\n")
+        sys.stdout.flush()
+
+    out(f"[generic] Extracting URL: {url}")
+    out(META_PREFIX + json.dumps({
+        "id": video_id, "title": title, "duration": 300, "filesize_approx": size,
+        "extractor_key": "Generic", "format_id": "18"}))
+
+    steps = max(1, int(seconds * rate))
+    started = time.monotonic()
+    for step in range(1, steps + 1):
+        done = size * step // steps
+        elapsed = max(time.monotonic() - started, 1e-3)
+        out(DOWNLOAD_PREFIX + json.dumps({
+            "status": "downloading" if step < steps else "finished",
+            "downloaded_bytes": done, "total_bytes": size,
+            "total_bytes_estimate": None, "speed": done / elapsed,
+            "eta": (size - done) / max(done / elapsed, 1),
+            "fragment_index": None, "fragment_count": None}))
+        for _ in range(noise):
+            out(f"[download] {done * 100 / size:5.1f}% of {size} bytes")
+        delay = started + step / rate - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    out(POSTPROCESS_PREFIX + json.dumps({"status": "started", "postprocessor": "Merger"}))
+    out(POSTPROCESS_PREFIX + json.dumps({"status": "finished", "postprocessor": "Merger"}))
+    folder = os.path.dirname(output)
+    if folder:
+        os.makedirs(folder, exist_ok=True)
+    with open(output, "wb"):
+        pass
+    out(FILE_PREFIX + os.path.abspath(output))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
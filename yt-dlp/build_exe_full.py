@@ -16,15 +16,25 @@ UPX_PATH = Path(r"D:\Dev\python\upx-5.0.2-win64\upx.exe")
 
 RESOURCE_FILES_PY = [
     "ui_setting.py", "downloadWorker.py", "ui_updatedialog.py",
-    "ui_checkupdate.py", "ui_downloadUpdateWorker.py", "license_utils.py"
+    "ui_checkupdate.py", "ui_downloadUpdateWorker.py", "license_utils.py",
+    "job_scheduler.py", "ytdlp_protocol.py", "download_progress.py",
+    "log_sink.py", "playlist_expander.py", "download_archive.py",
+    "download_queue_store.py", "bandwidth_governor.py",
+    "download_acceleration.py", "process_utils.py", "retry_policy.py",
+    "info_cache.py", "postprocess.py", "media_library.py", "subtitle_harvest.py",
+    "ytdlp_engine.py", "ytdlp_runner.py", "ytdlp_pool.py", "update_manifest.py",
+    "segmented_download.py",
 ]
 
 # Nếu bạn dùng pycryptodomex -> 'Cryptodome.*'
 # Nếu bạn dùng pycryptodome  -> 'Crypto.*'
 IMPORT_HIDDEN = [
     "subprocess", "requests", "webbrowser", "Cryptodome.Cipher.AES",
-    "PySide6.QtCore", "PySide6.QtWidgets", "PySide6.QtGui", "uuid"
+    "PySide6.QtCore", "PySide6.QtWidgets", "PySide6.QtGui", "uuid", "psutil"
 ]
+# Gói chỉ được import trong hàm (engine trong tiến trình, worker của ytdlp_pool)
+# nên PyInstaller không tự thấy: gom toàn bộ submodule (extractor nạp động)
+COLLECT_SUBMODULES = ["yt_dlp"]
 
 PROJECT_DIR = Path(__file__).resolve().parent
 
@@ -134,6 +144,8 @@ def build_exe():
     # Các hidden import bạn khai báo sẵn
     for h in IMPORT_HIDDEN:
         py_args += ["--hidden-import", h]
+    for package in COLLECT_SUBMODULES:
+        py_args += ["--collect-submodules", package]
 
     # Entry (đã obfuscate) nằm trong obf_src
     entry_in_obf = obf_abs / MAIN_FILE
@@ -182,10 +194,24 @@ def compress_with_upx():
     print(f"📦 File cuối: {final_exe} — {size_mb:.2f} MB")
 
 
+def write_release_manifest():
+    """Manifest từng file của dist (kèm Update.exe) cho cập nhật delta."""
+    from ui_setting import APP_VERSION
+    from update_manifest import write_manifest
+
+    final_dist = PROJECT_DIR / "dist"
+    updater = PROJECT_DIR / "Update.exe"
+    if updater.is_file():
+        shutil.copy2(updater, final_dist / updater.name)
+    manifest = write_manifest(str(final_dist), APP_VERSION)
+    print(f"🧾 Manifest v{APP_VERSION}: {len(manifest['files'])} file")
+
+
 if __name__ == "__main__":
     # ensure_tools()
     clean_old_builds()
     encrypt_code()
     build_exe()
     compress_with_upx()
+    write_release_manifest()
     print("✅ Hoàn tất! File EXE nằm ở: dist")
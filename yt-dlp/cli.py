@@ -0,0 +1,377 @@
+"""Chế độ dòng lệnh (không giao diện) cho lô tải chạy định kỳ.
+
+Dùng lại DownloadVideo (cùng lệnh yt-dlp với Tab_1) và JobScheduler, chỉ cần
+QtCore nên không nạp QtWidgets. Mỗi sự kiện in ra một dòng JSON trên stdout.
+
+    python cli.py urls.txt --workers 4 --folder /data/video
+    cat urls.txt | python cli.py - --audio-only --audio-format original
+"""
+import argparse
+import json
+import os
+import signal
+import sys
+import threading
+import time
+from datetime import datetime
+
+from PySide6.QtCore import QCoreApplication, QTimer
+
+from job_scheduler import Job, JobScheduler
+from bandwidth_governor import BandwidthGovernor
+from download_progress import ProgressAggregator
+from download_archive import DownloadArchive, canonical_url_key, dedupe_urls
+from info_cache import InfoCache
+from playlist_expander import PlaylistExpander
+from postprocess import AUDIO_FORMATS, AUDIO_MP3
+from retry_policy import ERROR_UNKNOWN, RetryPolicy
+from subtitle_harvest import SubtitleHarvest, chunk_entries, finish_harvest_job
+from ytdlp_engine import ENGINES, ENGINE_POOL, ENGINE_SUBPROCESS, downloader_class
+from ytdlp_pool import YtdlpProcessPool
+
+LANGUAGES = {"vi": "Tiếng Việt", "en": "Tiếng Anh", "ja": "Tiếng Nhật", "zh": "Tiếng Trung"}
+
+
+class JsonLinesOutput:
+    """In sự kiện dạng JSON-lines, an toàn khi nhiều thread cùng ghi.
+
+    Dùng làm log_sink cho DownloadVideo (write(message, level, key)).
+    """
+
+    def __init__(self, stream=sys.stdout, quiet=False):
+        self.stream = stream
+        self.quiet = quiet
+        self._lock = threading.Lock()
+
+    def emit(self, event, **data):
+        data = {"event": event, "time": round(time.time(), 3), **data}
+        line = json.dumps(data, ensure_ascii=False)
+        with self._lock:
+            self.stream.write(line + "\n")
+            self.stream.flush()
+
+    def write(self, message, level="", key=None):
+        # Dòng tiến trình từng job đã có trong sự kiện "progress"
+        if key is not None or (self.quiet and level != "error"):
+            return
+        self.emit("log", level=level or "info", message=message.strip())
+
+
+def read_urls(source):
+    stream = sys.stdin if source == "-" else open(source, encoding="utf-8")
+    with stream:
+        return [line.strip() for line in stream
+                if line.strip() and not line.lstrip().startswith("#")]
+
+
+def default_folder():
+    """Video/<ngày>/<số thứ tự> giống thư mục mặc định của Tab_1"""
+    date_folder = os.path.join("Video", datetime.now().strftime("%Y-%m-%d"))
+    os.makedirs(date_folder, exist_ok=True)
+    numbers = [int(n) for n in os.listdir(date_folder)
+               if n.isdigit() and os.path.isdir(os.path.join(date_folder, n))]
+    return os.path.join(date_folder, f"{max(numbers, default=0) + 1:02d}")
+
+
+class HeadlessBatch:
+    """Chạy một lô URL với JobScheduler, báo kết quả qua JsonLinesOutput"""
+
+    def __init__(self, app, urls, args, output):
+        self.app = app
+        self.urls = urls
+        self.args = args
+        self.output = output
+        self.folder = args.folder or default_folder()
+        self.aggregator = ProgressAggregator()
+        self.retry_policy = RetryPolicy()
+        self.info_cache = None if args.no_info_cache else InfoCache.shared()
+        self.results = {Job.DONE: 0, Job.FAILED: 0, Job.STOPPED: 0}
+        self.started = time.monotonic()
+        self.finished = False
+        self._finish_lock = threading.Lock()
+        # Playlist: tách thành từng video như Tab_1, mỗi video một job
+        self.expander = None
+        self.seen_keys = set()
+        self.next_index = 1
+        self.total_jobs = 0
+        # Cùng cách chia băng thông với Tab_1: phần của job chốt lúc bắt đầu
+        self.governor = BandwidthGovernor(total_rate=int(args.rate_limit * 1024 * 1024))
+        self.governor.set_expected_active(args.workers)
+        self.scheduler = JobScheduler(self._run_job, args.workers, admission=self.governor)
+        self.scheduler.job_started.connect(self.on_job_started)
+        self.scheduler.job_finished.connect(self.on_job_finished)
+        self.scheduler.job_retrying.connect(self.on_job_retrying)
+        self.scheduler.all_finished.connect(self.on_all_finished)
+        self.progress_timer = QTimer()
+        self.progress_timer.setInterval(int(args.progress_interval * 1000))
+        self.progress_timer.timeout.connect(self.report_progress)
+        # Chỉ phụ đề: gom URL thành lô, mỗi lô một tiến trình yt-dlp
+        self.harvest = args.subtitle_only and args.sub_mode in ("1", "2")
+
+    def make_worker(self, job, slot_id=0):
+        args = self.args
+        return downloader_class(args.engine)(
+            url=job.url,
+            video_index=job.video_index,
+            total_urls=len(self.urls),
+            worker_id=slot_id,
+            video_mode=args.mode,
+            audio_only=args.audio_only,
+            sub_mode=args.sub_mode,
+            sub_lang=args.sub_lang,
+            sub_lang_name=LANGUAGES.get(args.sub_lang, args.sub_lang),
+            include_thumb=args.thumbnail,
+            subtitle_only=args.subtitle_only,
+            custom_folder_name=self.folder,
+            no_playlist=job.options.get("no_playlist", True),
+            use_archive=args.archive and not args.subtitle_only,
+            audio_format=args.audio_format,
+        )
+
+    def start(self):
+        os.makedirs(self.folder, exist_ok=True)
+        if self.args.engine == ENGINE_POOL:
+            YtdlpProcessPool.shared().warm(self.args.workers)
+        self.output.emit("start", total=len(self.urls), folder=os.path.abspath(self.folder),
+                         workers=self.args.workers)
+        self.progress_timer.start()
+        if self.args.mode == "Playlist":
+            self.expander = PlaylistExpander(self.urls)
+            self.expander.entries_found.connect(self.on_playlist_entries)
+            self.expander.expand_failed.connect(self.on_playlist_failed)
+            self.expander.message_signal.connect(self.output.write)
+            self.expander.finished_signal.connect(self.on_expand_finished)
+            self.expander.start()
+            return
+        self._submit_urls(self.urls)
+
+    def _submit_urls(self, urls, **options):
+        """Đánh số tiếp và đưa URL vào hàng đợi (lô phụ đề nếu chỉ tải phụ đề)"""
+        entries = list(enumerate(urls, self.next_index))
+        self.next_index += len(entries)
+        self.total_jobs += len(entries)
+        if self.harvest:
+            for chunk in chunk_entries(entries):
+                self.aggregator.add_job(chunk[0][0], len(chunk))
+                self.scheduler.submit(chunk[0][1], video_index=chunk[0][0], entries=chunk)
+            return
+        for index, url in entries:
+            self.aggregator.add_job(index)
+            self.scheduler.submit(url, video_index=index, **options)
+
+    def on_playlist_entries(self, source_url, entries):
+        """Chạy trong thread của PlaylistExpander, giống Tab_1.on_playlist_entries"""
+        archive = DownloadArchive.shared() if self.args.archive else None
+        new_urls = []
+        for entry in entries:
+            key = canonical_url_key(entry["entry_url"])
+            if key in self.seen_keys:
+                continue
+            self.seen_keys.add(key)
+            if archive is not None and archive.contains_entry(
+                    entry.get("ie_key"), entry.get("id")):
+                self.output.emit("skipped", url=entry["entry_url"], reason="archive")
+                continue
+            new_urls.append(entry["entry_url"])
+        if self.info_cache is not None:
+            self.info_cache.remember_many([(entry["entry_url"], entry) for entry in entries])
+        self.output.emit("playlist_entries", url=source_url, count=len(new_urls))
+        self._submit_urls(new_urls)
+
+    def on_playlist_failed(self, source_url, error):
+        """Không liệt kê được: tải nguyên URL trong một job như Tab_1"""
+        self.output.emit("log", level="warning",
+                         message=f"Không tách được playlist ({error}), tải trực tiếp: {source_url}")
+        self._submit_urls([source_url], no_playlist=False)
+
+    def on_expand_finished(self):
+        self.expander.wait()
+        self.expander = None
+        self.on_all_finished()
+
+    def stop(self):
+        self.output.emit("stopping")
+        if self.expander is not None:
+            self.expander.stop()
+        self.scheduler.stop_all()
+
+    def _run_job(self, job, slot_id):
+        """Chạy trong thread của slot, giống Tab_1._run_job"""
+        if "entries" in job.options:
+            return self._run_harvest_job(job, slot_id)
+        worker = self.make_worker(job, slot_id)
+        worker.log_sink = self.output
+        worker.progress_sink = self.aggregator
+        worker.job_id = job.video_index
+        worker.info_cache = self.info_cache
+        worker.rate_limit = self.governor.assigned_rate(job.job_id)
+        job.worker = worker
+        if job.stop_flag:
+            worker.stop(job.cleanup_on_stop)
+        ok = worker.run()
+        job.options["files"] = list(worker.final_files or []) if ok else []
+        if ok:
+            return Job.DONE
+        if job.stop_flag:
+            return Job.STOPPED
+        job.error_kind = worker.error_kind or ERROR_UNKNOWN
+        job.error_message = worker.error_message
+        if self.retry_policy.should_retry(job.error_kind, job.attempt):
+            job.retry_delay = self.retry_policy.delay(job.attempt)
+            return Job.RETRY
+        return Job.FAILED
+
+    def _run_harvest_job(self, job, slot_id):
+        args = self.args
+        harvest = SubtitleHarvest(job.options["entries"], slot_id, args.sub_mode,
+                                  args.sub_lang, self.folder)
+        harvest.log_sink = self.output
+        harvest.progress_sink = self.aggregator
+        harvest.job_id = job.video_index
+        harvest.rate_limit = self.governor.assigned_rate(job.job_id)
+        job.worker = harvest
+        if job.stop_flag:
+            harvest.stop()
+        harvest.run()
+        state = finish_harvest_job(job, harvest, self.retry_policy)
+        if state in (Job.DONE, Job.FAILED):
+            self.aggregator.finish_job(job.video_index)
+        return state
+
+    def on_job_started(self, job_id, slot_id):
+        job = self.scheduler.get_job(job_id)
+        self.output.emit("job_started", index=job.video_index, url=job.url,
+                         slot=slot_id, attempt=job.attempt)
+
+    def on_job_retrying(self, job_id, slot_id, delay):
+        job = self.scheduler.get_job(job_id)
+        self.aggregator.add_job(job.video_index)
+        self.output.emit("job_retry", index=job.video_index, url=job.url,
+                         error_kind=job.error_kind, error=job.error_message,
+                         delay=round(delay, 1))
+
+    def on_job_finished(self, job_id, slot_id, state):
+        self.governor.set_expected_active(
+            min(self.args.workers, max(self.scheduler.pending_count(), 1)))
+        job = self.scheduler.get_job(job_id)
+        if "entries" in job.options:
+            # Một sự kiện cho mỗi URL của lô phụ đề (URL chưa chạy tính là đã dừng)
+            finished = set()
+            for index, url, ok, detail, kind in job.options.get("results", []):
+                finished.add(index)
+                url_state = Job.DONE if ok else Job.FAILED
+                self.results[url_state] += 1
+                self.output.emit("job_finished", index=index, url=url, state=url_state,
+                                 attempts=job.attempt, files=[detail] if ok else [],
+                                 error_kind=kind, error=None if ok else detail)
+            for index, url in job.options["entries"]:
+                if index not in finished:
+                    self.results[Job.STOPPED] += 1
+                    self.output.emit("job_finished", index=index, url=url,
+                                     state=Job.STOPPED, attempts=job.attempt, files=[],
+                                     error_kind=None, error=None)
+            if state == Job.STOPPED:
+                self.aggregator.remove_job(job.video_index)
+            return
+        self.results[state] = self.results.get(state, 0) + 1
+        if state != Job.DONE:
+            self.aggregator.remove_job(job.video_index)
+        self.output.emit("job_finished", index=job.video_index, url=job.url, state=state,
+                         attempts=job.attempt, files=job.options.get("files", []),
+                         error_kind=job.error_kind, error=job.error_message or None)
+
+    def report_progress(self):
+        snap = self.aggregator.snapshot()
+        self.output.emit("progress", percent=round(snap["percent"], 1),
+                         done_bytes=snap["done_bytes"], total_bytes=snap["total_bytes"],
+                         speed=snap["speed"], eta=snap["eta"], active=snap["active"],
+                         queued=snap["queued"], done=snap["done"])
+
+    def on_all_finished(self):
+        # all_finished đi qua hàng đợi: job xong ngay trong start() có thể báo
+        # khi còn job khác; shutdown() -> stop_all() cũng phát lại tín hiệu này.
+        # Playlist còn đang liệt kê thì chưa phải kết thúc
+        with self._finish_lock:
+            if (self.finished or self.expander is not None
+                    or self.scheduler.pending_count()):
+                return
+            self.finished = True
+        self.progress_timer.stop()
+        self.output.emit("summary", total=self.total_jobs,
+                         done=self.results.get(Job.DONE, 0),
+                         failed=self.results.get(Job.FAILED, 0),
+                         stopped=self.results.get(Job.STOPPED, 0),
+                         elapsed=round(time.monotonic() - self.started, 2))
+        self.scheduler.shutdown()
+        YtdlpProcessPool.shared().shutdown()
+        failed = self.results.get(Job.FAILED, 0) + self.results.get(Job.STOPPED, 0)
+        self.app.exit(1 if failed else 0)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="HT DownloadVID - tải hàng loạt không giao diện")
+    parser.add_argument("source", help="file chứa URL (mỗi dòng một URL), '-' để đọc stdin")
+    parser.add_argument("--mode", choices=["Video", "Playlist"], default="Video")
+    parser.add_argument("--audio-only", action="store_true", help="chỉ tải âm thanh")
+    parser.add_argument("--audio-format", default=AUDIO_MP3,
+                        choices=[value for _, value in AUDIO_FORMATS])
+    parser.add_argument("--sub-mode", default="", choices=["", "1", "2"],
+                        help="1 = phụ đề có sẵn, 2 = phụ đề tự động")
+    parser.add_argument("--sub-lang", default="vi", choices=sorted(LANGUAGES))
+    parser.add_argument("--thumbnail", action="store_true")
+    parser.add_argument("--subtitle-only", action="store_true")
+    parser.add_argument("--folder", default="", help="thư mục lưu (mặc định Video/<ngày>/NN)")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--archive", action="store_true",
+                        help="bỏ qua video đã có trong download_archive.txt")
+    parser.add_argument("--rate-limit", type=float, default=0,
+                        help="tổng băng thông tối đa (MB/s), 0 = không giới hạn")
+    parser.add_argument("--no-info-cache", action="store_true")
+    parser.add_argument("--engine", default=ENGINE_SUBPROCESS,
+                        choices=[value for _, value in ENGINES],
+                        help="inprocess = thư viện yt_dlp trong tiến trình,"
+                             " pool = các worker yt-dlp khởi động sẵn")
+    parser.add_argument("--progress-interval", type=float, default=2.0)
+    parser.add_argument("--quiet", action="store_true", help="chỉ in log lỗi")
+    parser.add_argument("--dry-run", action="store_true",
+                        help="chỉ in lệnh yt-dlp sẽ chạy cho từng URL")
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    args.workers = max(1, args.workers)
+    output = JsonLinesOutput(quiet=args.quiet)
+    urls, dropped = dedupe_urls(read_urls(args.source))
+    if dropped:
+        output.emit("deduplicated", dropped=dropped)
+    if not urls:
+        output.emit("summary", total=0, done=0, failed=0, stopped=0, elapsed=0)
+        return 0
+
+    app = QCoreApplication.instance() or QCoreApplication(sys.argv[:1])
+    batch = HeadlessBatch(app, urls, args, output)
+    if args.dry_run:
+        for index, url in enumerate(urls, 1):
+            worker = batch.make_worker(Job(index, url, index,
+                                           no_playlist=args.mode == "Video"))
+            output.emit("command", index=index, url=url,
+                        argv=worker._build_command("yt-dlp", os.path.join(
+                            batch.folder, "%(title)s.%(ext)s")))
+        return 0
+
+    # Ctrl+C / SIGTERM: dừng mọi job (kill cả cây tiến trình) rồi thoát
+    signal.signal(signal.SIGINT, lambda *_: batch.stop())
+    if hasattr(signal, "SIGTERM"):
+        signal.signal(signal.SIGTERM, lambda *_: batch.stop())
+    # Timer rỗng để Python xử lý signal trong vòng lặp Qt
+    heartbeat = QTimer()
+    heartbeat.start(200)
+    heartbeat.timeout.connect(lambda: None)
+
+    QTimer.singleShot(0, batch.start)
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
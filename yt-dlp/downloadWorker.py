@@ -1,13 +1,21 @@
-from PySide6.QtCore import QThread, Signal, QTime
+from PySide6.QtCore import QObject, Signal
 
-import sys
 import os
-import re
 import subprocess
+import threading
 from ui_setting import resource_path
+import ytdlp_protocol
+from download_progress import format_bytes, format_eta
+from download_archive import DownloadArchive
+from download_acceleration import rate_limit_args
+from process_utils import kill_process_tree, popen_group_kwargs, remove_partial_files
+from postprocess import (AUDIO_MP3, DEFERRED_ARGS, DEFERRED_PARTS_TEMPLATE,
+                         DEFERRED_VIDEO_FORMAT, audio_args, plan_tasks)
+from retry_policy import ERROR_BROKEN, ERROR_NETWORK, ERROR_UNKNOWN, classify_error
 
 
-class DownloadVideo(QThread):
+class DownloadVideo(QObject):
+    """Tải một URL. run() được gọi đồng bộ trong thread slot của JobScheduler"""
     message_signal = Signal(str, str)
     progress_signal = Signal(int)
     finished_signal = Signal()
@@ -18,7 +26,8 @@ class DownloadVideo(QThread):
                  total_urls, worker_id,
                  video_mode, audio_only,
                  sub_mode, sub_lang, sub_lang_name, include_thumb,
-                 subtitle_only, custom_folder_name=""):
+                 subtitle_only, custom_folder_name="", no_playlist=True,
+                 use_archive=False, audio_format=AUDIO_MP3):
         super().__init__()
         self.url = url
         self.video_index = video_index
@@ -26,15 +35,55 @@ class DownloadVideo(QThread):
         self.worker_id = worker_id
         self.video_mode = video_mode
         self.audio_only = audio_only
+        self.audio_format = audio_format
         self.sub_mode = sub_mode
         self.sub_lang = sub_lang
         self.sub_lang_name = sub_lang_name
         self.include_thumb = include_thumb
         self.subtitle_only = subtitle_only
         self.custom_folder_name = custom_folder_name
+        # Playlist đã được tách thành từng video nên mặc định chỉ tải 1 video
+        self.no_playlist = no_playlist
+        # Archive chỉ áp dụng khi tải video/audio, không áp dụng cho chỉ phụ đề
+        self.archive = None
+        if use_archive and not subtitle_only:
+            self.archive = DownloadArchive.shared()
         self.ffmpeg_path = resource_path(os.path.join("data", "ffmpeg.exe"))
         self.ytdlp_path = resource_path(os.path.join("data", "yt-dlp.exe"))
         self.stop_flag = False
+        # Xoá file tải dở khi người dùng huỷ (đóng app thì giữ để tải tiếp)
+        self.cleanup_on_stop = True
+        self.process = None
+        self._process_lock = threading.Lock()
+        # Gộp tiến trình nhiều worker (ProgressAggregator), tuỳ chọn
+        self.progress_sink = None
+        self.job_id = None
+        # LogSink gom log theo lô (tuỳ chọn), nếu None thì dùng message_signal
+        self.log_sink = None
+        # Giới hạn băng thông (byte/giây) do BandwidthGovernor cấp, 0 = không giới hạn
+        self.rate_limit = 0
+        # Tăng tốc: tham số -N / aria2c đã chọn cho job này
+        self.acceleration_args = []
+        # InfoCache (tuỳ chọn): dùng lại info JSON để bỏ qua bước extractor
+        self.info_cache = None
+        self.info_json = None
+        # Kết quả lần chạy: metadata + file cuối cùng (job bị archive bỏ qua
+        # thì run() trả True mà không có file nào)
+        self.info = None
+        self.final_files = []
+        # Bỏ ffmpeg khỏi slot tải: merge/phụ đề/MP3 giao cho pool CPU (postprocess_tasks)
+        self.defer_postprocess = False
+        self.postprocess_tasks = []
+        # Định dạng đã tải (mỗi file một dòng meta khi tải tách luồng)
+        self.format_ids = []
+        # In metadata/tiến trình dạng máy (--print, --progress-template); engine
+        # trong tiến trình (ytdlp_engine) nhận qua hook nên không cần
+        self.machine_output = True
+        self._last_percent = -1
+        # Kết quả lỗi (xem retry_policy), None nếu chưa lỗi
+        self.error_kind = None
+        self.error_message = ""
+        self.file_prefix = ""
         # print(self.url)
         # print(f" video_mode {self.video_mode}")
         # print(f" audio_only {self.audio_only}")
@@ -44,119 +93,283 @@ class DownloadVideo(QThread):
         # print(f" subtitle_only {self.subtitle_only}")
         # print(f" custom_folder_name {self.custom_folder_name}")
 
+    def _log(self, message, level="", key=None):
+        """Ghi log: qua LogSink nếu có, tránh phát signal cho từng dòng"""
+        if self.log_sink is not None:
+            self.log_sink.write(message, level, key)
+        else:
+            self.message_signal.emit(message, level)
+
+    def stop(self, cleanup=True):
+        """Dừng job ngay (gọi từ GUI thread): kill cả cây tiến trình yt-dlp.
+
+        Vòng đọc stdout trong thread slot kết thúc ngay khi pipe đóng, không
+        phải chờ yt-dlp in dòng tiếp theo.
+        """
+        with self._process_lock:
+            self.stop_flag = True
+            self.cleanup_on_stop = cleanup
+            process = self.process
+        kill_process_tree(process, wait=False)
+
     def run(self):
+        """Chạy tải, trả về True nếu thành công.
 
+        Mọi đường thoát (xong, lỗi, dừng, exception) đều phát finished_signal
+        đúng một lần và không để lại tiến trình con. Khi lỗi, error_kind và
+        error_message cho biết nguyên nhân để quyết định có thử lại không.
+        """
         message_thread = f"[Thread {self.worker_id}] ({self.video_index}/{self.total_urls}) "
+        try:
+            return self._run(message_thread)
+        except OSError as e:
+            # Không chạy được yt-dlp (thiếu file, bị chặn...)
+            self._fail(message_thread, ERROR_BROKEN, str(e))
+            return False
+        except Exception as e:
+            self._fail(message_thread, ERROR_UNKNOWN, repr(e))
+            return False
+        finally:
+            kill_process_tree(self.process)
+            self.finished_signal.emit()
+
+    def _run(self, message_thread):
         if self.stop_flag:
-            self.message_signal.emit(
+            self._log(
                 f"{message_thread} ⏹ Đã dừng trước khi bắt đầu.", "")
-            self.finished_signal.emit()
-            return
+            return False
 
-        creation_flags = 0
-        if sys.platform == "win32":
-            creation_flags = subprocess.CREATE_NO_WINDOW
+        if self.archive is not None and self.archive.contains(self.url):
+            self._log(
+                f"{message_thread} ⏭️ Đã tải trước đó (archive): {self.url}", "")
+            if self.progress_sink is not None:
+                self.progress_sink.finish_job(self.job_id)
+            return True
 
-        self.message_signal.emit(
+        self._log(
             f"{message_thread} 🔽 Bắt đầu tải: {self.url}", ""
         )
+        if self.rate_limit:
+            self._log(
+                f"{message_thread} ⚡ Băng thông tối đa: {format_bytes(self.rate_limit)}/s", "")
 
-        # Lấy tiêu đề video
         ytdlp_path = "yt-dlp"
 
         if os.path.exists(self.ytdlp_path):
             ytdlp_path = self.ytdlp_path
 
-        get_title_cmd = [ytdlp_path, "--encoding",
-                         "utf-8", "--get-title", self.url]
-        result = subprocess.run(get_title_cmd, capture_output=True,
-
-                                text=True, encoding="utf-8", creationflags=creation_flags)
-
-        title = result.stdout.strip().replace("/", "-").replace("\\", "-")
-        if not title:
-            self.error_signal.emit(
-                f"{message_thread} Internet của bạn có vấn đề. vui lòng check lại!",)
-            return
-        self.message_signal.emit(
-            f"{message_thread} 🎯 Tiêu đề: {title}", "")
-
-        output_filename = f"{self.video_index:02d}.{title}.%(ext)s"
+        # Một lần gọi duy nhất: yt-dlp tự đặt tên file từ tiêu đề và in
+        # metadata (--print) trước khi tải, không cần chạy --get-title riêng
         if self.video_mode == "Video":
-            output_filename = f"{self.video_index:02d}.{title}.%(ext)s"
+            self.file_prefix = f"{self.video_index:02d}."
         else:
-            output_filename = f"playlist.{self.video_index:02d}.{title}.%(ext)s"
+            self.file_prefix = f"playlist.{self.video_index:02d}."
 
+        template = "%(title)s.%(ext)s"
+        if self.defer_postprocess and not self.audio_only and not self.subtitle_only:
+            template = DEFERRED_PARTS_TEMPLATE
         output_filename = os.path.join(
-            self.custom_folder_name, output_filename)
-
-        # download_cmd = [
-        #     ytdlp_path, "--encoding", "utf-8", self.url,
-        #     "--newline",
-        #     "--progress", "--write-auto-sub", "--sub-langs", "vi",
-        #     "--sub-format", "srt/best", "--convert-subs", "srt",
-        #     "-f", "bv*+ba/b", "--merge-output-format", "mp4",
-        #     "--output", output_filename, "--extract-audio",
-        #     "--audio-format", "mp3", "--write-thumbnail",
-        #     "--ignore-errors", "--no-warnings"
-        # ]
+            self.custom_folder_name, self.file_prefix + template)
+
+        if self.info_cache is not None:
+            self.info_json = self.info_cache.fresh_path(self.url)
+            if self.info_json:
+                self._log(
+                    f"{message_thread} 💾 Dùng info đã lưu, bỏ qua bước phân tích", "")
+
         download_cmd = self._build_command(ytdlp_path, output_filename)
-        self.process = subprocess.Popen(
-            download_cmd,
-            stdout=subprocess.PIPE,
-            stderr=subprocess.STDOUT,
-            text=True,
-            bufsize=1,
-            encoding="utf-8",
-            creationflags=creation_flags
-        )
+        self.info = None
+        self.final_files = []
+        self.format_ids = []
+        self.error_lines = []
+        returncode = self._execute(message_thread, download_cmd)
+        if self.stop_flag:
+            return self._finish_stopped(message_thread)
+
+        failed = returncode != 0 and (
+            self.info is None or (not self.final_files and not self.subtitle_only))
+        if failed:
+            kind = classify_error(self.error_lines)
+            if self.info_json:
+                # Info cũ (link định dạng hết hạn...): lần thử lại sẽ phân tích mới
+                self.info_cache.invalidate(self.url)
+                kind = ERROR_NETWORK
+            message = (self.error_lines[-1] if self.error_lines
+                       else f"yt-dlp thoát với mã {returncode}")
+            self._fail(message_thread, kind, message, logged=bool(self.error_lines))
+            return False
+
+        if self.defer_postprocess:
+            self.postprocess_tasks = plan_tasks(
+                self.custom_folder_name, self.file_prefix,
+                "+".join(self.format_ids), self.audio_only, self.audio_format)
+        if self.info_cache is not None and self.info and self.no_playlist:
+            self.info_cache.remember(self.url, self.info, adopt_info=not self.info_json)
+        if self.progress_sink is not None:
+            self.progress_sink.finish_job(self.job_id)
+        self.progress_signal.emit(100)
+        if self.final_files:
+            video_filename = os.path.basename(self.final_files[-1])
+        else:
+            video_filename = (self.info or {}).get("title", self.url)
+        self._log(
+            f"{message_thread} ✅ Xong: {video_filename}", "")
+        return True
+
+    def _execute(self, message_thread, download_cmd):
+        """Chạy yt-dlp và đọc output máy, trả về mã thoát (None nếu bị dừng)"""
+        with self._process_lock:
+            if self.stop_flag:
+                return None
+            # Process group riêng: khi dừng sẽ kill được cả ffmpeg/aria2c con
+            self.process = subprocess.Popen(
+                download_cmd,
+                stdout=subprocess.PIPE,
+                stderr=subprocess.STDOUT,
+                text=True,
+                bufsize=1,
+                encoding="utf-8",
+                **popen_group_kwargs()
+            )
 
         for line in self.process.stdout:
             if self.stop_flag:
-                self.process.kill()
-                self.process.terminate()
-                self.message_signal.emit(
-                    f"{message_thread} ⏹ Đã dừng tải video.", "")
-                self.finished_signal.emit()
-                return
-
-            if line.strip():
-
-                self.message_signal.emit(
-                    f"{message_thread} {line.strip()}", "")
-                match = re.search(r"\[download\]\s+(\d{1,3}\.\d{1,2})%", line)
-                if match:
-                    percent = float(match.group(1))
-                    self.progress_signal.emit(int(percent))
-
-        self.process.wait()
-
-        self.progress_signal.emit(95)
-        video_filename = f"{self.video_index:02d}_{title}.mp4"
-        self.message_signal.emit(
-            f"{message_thread} ✅ Xong: {video_filename}", "")
-        self.finished_signal.emit()
+                return None
+
+            line = line.strip()
+            if not line:
+                continue
+
+            kind, data = ytdlp_protocol.parse_line(line)
+            self._handle_output_line(message_thread, line, kind, data)
+
+        if self.stop_flag:
+            return None
+        return self.process.wait()
+
+    def _handle_output_line(self, message_thread, line, kind, data):
+        """Xử lý một dòng output đã tách bằng ytdlp_protocol.parse_line"""
+        if kind == "meta":
+            self._handle_meta(message_thread, data)
+        elif kind == "download":
+            self._handle_progress(message_thread, data)
+        elif kind == "postprocess":
+            self._handle_postprocess(message_thread, data)
+        elif kind == "file":
+            self.final_files.append(data)
+        else:
+            self._handle_log_line(message_thread, line)
+
+    def _handle_meta(self, message_thread, data):
+        self.info = data
+        if data.get("format_id"):
+            self.format_ids.append(str(data["format_id"]))
+        self._log(
+            f"{message_thread} 🎯 Tiêu đề: {data.get('title', '')}"
+            f" ({format_eta(data.get('duration'))})", "")
+        if self.progress_sink is not None:
+            self.progress_sink.set_expected(
+                self.job_id, data.get("filesize_approx"))
+
+    def _handle_postprocess(self, message_thread, data):
+        if self.progress_sink is not None:
+            self.progress_sink.set_phase(self.job_id, "postprocess")
+        if data.get("status") == "started":
+            self._log(
+                f"{message_thread} ⚙️ {data.get('postprocessor', '')}", "")
+
+    def _handle_log_line(self, message_thread, line):
+        if line.startswith("ERROR:"):
+            self.error_lines.append(line)
+            self._log(f"{message_thread} {line}", "error")
+            return
+        self._log(f"{message_thread} {line}", "")
+
+    def _fail(self, message_thread, kind, message, logged=False):
+        """Ghi nhận lỗi: phân loại để scheduler quyết định thử lại"""
+        self.error_kind = kind
+        self.error_message = message
+        if logged:
+            return
+        message = f"{message_thread} ❌ {message}"
+        if self.log_sink is not None:
+            self.log_sink.write(message, "error")
+        else:
+            self.error_signal.emit(message)
+
+    def _finish_stopped(self, message_thread):
+        """Dọn dẹp sau khi bị dừng: chắc chắn cây tiến trình đã chết, xoá file tạm"""
+        kill_process_tree(self.process)
+        if self.cleanup_on_stop and self.file_prefix:
+            removed = remove_partial_files(self.custom_folder_name, self.file_prefix)
+            if removed:
+                self._log(
+                    f"{message_thread} 🧹 Đã xoá {len(removed)} file tải dở.", "")
+        self._log(f"{message_thread} ⏹ Đã dừng tải video.", "")
+        return False
+
+    def _handle_progress(self, message_thread, data):
+        """Cập nhật tiến trình từ dict JSON của --progress-template"""
+        if self.progress_sink is not None:
+            self.progress_sink.update(self.job_id, data)
+        done = data.get("downloaded_bytes") or 0
+        total = data.get("total_bytes") or data.get("total_bytes_estimate") or 0
+        if not total:
+            return
+        percent = min(int(done * 100 / total), 100)
+        if percent == self._last_percent:
+            return
+        self._last_percent = percent
+        self.progress_signal.emit(percent)
+        # Dòng tiến trình có key: dòng mới thay thế dòng cũ trong log
+        if self.log_sink is not None or percent % 10 == 0:
+            fragment = ""
+            if data.get("fragment_count"):
+                fragment = f" [{data.get('fragment_index')}/{data.get('fragment_count')}]"
+            self._log(
+                f"{message_thread} ⬇️ {percent}% / {format_bytes(total)}"
+                f" - {format_bytes(data.get('speed'))}/s"
+                f" - ETA {format_eta(data.get('eta'))}{fragment}", "",
+                key=f"progress-{self.job_id}")
 
     def _build_command(self, ytdlp_path, output):
         """Xây dựng lệnh yt-dlp"""
         cmd = [ytdlp_path]
         cmd += ["--encoding", "utf-8"]
-        cmd += [self.url, "--progress"]
+        if self.info_json:
+            cmd += ["--load-info-json", self.info_json]
+        else:
+            cmd += [self.url]
+            if self.info_cache is not None and self.no_playlist:
+                cmd += ["--write-info-json",
+                        "-o", self.info_cache.output_template(self.url)]
+        cmd.append("--no-playlist" if self.no_playlist else "--yes-playlist")
+        if self.archive is not None:
+            cmd += self.archive.ytdlp_args()
+        acceleration = [] if self.subtitle_only else self.acceleration_args
+        cmd += rate_limit_args(self.rate_limit, acceleration)
+        if self.machine_output:
+            cmd += ytdlp_protocol.progress_args()
+            cmd += ytdlp_protocol.print_args()
         # Thêm đường dẫn ffmpeg nếu tồn tại
         if os.path.exists(self.ffmpeg_path):
             cmd += ["--ffmpeg-location", self.ffmpeg_path]
+        if self.defer_postprocess:
+            cmd += DEFERRED_ARGS
 
         if self.subtitle_only:
             cmd.append("--skip-download")
-            self.message.emit("📝 Chế độ: Chỉ tải phụ đề")
+            self._log("📝 Chế độ: Chỉ tải phụ đề", "")
+        elif self.audio_only:
+            # Chỉ tải luồng âm thanh, không tải video rồi mới tách
+            cmd += audio_args(self.audio_format, deferred=self.defer_postprocess)
+        elif self.defer_postprocess:
+            cmd += ["-f", DEFERRED_VIDEO_FORMAT]
         else:
             cmd += ["-f", "bv*+ba/b", "--merge-output-format", "mp4"]
 
         cmd += ["-o", output]
 
-        if self.audio_only and not self.subtitle_only:
-            cmd += ["--extract-audio", "--audio-format", "mp3"]
-
         # Xử lý phụ đề
         if self.sub_mode != "":
             if self.sub_mode == "1":
@@ -175,7 +388,8 @@ class DownloadVideo(QThread):
                 "--sub-format", "srt/best"  # Ưu tiên định dạng SRT
             ]
 
-        cmd += ["--convert-subs", "srt"]
+        if not self.defer_postprocess:
+            cmd += ["--convert-subs", "srt"]
 
         if self.include_thumb:
             cmd.append("--write-thumbnail")
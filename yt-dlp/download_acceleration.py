@@ -0,0 +1,84 @@
+import os
+import shutil
+
+from ui_setting import resource_path
+
+ACCEL_OFF = "off"
+ACCEL_AUTO = "auto"
+ACCEL_ARIA2C = "aria2c"
+
+ACCEL_MODES = [
+    ("🐢 Tắt tăng tốc", ACCEL_OFF),
+    ("🚀 Tải song song phân đoạn (-N)", ACCEL_AUTO),
+    ("⚡ aria2c + phân đoạn", ACCEL_ARIA2C),
+]
+
+# Tổng số kết nối phân đoạn chia cho mọi job đang chạy
+CONNECTION_BUDGET = 16
+MAX_FRAGMENTS_PER_JOB = 16
+
+
+def find_aria2c():
+    """Đường dẫn aria2c (đi kèm trong data/ hoặc trong PATH), None nếu không có"""
+    bundled = resource_path(os.path.join("data", "aria2c.exe"))
+    if os.path.exists(bundled):
+        return bundled
+    return shutil.which("aria2c")
+
+
+def pick_fragment_count(active_jobs, free_slots, queued_jobs):
+    """Số phân đoạn tải song song cho job mới.
+
+    Chia CONNECTION_BUDGET cho số job dự kiến chạy cùng lúc: các job đang
+    chạy + số slot trống sẽ được lấp bởi hàng đợi. Khi hàng đợi cạn và
+    slot bỏ trống, job còn lại được dùng nhiều kết nối hơn.
+    """
+    expected = max(int(active_jobs), 1) + min(max(int(free_slots), 0),
+                                              max(int(queued_jobs), 0))
+    return max(1, min(CONNECTION_BUDGET // expected, MAX_FRAGMENTS_PER_JOB))
+
+
+def acceleration_args(mode, fragments):
+    """Tham số yt-dlp cho chế độ tăng tốc.
+
+    -N chỉ có tác dụng với định dạng phân đoạn (DASH/HLS); với aria2c thì
+    các định dạng HTTP thường được tải nhiều kết nối, DASH/HLS vẫn dùng
+    bộ tải native với -N.
+    """
+    if mode == ACCEL_OFF or fragments <= 1:
+        return []
+    args = ["--concurrent-fragments", str(fragments)]
+    if mode == ACCEL_ARIA2C:
+        aria2c = find_aria2c()
+        if aria2c:
+            connections = min(fragments, 16)
+            args += [
+                "--downloader", "dash,m3u8:native",
+                "--downloader", f"http:{aria2c}",
+                "--downloader-args",
+                f"aria2c:-x {connections} -s {connections} -k 1M"
+                " --file-allocation=none --summary-interval=0",
+            ]
+    return args
+
+
+def rate_limit_args(rate_limit, args):
+    """args tăng tốc kèm giới hạn băng thông rate_limit (byte/giây) của job.
+
+    Bộ tải native của yt-dlp áp --limit-rate cho từng phân đoạn, -N phân
+    đoạn song song sẽ dùng gấp N lần nên phải chia; chế độ aria2c vẫn tải
+    DASH/HLS bằng native -N nên cũng chia. Riêng HTTP do aria2c tải thì
+    giới hạn áp cho cả file: trả lại đủ phần qua --max-overall-download-limit
+    (tham số của aria2c đứng sau giá trị yt-dlp tự thêm nên được ưu tiên).
+    """
+    args = list(args)
+    if not rate_limit:
+        return args
+    rate = int(rate_limit)
+    if "--concurrent-fragments" not in args:
+        return ["--limit-rate", str(rate)] + args
+    fragments = max(int(args[args.index("--concurrent-fragments") + 1]), 1)
+    for index, value in enumerate(args):
+        if value.startswith("aria2c:"):
+            args[index] = f"{value} --max-overall-download-limit={rate}"
+    return ["--limit-rate", str(max(rate // fragments, 1))] + args
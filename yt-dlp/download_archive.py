@@ -0,0 +1,163 @@
+import os
+import threading
+from urllib.parse import parse_qs, urlencode, urlsplit, urlunsplit
+
+ARCHIVE_FILE = "download_archive.txt"
+
+_YOUTUBE_HOSTS = ("youtube.com", "youtube-nocookie.com", "youtu.be")
+_YOUTUBE_PATHS = ("shorts", "embed", "live", "v", "e")
+_TRACKING_PARAMS = ("si", "feature", "pp", "fbclid", "gclid")
+
+
+def _host(netloc):
+    host = netloc.lower().split("@")[-1].split(":")[0]
+    for prefix in ("www.", "m.", "music."):
+        if host.startswith(prefix):
+            host = host[len(prefix):]
+    return host
+
+
+def canonical_video_id(url):
+    """Lấy (extractor, id) từ URL mà không cần mạng; None nếu không nhận ra.
+
+    extractor viết thường giống khoá trong file archive của yt-dlp.
+    """
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return None
+    host = _host(parts.netloc)
+    segments = [s for s in parts.path.split("/") if s]
+
+    if host.endswith(_YOUTUBE_HOSTS):
+        if host == "youtu.be" and segments:
+            return "youtube", segments[0]
+        if segments and segments[0] == "watch":
+            video_id = parse_qs(parts.query).get("v", [""])[0]
+            if video_id:
+                return "youtube", video_id
+        if len(segments) >= 2 and segments[0] in _YOUTUBE_PATHS:
+            return "youtube", segments[1]
+        return None
+
+    if host.endswith("vimeo.com") and segments and segments[-1].isdigit():
+        return "vimeo", segments[-1]
+    if host.endswith("dailymotion.com") and len(segments) >= 2 and segments[0] == "video":
+        return "dailymotion", segments[1].split("_")[0]
+    if host == "dai.ly" and segments:
+        return "dailymotion", segments[0]
+    if host.endswith("tiktok.com") and "video" in segments:
+        position = segments.index("video")
+        if position + 1 < len(segments):
+            return "tiktok", segments[position + 1]
+    return None
+
+
+def canonical_url_key(url):
+    """Khoá để gộp URL trùng trong một lượt tải (id video hoặc URL chuẩn hoá)"""
+    video = canonical_video_id(url)
+    if video:
+        return f"{video[0]} {video[1]}"
+    try:
+        parts = urlsplit(url.strip())
+    except ValueError:
+        return url.strip()
+    query = sorted((k, v) for k, values in parse_qs(parts.query).items()
+                   for v in values
+                   if k not in _TRACKING_PARAMS and not k.startswith("utm_"))
+    return urlunsplit((parts.scheme.lower(), _host(parts.netloc),
+                       parts.path.rstrip("/"), urlencode(query), ""))
+
+
+def dedupe_urls(urls):
+    """Bỏ URL trùng (cùng video) và giữ thứ tự; trả về (urls, số bị bỏ)"""
+    seen = set()
+    result = []
+    for url in urls:
+        key = canonical_url_key(url)
+        if key in seen:
+            continue
+        seen.add(key)
+        result.append(url)
+    return result, len(urls) - len(result)
+
+
+class DownloadArchive:
+    """Archive các video đã tải, cùng định dạng --download-archive của yt-dlp.
+
+    Giữ toàn bộ khoá trong một set nên tra cứu O(1), không cần mạng. yt-dlp
+    tự ghi thêm dòng vào file khi tải xong; set được nạp lại khi file đổi.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path=ARCHIVE_FILE):
+        self.path = os.path.abspath(path)
+        self._lock = threading.Lock()
+        self._keys = set()
+        self._mtime = None
+        self._size = 0
+
+    @classmethod
+    def shared(cls):
+        """Archive dùng chung cho DownloadVideo và DownloadWorker"""
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _refresh(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return
+        if stat.st_mtime == self._mtime and stat.st_size == self._size:
+            return
+        offset = 0
+        if stat.st_size > self._size and self._mtime is not None:
+            # File chỉ được ghi nối thêm: đọc phần mới
+            offset = self._size
+        with open(self.path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+        # Bỏ dòng cuối chưa ghi xong, sẽ đọc lại ở lần sau
+        complete = data.rfind(b"\n") + 1
+        lines = data[:complete].decode("utf-8", "ignore").splitlines()
+        self._keys.update(line.strip() for line in lines if line.strip())
+        self._mtime = stat.st_mtime
+        self._size = offset + complete
+
+    def contains_key(self, key):
+        with self._lock:
+            self._refresh()
+            return key in self._keys
+
+    def contains(self, url):
+        """URL đã có trong archive? (chỉ với URL nhận ra được id)"""
+        video = canonical_video_id(url)
+        if not video:
+            return False
+        return self.contains_key(f"{video[0]} {video[1]}")
+
+    def contains_entry(self, extractor, video_id):
+        if not extractor or not video_id:
+            return False
+        return self.contains_key(f"{extractor.lower()} {video_id}")
+
+    def add(self, extractor, video_id):
+        """Ghi thêm một video (khi yt-dlp không tự ghi, vd: bị bỏ qua)"""
+        if not extractor or not video_id:
+            return
+        key = f"{extractor.lower()} {video_id}"
+        with self._lock:
+            self._refresh()
+            if key in self._keys:
+                return
+            with open(self.path, "a", encoding="utf-8") as f:
+                f.write(key + "\n")
+            self._keys.add(key)
+
+    def ytdlp_args(self):
+        """Tham số để yt-dlp ghi video đã tải vào cùng file archive"""
+        return ["--download-archive", self.path]
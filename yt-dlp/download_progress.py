@@ -0,0 +1,175 @@
+import threading
+import time
+
+
+class _JobProgress:
+    """Tiến trình của một job (có thể gồm nhiều luồng: video + audio)"""
+
+    def __init__(self, expected_bytes=0):
+        self.expected_bytes = expected_bytes or 0
+        self.finished_bytes = 0      # Tổng byte các luồng đã tải xong
+        self.current_done = 0
+        self.current_total = 0
+        self.speed = 0.0
+        self.phase = "queued"
+        self.fragment_index = None
+        self.fragment_count = None
+        self.active = False
+        self.done = False
+
+    def done_bytes(self):
+        return self.finished_bytes + self.current_done
+
+    def total_bytes(self):
+        known = self.finished_bytes + self.current_total
+        return max(known, self.expected_bytes, self.done_bytes())
+
+
+class ProgressAggregator:
+    """Gộp tiến trình của mọi job thành một % và ETA chung, tính theo byte.
+
+    Thread-safe: các worker gọi update() trực tiếp, GUI đọc snapshot() theo
+    timer nên không phát signal cho từng dòng tiến trình.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._jobs = {}
+        self._started = time.monotonic()
+
+    def reset(self):
+        with self._lock:
+            self._jobs.clear()
+            self._started = time.monotonic()
+
+    def add_job(self, job_id, expected_bytes=0):
+        """Đăng ký job đang chờ (chưa biết kích thước thì để 0)"""
+        with self._lock:
+            self._jobs[job_id] = _JobProgress(expected_bytes)
+
+    def remove_job(self, job_id):
+        """Bỏ job khỏi phép tính (lỗi hoặc bị huỷ)"""
+        with self._lock:
+            self._jobs.pop(job_id, None)
+
+    def set_expected(self, job_id, expected_bytes):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job and expected_bytes:
+                job.expected_bytes = expected_bytes
+
+    def update(self, job_id, progress):
+        """Cập nhật từ dict tiến trình của yt-dlp (download)"""
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            job.active = True
+            job.phase = "download"
+            done = progress.get("downloaded_bytes") or 0
+            total = (progress.get("total_bytes")
+                     or progress.get("total_bytes_estimate") or 0)
+            if progress.get("status") == "finished":
+                # Hết một luồng (vd: video xong, tiếp theo là audio)
+                job.finished_bytes += max(done, total)
+                job.current_done = 0
+                job.current_total = 0
+                job.speed = 0.0
+                return
+            job.current_done = done
+            job.current_total = total
+            job.speed = progress.get("speed") or 0.0
+            job.fragment_index = progress.get("fragment_index")
+            job.fragment_count = progress.get("fragment_count")
+
+    def set_phase(self, job_id, phase):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                job.phase = phase
+                job.speed = 0.0
+
+    def finish_job(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job:
+                total = job.total_bytes()
+                job.finished_bytes = total
+                job.current_done = job.current_total = 0
+                job.expected_bytes = total
+                job.speed = 0.0
+                job.active = False
+                job.done = True
+                job.phase = "done"
+
+    def job_percent(self, job_id):
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if not job:
+                return 0
+            total = job.total_bytes()
+            return int(job.done_bytes() * 100 / total) if total else 0
+
+    def snapshot(self):
+        """Trả về dict: percent, eta (giây hoặc None), speed, active, queued, done"""
+        # Chép giá trị trong lock (worker ghi từ thread slot), tính toán ngoài lock
+        with self._lock:
+            jobs = [(j.done_bytes(), j.total_bytes(), j.speed, j.done, j.active)
+                    for j in self._jobs.values()]
+            started = self._started
+        known = [total for _, total, _, _, _ in jobs if total > 0]
+        average = sum(known) / len(known) if known else 0
+        done_bytes = 0
+        total_bytes = 0
+        speed = 0.0
+        active = queued = finished = 0
+        for job_done, job_total, job_speed, is_done, is_active in jobs:
+            done_bytes += job_done
+            total_bytes += job_total or average
+            speed += job_speed
+            if is_done:
+                finished += 1
+            elif is_active:
+                active += 1
+            else:
+                queued += 1
+        percent = 0.0
+        if total_bytes > 0:
+            percent = min(done_bytes * 100.0 / total_bytes, 100.0)
+        elif jobs:
+            percent = finished * 100.0 / len(jobs)
+        eta = None
+        if speed > 0 and total_bytes > 0:
+            eta = max(total_bytes - done_bytes, 0) / speed
+        return {
+            "percent": percent,
+            "eta": eta,
+            "speed": speed,
+            "done_bytes": done_bytes,
+            "total_bytes": total_bytes,
+            "active": active,
+            "queued": queued,
+            "done": finished,
+            "elapsed": time.monotonic() - started,
+        }
+
+
+def format_bytes(value):
+    """Định dạng số byte dễ đọc"""
+    value = float(value or 0)
+    for unit in ("B", "KB", "MB", "GB"):
+        if value < 1024:
+            return f"{value:.1f} {unit}"
+        value /= 1024
+    return f"{value:.1f} TB"
+
+
+def format_eta(seconds):
+    if seconds is None:
+        return "--:--"
+    seconds = int(seconds)
+    hours, rest = divmod(seconds, 3600)
+    minutes, secs = divmod(rest, 60)
+    if hours:
+        return f"{hours}:{minutes:02d}:{secs:02d}"
+    return f"{minutes:02d}:{secs:02d}"
@@ -0,0 +1,164 @@
+import json
+import sqlite3
+import threading
+import time
+
+QUEUE_DB = "download_queue.db"
+
+BATCH_ACTIVE = "active"
+BATCH_DONE = "done"
+BATCH_STOPPED = "stopped"
+
+# Đã tải xong nhưng còn bước ffmpeg ở pool CPU (options["postprocess"])
+JOB_POSTPROCESS = "postprocess"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS batches (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    folder TEXT NOT NULL,
+    urls TEXT NOT NULL,
+    options TEXT NOT NULL,
+    expanded INTEGER NOT NULL DEFAULT 0,
+    state TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS jobs (
+    batch_id INTEGER NOT NULL,
+    video_index INTEGER NOT NULL,
+    url TEXT NOT NULL,
+    options TEXT NOT NULL DEFAULT '{}',
+    state TEXT NOT NULL,
+    updated_at REAL NOT NULL,
+    PRIMARY KEY (batch_id, video_index)
+);
+CREATE INDEX IF NOT EXISTS idx_jobs_state ON jobs (batch_id, state);
+CREATE INDEX IF NOT EXISTS idx_batches_state ON batches (state);
+"""
+
+
+class DownloadQueueStore:
+    """Nhật ký hàng đợi tải trên SQLite để khôi phục sau khi app bị tắt/crash.
+
+    Mỗi job có một trạng thái (queued/running/postprocess/done/failed/stopped).
+    Lô tải còn "active" khi mở app lại nghĩa là chưa kết thúc, có thể tải tiếp.
+    """
+
+    def __init__(self, path=QUEUE_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def create_batch(self, folder, urls, options):
+        with self._lock, self._conn:
+            cursor = self._conn.execute(
+                "INSERT INTO batches (created_at, folder, urls, options, state)"
+                " VALUES (?, ?, ?, ?, ?)",
+                (time.time(), folder, json.dumps(urls), json.dumps(options),
+                 BATCH_ACTIVE))
+            return cursor.lastrowid
+
+    def add_jobs(self, batch_id, rows):
+        """rows: danh sách (video_index, url, options dict)"""
+        if not rows:
+            return
+        now = time.time()
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR IGNORE INTO jobs"
+                " (batch_id, video_index, url, options, state, updated_at)"
+                " VALUES (?, ?, ?, ?, 'queued', ?)",
+                [(batch_id, index, url, json.dumps(options), now)
+                 for index, url, options in rows])
+
+    def set_job_state(self, batch_id, video_index, state):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, updated_at = ?"
+                " WHERE batch_id = ? AND video_index = ?",
+                (state, time.time(), batch_id, video_index))
+
+    def set_job_postprocess(self, batch_id, video_index, tasks, info=None):
+        """Ghi các bước ffmpeg còn chờ của job đã tải xong (tải tiếp sẽ chạy lại)"""
+        with self._lock, self._conn:
+            row = self._conn.execute(
+                "SELECT options FROM jobs WHERE batch_id = ? AND video_index = ?",
+                (batch_id, video_index)).fetchone()
+            if row is None:
+                return
+            options = dict(json.loads(row[0]),
+                           postprocess=[[kind, list(sources)] for kind, sources in tasks],
+                           info=info)
+            self._conn.execute(
+                "UPDATE jobs SET state = ?, options = ?, updated_at = ?"
+                " WHERE batch_id = ? AND video_index = ?",
+                (JOB_POSTPROCESS, json.dumps(options), time.time(),
+                 batch_id, video_index))
+
+    def set_expanded(self, batch_id):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE batches SET expanded = 1 WHERE id = ?", (batch_id,))
+
+    def finish_batch(self, batch_id, state=BATCH_DONE):
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE batches SET state = ? WHERE id = ?", (state, batch_id))
+
+    def find_unfinished_batch(self):
+        """Lô tải gần nhất chưa kết thúc, kèm thống kê job; None nếu không có"""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT id, created_at, folder, urls, options, expanded"
+                " FROM batches WHERE state = ? ORDER BY id DESC LIMIT 1",
+                (BATCH_ACTIVE,)).fetchone()
+            if row is None:
+                return None
+            counts = dict(self._conn.execute(
+                "SELECT state, COUNT(*) FROM jobs WHERE batch_id = ?"
+                " GROUP BY state", (row[0],)).fetchall())
+        return {
+            "id": row[0],
+            "created_at": row[1],
+            "folder": row[2],
+            "urls": json.loads(row[3]),
+            "options": json.loads(row[4]),
+            "expanded": bool(row[5]),
+            "counts": counts,
+        }
+
+    def pending_jobs(self, batch_id):
+        """Các job chưa xong (đang chờ, đang chạy dở hoặc còn bước ffmpeg khi app tắt)"""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT video_index, url, options FROM jobs"
+                " WHERE batch_id = ? AND state IN ('queued', 'running', ?)"
+                " ORDER BY video_index", (batch_id, JOB_POSTPROCESS)).fetchall()
+        return [(index, url, json.loads(options)) for index, url, options in rows]
+
+    def job_urls(self, batch_id):
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT url FROM jobs WHERE batch_id = ?", (batch_id,)).fetchall()
+        return [row[0] for row in rows]
+
+    def max_index(self, batch_id):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT MAX(video_index) FROM jobs WHERE batch_id = ?",
+                (batch_id,)).fetchone()
+        return row[0] or 0
+
+    def discard_unfinished(self):
+        """Người dùng không muốn tải tiếp: đóng mọi lô còn dở"""
+        with self._lock, self._conn:
+            self._conn.execute(
+                "UPDATE batches SET state = ? WHERE state = ?",
+                (BATCH_STOPPED, BATCH_ACTIVE))
@@ -0,0 +1,157 @@
+import hashlib
+import json
+import os
+import re
+import threading
+import time
+
+from download_archive import canonical_url_key, canonical_video_id
+
+INFO_CACHE_DIR = "info_cache"
+INDEX_FILE = "index.json"
+# Link định dạng của YouTube hết hạn sau ~6 giờ nên info JSON chỉ dùng trong 4 giờ
+INFO_TTL = 4 * 3600
+MAX_CACHE_BYTES = 200 * 1024 * 1024
+MAX_SUMMARIES = 5000
+
+_UNSAFE_RE = re.compile(r"[^A-Za-z0-9_-]")
+
+
+def cache_key(url):
+    """Khoá cache theo id video chuẩn (giống archive), URL lạ thì băm URL chuẩn hoá"""
+    video = canonical_video_id(url)
+    if video:
+        return _UNSAFE_RE.sub("_", f"{video[0]}_{video[1]}")
+    digest = hashlib.sha1(canonical_url_key(url).encode("utf-8")).hexdigest()
+    return f"url_{digest[:20]}"
+
+
+class InfoCache:
+    """Cache info JSON của yt-dlp, giới hạn dung lượng + TTL.
+
+    yt-dlp tự ghi file (--write-info-json) trong lần tải đầu; các lần sau
+    dùng --load-info-json nên không phải chạy extractor lại. index.json giữ
+    tóm tắt (tiêu đề, thời lượng, dung lượng) để xem trước mà không cần mạng.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, folder=INFO_CACHE_DIR, ttl=INFO_TTL, max_bytes=MAX_CACHE_BYTES):
+        self.folder = os.path.abspath(folder)
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._index = {}
+        os.makedirs(self.folder, exist_ok=True)
+        self._load_index()
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def _index_path(self):
+        return os.path.join(self.folder, INDEX_FILE)
+
+    def _load_index(self):
+        try:
+            with open(self._index_path(), encoding="utf-8") as f:
+                self._index = json.load(f)
+        except (OSError, ValueError):
+            self._index = {}
+
+    def _save_index(self):
+        path = self._index_path()
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(self._index, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def info_path(self, url):
+        return os.path.join(self.folder, cache_key(url) + ".info.json")
+
+    def output_template(self, url):
+        """Template -o infojson: để yt-dlp ghi info JSON thẳng vào cache"""
+        return "infojson:" + os.path.join(self.folder, cache_key(url)).replace("%", "%%")
+
+    def fresh_path(self, url):
+        """Đường dẫn info JSON còn hạn, None nếu chưa có hoặc đã hết hạn"""
+        key = cache_key(url)
+        with self._lock:
+            entry = self._index.get(key)
+            if not entry or not entry.get("info_bytes"):
+                return None
+            path = os.path.join(self.folder, key + ".info.json")
+            if time.time() - entry.get("info_at", 0) > self.ttl or not os.path.exists(path):
+                return None
+            return path
+
+    def summary(self, url):
+        """Tóm tắt đã biết của URL (title, duration, filesize_approx), hoặc None"""
+        with self._lock:
+            entry = self._index.get(cache_key(url))
+            return dict(entry) if entry else None
+
+    def remember(self, url, meta, adopt_info=False):
+        """Lưu tóm tắt từ metadata; adopt_info=True khi yt-dlp vừa ghi info JSON"""
+        self.remember_many([(url, meta)], adopt_info)
+
+    def remember_many(self, items, adopt_info=False):
+        """Lưu tóm tắt cho nhiều (url, meta) cùng lúc, ghi index một lần"""
+        now = time.time()
+        with self._lock:
+            for url, meta in items:
+                key = cache_key(url)
+                entry = self._index.get(key, {})
+                for field in ("title", "duration", "filesize_approx"):
+                    if meta.get(field) is not None:
+                        entry[field] = meta[field]
+                entry["seen_at"] = now
+                if adopt_info:
+                    path = os.path.join(self.folder, key + ".info.json")
+                    try:
+                        entry["info_bytes"] = os.path.getsize(path)
+                        entry["info_at"] = now
+                    except OSError:
+                        pass
+                self._index[key] = entry
+            self._evict()
+            self._save_index()
+
+    def invalidate(self, url):
+        """Bỏ info JSON (vd: link định dạng đã hết hạn), giữ lại tóm tắt"""
+        key = cache_key(url)
+        with self._lock:
+            entry = self._index.get(key)
+            if entry:
+                entry.pop("info_bytes", None)
+                entry.pop("info_at", None)
+                self._save_index()
+            self._remove_file(key)
+
+    def _remove_file(self, key):
+        try:
+            os.remove(os.path.join(self.folder, key + ".info.json"))
+        except OSError:
+            pass
+
+    def _evict(self):
+        """Xoá info JSON hết hạn/cũ nhất khi vượt dung lượng, giới hạn số tóm tắt"""
+        now = time.time()
+        with_info = sorted((e.get("info_at", 0), k) for k, e in self._index.items()
+                           if e.get("info_bytes"))
+        total = sum(self._index[k]["info_bytes"] for _, k in with_info)
+        for info_at, key in with_info:
+            if total <= self.max_bytes and now - info_at <= self.ttl:
+                continue
+            total -= self._index[key].pop("info_bytes")
+            self._index[key].pop("info_at", None)
+            self._remove_file(key)
+        if len(self._index) > MAX_SUMMARIES:
+            oldest = sorted(self._index, key=lambda k: self._index[k].get("seen_at", 0))
+            for key in oldest[:len(self._index) - MAX_SUMMARIES]:
+                if self._index[key].get("info_bytes"):
+                    self._remove_file(key)
+                del self._index[key]
@@ -0,0 +1,413 @@
+import heapq
+import itertools
+import threading
+import time
+
+from PySide6.QtCore import QObject, QThread, Signal
+
+
+class Job:
+    """Một công việc trong hàng đợi của JobScheduler"""
+
+    QUEUED = "queued"
+    RUNNING = "running"
+    PAUSED = "paused"
+    DONE = "done"
+    FAILED = "failed"
+    STOPPED = "stopped"
+    RETRY = "retry"     # Chỉ dùng làm kết quả của job_runner: xếp lại sau retry_delay
+
+    def __init__(self, job_id, url, video_index, priority=0, **options):
+        self.job_id = job_id
+        self.url = url
+        self.video_index = video_index
+        self.priority = priority
+        self.options = options
+        self.state = Job.QUEUED
+        self.slot_id = None
+        self.worker = None          # Đối tượng đang chạy job (có hàm stop(cleanup))
+        self.stop_flag = False
+        self.cleanup_on_stop = True     # Huỷ bởi người dùng: xoá file tải dở
+        self.stop_requested_at = None
+        self.stop_latency = None        # Giây từ lúc yêu cầu dừng tới khi slot rảnh
+        self.attempt = 0            # Số lần đã bắt đầu chạy
+        self.not_before = 0.0       # time.monotonic() sớm nhất được chạy lại
+        self.retry_delay = 0.0      # job_runner đặt khi trả về Job.RETRY
+        self.error_kind = None
+        self.error_message = ""
+        self._entry_version = 0     # Dùng để bỏ qua các entry cũ trong heap
+
+
+class _SlotThread(QThread):
+    """Thread sống lâu, lấy job từ scheduler và chạy lần lượt"""
+
+    def __init__(self, scheduler, slot_id):
+        super().__init__()
+        self.scheduler = scheduler
+        self.slot_id = slot_id
+
+    def run(self):
+        while True:
+            job = self.scheduler._take_job(self.slot_id)
+            if job is None:
+                return
+            self.scheduler._run_job(job, self.slot_id)
+
+
+class JobScheduler(QObject):
+    """Hàng đợi ưu tiên + pool thread cố định cho các job tải.
+
+    `job_runner(job, slot_id)` được gọi trong thread của slot, chạy đồng bộ
+    và trả về trạng thái cuối của job (Job.DONE / Job.FAILED / Job.STOPPED),
+    hoặc Job.RETRY (kèm job.retry_delay) để xếp lại job sau một khoảng chờ.
+
+    Vòng đời: mỗi lần chạy, slot luôn được trả lại đúng một lần dù runner
+    trả về, lỗi hay ném exception. Mỗi job phát job_finished đúng một lần
+    khi kết thúc hẳn; mỗi lần thử lại phát job_retrying.
+    """
+
+    job_started = Signal(int, int)          # job_id, slot_id
+    job_finished = Signal(int, int, str)    # job_id, slot_id, state
+    job_retrying = Signal(int, int, float)  # job_id, slot_id, delay (giây)
+    all_finished = Signal()
+
+    def __init__(self, job_runner, max_workers=4, parent=None, admission=None):
+        super().__init__(parent)
+        self.job_runner = job_runner
+        # Bộ kiểm soát tuỳ chọn: try_admit(job) -> bool, release(job),
+        # defer_key(job) (tuỳ chọn) -> nhóm chờ của job bị từ chối (vd: host)
+        self.admission = admission
+        self._cond = threading.Condition()
+        self._heap = []
+        # Job bị admission từ chối, gom theo defer_key; trả lại heap khi nhóm có chỗ
+        self._deferred = {}
+        self._seq = itertools.count()
+        self._ids = itertools.count(1)
+        self._jobs = {}
+        self._queued = 0
+        self._running = 0
+        self._max_workers = max(1, int(max_workers))
+        self._slots = {}
+        self._shutdown = False
+        # Thống kê sử dụng từng slot
+        self._stats_started = time.monotonic()
+        self._slot_busy = {}
+        self._slot_jobs = {}
+        self._slot_since = {}
+
+    # ----- API công khai (gọi từ GUI thread) -----
+
+    def submit(self, url, video_index, priority=0, **options):
+        """Thêm job vào hàng đợi, trả về Job"""
+        with self._cond:
+            job = Job(next(self._ids), url, video_index, priority, **options)
+            self._jobs[job.job_id] = job
+            self._push(job)
+            self._queued += 1
+            self._ensure_slots()
+            self._cond.notify_all()
+        return job
+
+    def get_job(self, job_id):
+        return self._jobs.get(job_id)
+
+    def set_max_workers(self, value):
+        """Đổi số luồng tối đa, có hiệu lực ngay cả khi đang chạy"""
+        with self._cond:
+            self._max_workers = max(1, int(value))
+            self._ensure_slots()
+            self._cond.notify_all()
+
+    def max_workers(self):
+        return self._max_workers
+
+    def set_priority(self, job_id, priority):
+        """Đổi độ ưu tiên của job đang chờ (số lớn chạy trước)"""
+        with self._cond:
+            return self._set_priority(job_id, priority)
+
+    def move_to_front(self, job_id):
+        """Đưa job lên đầu hàng đợi"""
+        with self._cond:
+            top = max((j.priority for j in self._jobs.values()
+                       if j.state == Job.QUEUED), default=0)
+            return self._set_priority(job_id, top + 1)
+
+    def pause(self, job_id):
+        """Tạm giữ job đang chờ, job sẽ không được chạy cho tới khi resume"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state != Job.QUEUED:
+                return False
+            job.state = Job.PAUSED
+            job._entry_version += 1
+            return True
+
+    def resume(self, job_id):
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job or job.state != Job.PAUSED:
+                return False
+            job.state = Job.QUEUED
+            self._push(job)
+            self._cond.notify_all()
+            return True
+
+    def cancel(self, job_id):
+        """Huỷ một job: bỏ khỏi hàng đợi hoặc dừng nếu đang chạy"""
+        with self._cond:
+            job = self._jobs.get(job_id)
+            if not job:
+                return False
+            if job.state in (Job.QUEUED, Job.PAUSED):
+                job.state = Job.STOPPED
+                job._entry_version += 1
+                self._queued -= 1
+                finished = self._is_idle()
+            elif job.state == Job.RUNNING:
+                self._request_stop(job, cleanup=True)
+                return True
+            else:
+                return False
+        self.job_finished.emit(job.job_id, 0, Job.STOPPED)
+        if finished:
+            self.all_finished.emit()
+        return True
+
+    def stop_all(self, cleanup=True):
+        """Huỷ toàn bộ job đang chờ và đang chạy.
+
+        cleanup=False giữ lại file tải dở (dùng khi đóng app để tải tiếp).
+        """
+        cancelled = []
+        with self._cond:
+            for job in self._jobs.values():
+                if job.state in (Job.QUEUED, Job.PAUSED):
+                    job.state = Job.STOPPED
+                    job._entry_version += 1
+                    cancelled.append(job.job_id)
+                elif job.state == Job.RUNNING:
+                    self._request_stop(job, cleanup)
+            self._heap.clear()
+            self._deferred.clear()
+            self._queued = 0
+            finished = self._is_idle()
+        # Giống cancel(): job bị bỏ khỏi hàng đợi cũng kết thúc hẳn
+        for job_id in cancelled:
+            self.job_finished.emit(job_id, 0, Job.STOPPED)
+        if finished:
+            self.all_finished.emit()
+
+    def requeue_deferred(self):
+        """Đưa mọi job đang chờ admission về hàng đợi (gọi khi nới giới hạn)"""
+        with self._cond:
+            for entries in self._deferred.values():
+                for entry in entries:
+                    heapq.heappush(self._heap, entry)
+            self._deferred.clear()
+            self._cond.notify_all()
+
+    def running_count(self):
+        with self._cond:
+            return self._running
+
+    def queued_count(self):
+        """Số job đang chờ (kể cả tạm giữ)"""
+        with self._cond:
+            return self._queued
+
+    def pending_count(self):
+        """Số job còn chờ (kể cả tạm giữ) + đang chạy"""
+        with self._cond:
+            return self._queued + self._running
+
+    def clear_finished(self):
+        """Giải phóng các job đã kết thúc khỏi bộ nhớ"""
+        with self._cond:
+            for job_id in [j.job_id for j in self._jobs.values()
+                           if j.state in (Job.DONE, Job.FAILED, Job.STOPPED)]:
+                del self._jobs[job_id]
+
+    def reset_stats(self):
+        with self._cond:
+            now = time.monotonic()
+            self._stats_started = now
+            self._slot_busy = {slot_id: 0.0 for slot_id in self._slots}
+            self._slot_jobs = {slot_id: 0 for slot_id in self._slots}
+            for slot_id in self._slot_since:
+                self._slot_since[slot_id] = now
+
+    def slot_utilisation(self):
+        """Tỉ lệ thời gian bận của từng slot kể từ lần reset_stats gần nhất"""
+        with self._cond:
+            now = time.monotonic()
+            elapsed = max(now - self._stats_started, 1e-6)
+            result = []
+            for slot_id in sorted(self._slots):
+                busy = self._slot_busy.get(slot_id, 0.0)
+                since = self._slot_since.get(slot_id)
+                if since is not None:
+                    busy += now - since
+                result.append({
+                    "slot": slot_id,
+                    "jobs": self._slot_jobs.get(slot_id, 0),
+                    "busy": busy,
+                    "utilisation": min(busy / elapsed, 1.0),
+                })
+            return result
+
+    def shutdown(self, timeout_ms=3000):
+        """Dừng mọi job và kết thúc các thread slot"""
+        self.stop_all(cleanup=False)
+        with self._cond:
+            self._shutdown = True
+            self._cond.notify_all()
+        for slot in list(self._slots.values()):
+            slot.wait(timeout_ms)
+
+    # ----- Nội bộ -----
+
+    def _request_stop(self, job, cleanup):
+        job.stop_flag = True
+        job.cleanup_on_stop = cleanup
+        if job.stop_requested_at is None:
+            job.stop_requested_at = time.monotonic()
+        if job.worker is not None:
+            job.worker.stop(cleanup)
+
+    def _set_priority(self, job_id, priority):
+        job = self._jobs.get(job_id)
+        if not job or job.state != Job.QUEUED:
+            return False
+        job.priority = priority
+        self._push(job)
+        self._cond.notify_all()
+        return True
+
+    def _push(self, job):
+        job._entry_version += 1
+        heapq.heappush(self._heap, (-job.priority, next(self._seq),
+                                    job._entry_version, job))
+
+    def _ensure_slots(self):
+        for slot_id in range(1, self._max_workers + 1):
+            if slot_id not in self._slots:
+                slot = _SlotThread(self, slot_id)
+                self._slots[slot_id] = slot
+                self._slot_busy.setdefault(slot_id, 0.0)
+                self._slot_jobs.setdefault(slot_id, 0)
+                slot.start()
+
+    def _pop_runnable(self):
+        """Lấy job chạy được, trả về (job, thời gian chờ tới job hẹn giờ sớm nhất)"""
+        skipped = []
+        found = None
+        wake = None
+        now = time.monotonic()
+        while self._heap:
+            entry = heapq.heappop(self._heap)
+            _, _, version, job = entry
+            if job.state != Job.QUEUED or version != job._entry_version:
+                continue
+            if job.not_before > now:
+                # Đang chờ backoff trước khi thử lại
+                skipped.append(entry)
+                wait = job.not_before - now
+                wake = wait if wake is None else min(wake, wait)
+                continue
+            if self.admission is not None and not self.admission.try_admit(job):
+                # Chưa được phép chạy (vd: host đã đủ kết nối): cất riêng theo nhóm để
+                # lần đánh thức sau không phải duyệt lại cả nghìn job cùng host
+                key = self._defer_key(job)
+                if key is None:
+                    skipped.append(entry)
+                else:
+                    heapq.heappush(self._deferred.setdefault(key, []), entry)
+                continue
+            found = job
+            break
+        for entry in skipped:
+            heapq.heappush(self._heap, entry)
+        return found, wake
+
+    def _defer_key(self, job):
+        defer_key = getattr(self.admission, "defer_key", None)
+        return defer_key(job) if defer_key is not None else None
+
+    def _release_deferred(self, job):
+        """Job vừa trả chỗ: đưa job chờ tốt nhất cùng nhóm về heap (gọi trong lock)"""
+        key = self._defer_key(job)
+        entries = self._deferred.get(key)
+        while entries:
+            entry = heapq.heappop(entries)
+            _, _, version, waiting = entry
+            if waiting.state == Job.QUEUED and version == waiting._entry_version:
+                heapq.heappush(self._heap, entry)
+                break
+        if not entries:
+            self._deferred.pop(key, None)
+
+    def _is_idle(self):
+        return self._queued == 0 and self._running == 0
+
+    def _take_job(self, slot_id):
+        """Chặn cho tới khi slot được phép chạy job tiếp theo"""
+        with self._cond:
+            while True:
+                if self._shutdown:
+                    return None
+                wake = None
+                if slot_id <= self._max_workers:
+                    job, wake = self._pop_runnable()
+                    if job is not None:
+                        job.state = Job.RUNNING
+                        job.slot_id = slot_id
+                        job.attempt += 1
+                        self._queued -= 1
+                        self._running += 1
+                        self._slot_jobs[slot_id] = self._slot_jobs.get(slot_id, 0) + 1
+                        self._slot_since[slot_id] = time.monotonic()
+                        return job
+                self._cond.wait(wake)
+
+    def _run_job(self, job, slot_id):
+        self.job_started.emit(job.job_id, slot_id)
+        state = Job.FAILED
+        try:
+            state = self.job_runner(job, slot_id) or Job.DONE
+        except Exception as e:
+            state = Job.FAILED
+            job.error_message = repr(e)
+        finally:
+            if self.admission is not None:
+                self.admission.release(job)
+            with self._cond:
+                if self.admission is not None:
+                    self._release_deferred(job)
+                if job.stop_flag:
+                    state = Job.STOPPED
+                    if job.stop_requested_at is not None:
+                        job.stop_latency = time.monotonic() - job.stop_requested_at
+                retry = state == Job.RETRY and not self._shutdown
+                if retry:
+                    job.state = Job.QUEUED
+                    job.not_before = time.monotonic() + job.retry_delay
+                    self._queued += 1
+                    self._push(job)
+                else:
+                    state = Job.FAILED if state == Job.RETRY else state
+                    job.state = state
+                job.worker = None
+                self._running -= 1
+                since = self._slot_since.pop(slot_id, None)
+                if since is not None:
+                    self._slot_busy[slot_id] = (self._slot_busy.get(slot_id, 0.0)
+                                                + time.monotonic() - since)
+                finished = self._is_idle()
+                self._cond.notify_all()
+            if retry:
+                self.job_retrying.emit(job.job_id, slot_id, job.retry_delay)
+            else:
+                self.job_finished.emit(job.job_id, slot_id, state)
+            if finished:
+                self.all_finished.emit()
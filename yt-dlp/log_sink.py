@@ -0,0 +1,180 @@
+import collections
+import logging
+import logging.handlers
+import os
+import queue
+import threading
+import time
+
+from PySide6.QtCore import QAbstractListModel, QModelIndex, QObject, Qt, QTimer
+from PySide6.QtGui import QColor
+
+LOG_DIR = "logs"
+LOG_FILE = "downloader.log"
+LOG_MAX_BYTES = 5 * 1024 * 1024
+LOG_BACKUP_COUNT = 5
+
+LEVEL_COLORS = {
+    "info": "#05df60",
+    "warning": "orange",
+    "error": "red",
+    "blue": "#4a5568",
+}
+
+
+class LogEntry:
+    __slots__ = ("text", "level", "key")
+
+    def __init__(self, text, level="", key=None):
+        self.text = text
+        self.level = level
+        self.key = key
+
+
+class LogListModel(QAbstractListModel):
+    """Model log dạng ring buffer: chỉ giữ N dòng cuối"""
+
+    # Số dòng cuối được quét để thay thế dòng tiến trình cùng key
+    REPLACE_WINDOW = 64
+
+    def __init__(self, max_lines=5000, parent=None):
+        super().__init__(parent)
+        self.max_lines = max_lines
+        self._rows = collections.deque()
+        self._colors = {level: QColor(color)
+                        for level, color in LEVEL_COLORS.items()}
+
+    def rowCount(self, parent=QModelIndex()):
+        if parent.isValid():
+            return 0
+        return len(self._rows)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid() or index.row() >= len(self._rows):
+            return None
+        entry = self._rows[index.row()]
+        if role == Qt.DisplayRole:
+            return entry.text
+        if role == Qt.ForegroundRole:
+            return self._colors.get(entry.level)
+        return None
+
+    def clear(self):
+        self.beginResetModel()
+        self._rows.clear()
+        self.endResetModel()
+
+    def append_batch(self, entries):
+        """Thêm một lô dòng log; dòng có key thay thế dòng cùng key gần nhất"""
+        new_rows = []
+        for entry in entries:
+            if entry.key is not None and self._replace(entry):
+                continue
+            new_rows.append(entry)
+        if not new_rows:
+            return
+
+        overflow = len(self._rows) + len(new_rows) - self.max_lines
+        if overflow > 0:
+            drop_old = min(overflow, len(self._rows))
+            if drop_old:
+                self.beginRemoveRows(QModelIndex(), 0, drop_old - 1)
+                for _ in range(drop_old):
+                    self._rows.popleft()
+                self.endRemoveRows()
+            new_rows = new_rows[-self.max_lines:]
+
+        first = len(self._rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(new_rows) - 1)
+        self._rows.extend(new_rows)
+        self.endInsertRows()
+
+    def _replace(self, entry):
+        count = len(self._rows)
+        for offset in range(1, min(self.REPLACE_WINDOW, count) + 1):
+            row = count - offset
+            if self._rows[row].key == entry.key:
+                self._rows[row] = entry
+                index = self.index(row)
+                self.dataChanged.emit(index, index)
+                return True
+        return False
+
+
+class LogSink(QObject):
+    """Gom log từ mọi thread, đẩy lên model theo nhịp khung hình cố định.
+
+    write() gọi được từ bất kỳ thread nào và không phát signal; GUI thread
+    lấy cả lô theo QTimer. Mọi dòng đều được ghi ra file log xoay vòng.
+    """
+
+    def __init__(self, model, view=None, fps=30, log_dir=LOG_DIR, parent=None):
+        super().__init__(parent)
+        self.model = model
+        self.view = view
+        self._lock = threading.Lock()
+        self._pending = []
+        self._pending_keys = {}
+        self._file_queue = queue.SimpleQueue()
+        self._file_logger, self._listener = self._create_file_logger(log_dir)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(int(1000 / fps))
+        self._timer.timeout.connect(self.flush)
+        self._timer.start()
+
+    def _create_file_logger(self, log_dir):
+        logger = logging.getLogger("ht_downloader")
+        logger.setLevel(logging.INFO)
+        logger.propagate = False
+        try:
+            os.makedirs(log_dir, exist_ok=True)
+            handler = logging.handlers.RotatingFileHandler(
+                os.path.join(log_dir, LOG_FILE), maxBytes=LOG_MAX_BYTES,
+                backupCount=LOG_BACKUP_COUNT, encoding="utf-8")
+        except OSError:
+            return None, None
+        handler.setFormatter(logging.Formatter("%(message)s"))
+        # Ghi file trong thread riêng, không chặn worker hay GUI
+        listener = logging.handlers.QueueListener(self._file_queue, handler)
+        listener.start()
+        logger.handlers = [logging.handlers.QueueHandler(self._file_queue)]
+        return logger, listener
+
+    def write(self, message, level="", key=None):
+        """Ghi một dòng log. key != None: dòng tiến trình, thay thế dòng cũ cùng key"""
+        text = f"[{time.strftime('%H:%M:%S')}] {message}"
+        entry = LogEntry(text, level, key)
+        with self._lock:
+            if key is not None and key in self._pending_keys:
+                self._pending[self._pending_keys[key]] = entry
+            else:
+                if key is not None:
+                    self._pending_keys[key] = len(self._pending)
+                self._pending.append(entry)
+        if self._file_logger is not None:
+            self._file_logger.info(f"{text} {level}".rstrip())
+
+    def flush(self):
+        """Đẩy toàn bộ dòng đang chờ lên model (chạy trong GUI thread)"""
+        with self._lock:
+            if not self._pending:
+                return
+            batch = self._pending
+            self._pending = []
+            self._pending_keys = {}
+
+        at_bottom = True
+        if self.view is not None:
+            bar = self.view.verticalScrollBar()
+            at_bottom = bar.value() >= bar.maximum() - 2
+        self.model.append_batch(batch)
+        if self.view is not None and at_bottom:
+            self.view.scrollToBottom()
+
+    def close(self):
+        self._timer.stop()
+        self.flush()
+        if self._listener is not None:
+            self._listener.stop()
+            self._listener = None
@@ -0,0 +1,265 @@
+import hashlib
+import os
+import re
+import sqlite3
+import threading
+import time
+
+from PySide6.QtCore import QThread, Signal
+
+from download_archive import canonical_video_id
+
+LIBRARY_DB = "media_library.db"
+LIBRARY_ROOT = "Video"
+MEDIA_EXTS = (".mp4", ".mkv", ".webm", ".mov", ".m4a", ".mp3", ".opus", ".ogg",
+              ".flac", ".wav", ".aac")
+HASH_CHUNK = 1024 * 1024
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS media (
+    path TEXT PRIMARY KEY,
+    folder TEXT NOT NULL,
+    url TEXT,
+    extractor TEXT,
+    video_id TEXT,
+    title TEXT,
+    size INTEGER NOT NULL,
+    duration REAL,
+    mtime REAL NOT NULL,
+    content_hash TEXT NOT NULL,
+    added_at REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_media_video ON media (extractor, video_id);
+CREATE INDEX IF NOT EXISTS idx_media_hash ON media (content_hash);
+CREATE INDEX IF NOT EXISTS idx_media_url ON media (url);
+"""
+
+_FTS_SCHEMA = "CREATE VIRTUAL TABLE IF NOT EXISTS media_fts USING fts5(title, path, url)"
+
+_INDEX_PREFIX_RE = re.compile(r"^(playlist\.)?\d+\.")
+
+
+def content_hash(path):
+    """Băm nhanh nội dung: kích thước + 1 MB đầu/giữa/cuối (file nhỏ thì băm cả file).
+
+    Đủ để phát hiện file trùng mà không phải đọc hết video nhiều GB.
+    """
+    size = os.path.getsize(path)
+    digest = hashlib.sha256(str(size).encode())
+    with open(path, "rb") as f:
+        if size <= 3 * HASH_CHUNK:
+            digest.update(f.read())
+        else:
+            for offset in (0, size // 2, size - HASH_CHUNK):
+                f.seek(offset)
+                digest.update(f.read(HASH_CHUNK))
+    return digest.hexdigest()
+
+
+def title_from_filename(name):
+    """'03.Tên video.mp4' -> 'Tên video'"""
+    return _INDEX_PREFIX_RE.sub("", os.path.splitext(name)[0])
+
+
+class MediaLibrary:
+    """Danh mục SQLite của mọi file đã tải: tìm kiếm + phát hiện trùng lặp.
+
+    Cập nhật từng file khi job tải/xử lý xong (add_file) hoặc quét lại thư
+    mục (scan, chỉ băm file mới/đổi). Tìm kiếm dùng FTS5 nếu SQLite hỗ trợ.
+    """
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, path=LIBRARY_DB):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        try:
+            self._conn.execute(_FTS_SCHEMA)
+            self.has_fts = True
+        except sqlite3.OperationalError:
+            self.has_fts = False
+        self._conn.commit()
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def add_file(self, path, url=None, info=None):
+        """Thêm/cập nhật một file (gọi từ thread slot, không phải GUI thread)"""
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+            file_hash = content_hash(path)
+        except OSError:
+            return False
+        info = info or {}
+        extractor = (info.get("extractor_key") or "").lower() or None
+        video_id = info.get("id")
+        if url and not video_id:
+            video = canonical_video_id(url)
+            if video:
+                extractor, video_id = video
+        row = (path, os.path.dirname(path), url, extractor, video_id,
+               info.get("title") or title_from_filename(os.path.basename(path)),
+               stat.st_size, info.get("duration"), stat.st_mtime, file_hash, time.time())
+        with self._lock, self._conn:
+            self._upsert(row)
+        return True
+
+    def _upsert(self, row):
+        self._conn.execute(
+            "INSERT INTO media (path, folder, url, extractor, video_id, title, size,"
+            " duration, mtime, content_hash, added_at) VALUES (?,?,?,?,?,?,?,?,?,?,?)"
+            " ON CONFLICT(path) DO UPDATE SET"
+            " url = COALESCE(excluded.url, url),"
+            " extractor = COALESCE(excluded.extractor, extractor),"
+            " video_id = COALESCE(excluded.video_id, video_id),"
+            " title = excluded.title, size = excluded.size,"
+            " duration = COALESCE(excluded.duration, duration),"
+            " mtime = excluded.mtime, content_hash = excluded.content_hash", row)
+        rowid, title, path, url = self._conn.execute(
+            "SELECT rowid, title, path, url FROM media WHERE path = ?", (row[0],)).fetchone()
+        if self.has_fts:
+            self._conn.execute("DELETE FROM media_fts WHERE rowid = ?", (rowid,))
+            self._conn.execute(
+                "INSERT INTO media_fts (rowid, title, path, url) VALUES (?, ?, ?, ?)",
+                (rowid, title, path, url or ""))
+
+    def remove_paths(self, paths):
+        with self._lock, self._conn:
+            for path in paths:
+                row = self._conn.execute(
+                    "SELECT rowid FROM media WHERE path = ?", (path,)).fetchone()
+                if row is None:
+                    continue
+                self._conn.execute("DELETE FROM media WHERE rowid = ?", (row[0],))
+                if self.has_fts:
+                    self._conn.execute("DELETE FROM media_fts WHERE rowid = ?", (row[0],))
+
+    def scan(self, root=LIBRARY_ROOT, progress=None, stop=None):
+        """Quét thư mục, chỉ băm file mới hoặc đã đổi; xoá file không còn.
+
+        Trả về (số file mới/cập nhật, số file bị xoá).
+        """
+        root = os.path.abspath(root)
+        # File nằm trong root: so khoảng [root/, root0) thay vì LIKE để không
+        # dính thư mục anh em (Video2/) và ký tự %/_ trong tên thư mục
+        prefix = os.path.join(root, "")
+        upper = prefix[:-1] + chr(ord(prefix[-1]) + 1)
+        with self._lock:
+            known = {row["path"]: (row["size"], row["mtime"]) for row in self._conn.execute(
+                "SELECT path, size, mtime FROM media WHERE path >= ? AND path < ?",
+                (prefix, upper))}
+        seen = set()
+        changed = 0
+        for folder, _, names in os.walk(root):
+            for name in names:
+                if stop is not None and stop():
+                    return changed, 0
+                if not name.lower().endswith(MEDIA_EXTS):
+                    continue
+                path = os.path.join(folder, name)
+                seen.add(path)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                if known.get(path) == (stat.st_size, stat.st_mtime):
+                    continue
+                if self.add_file(path):
+                    changed += 1
+                    if progress is not None:
+                        progress(changed, path)
+        missing = [path for path in known if path not in seen]
+        self.remove_paths(missing)
+        return changed, len(missing)
+
+    def _rows(self, sql, params=()):
+        with self._lock:
+            return [dict(row) for row in self._conn.execute(sql, params)]
+
+    def search(self, text, limit=200):
+        """Tìm theo tiêu đề/đường dẫn/URL; chuỗi rỗng trả về file mới nhất"""
+        text = text.strip()
+        if not text:
+            return self._rows("SELECT * FROM media ORDER BY added_at DESC LIMIT ?", (limit,))
+        video = canonical_video_id(text)
+        if video:
+            return self.find_video(*video)
+        if self.has_fts:
+            query = " ".join('"{}"*'.format(token.replace('"', '""'))
+                             for token in text.split())
+            try:
+                return self._rows(
+                    "SELECT m.* FROM media_fts f JOIN media m ON m.rowid = f.rowid"
+                    " WHERE media_fts MATCH ? ORDER BY rank LIMIT ?", (query, limit))
+            except sqlite3.OperationalError:
+                pass
+        pattern = f"%{text}%"
+        return self._rows(
+            "SELECT * FROM media WHERE title LIKE ? OR path LIKE ? OR url LIKE ?"
+            " ORDER BY added_at DESC LIMIT ?", (pattern, pattern, pattern, limit))
+
+    def find_video(self, extractor, video_id):
+        return self._rows(
+            "SELECT * FROM media WHERE extractor = ? AND video_id = ?",
+            (extractor.lower(), video_id))
+
+    def has_url(self, url):
+        """URL đã có file trong thư viện? (theo id video, không cần mạng)"""
+        video = canonical_video_id(url)
+        if video:
+            return bool(self.find_video(*video))
+        return bool(self._rows("SELECT 1 FROM media WHERE url = ? LIMIT 1", (url,)))
+
+    def duplicates(self):
+        """Các nhóm file trùng: cùng id video hoặc cùng nội dung"""
+        groups = []
+        for row in self._rows(
+                "SELECT extractor, video_id FROM media WHERE video_id IS NOT NULL"
+                " GROUP BY extractor, video_id HAVING COUNT(*) > 1"):
+            groups.append(("video", self.find_video(row["extractor"], row["video_id"])))
+        for row in self._rows(
+                "SELECT content_hash FROM media GROUP BY content_hash HAVING COUNT(*) > 1"):
+            groups.append(("content", self._rows(
+                "SELECT * FROM media WHERE content_hash = ?", (row["content_hash"],))))
+        return groups
+
+    def stats(self):
+        with self._lock:
+            count, size = self._conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM media").fetchone()
+        return {"files": count, "bytes": size}
+
+
+class LibraryScanner(QThread):
+    """Quét thư mục Video trong nền rồi báo kết quả về giao diện"""
+    progress_signal = Signal(int, str)
+    finished_signal = Signal(int, int)
+
+    def __init__(self, library, root=LIBRARY_ROOT):
+        super().__init__()
+        self.library = library
+        self.root = root
+        self.stop_flag = False
+
+    def stop(self):
+        self.stop_flag = True
+
+    def run(self):
+        changed, removed = self.library.scan(
+            self.root, progress=self.progress_signal.emit, stop=lambda: self.stop_flag)
+        self.finished_signal.emit(changed, removed)
@@ -0,0 +1,90 @@
+import os
+import subprocess
+
+from PySide6.QtCore import QThread, Signal
+
+from ui_setting import resource_path
+import ytdlp_protocol
+from process_utils import kill_process_tree, popen_group_kwargs
+
+
+class PlaylistExpander(QThread):
+    """Tách playlist/kênh thành từng video bằng --flat-playlist (không tải).
+
+    Các mục được phát theo lô ngay khi yt-dlp liệt kê xong, để scheduler
+    bắt đầu tải song song trong lúc vẫn đang liệt kê phần còn lại.
+    """
+
+    entries_found = Signal(str, list)   # url gốc, danh sách dict mục
+    expand_failed = Signal(str, str)    # url gốc, thông báo lỗi
+    message_signal = Signal(str, str)
+    finished_signal = Signal()
+
+    BATCH_SIZE = 50
+
+    def __init__(self, urls):
+        super().__init__()
+        self.urls = urls
+        self.stop_flag = False
+        self.process = None
+        self.ytdlp_path = resource_path(os.path.join("data", "yt-dlp.exe"))
+
+    def stop(self):
+        self.stop_flag = True
+        if self.process:
+            kill_process_tree(self.process, wait=False)
+
+    def run(self):
+        for url in self.urls:
+            if self.stop_flag:
+                break
+            self._expand(url)
+        self.finished_signal.emit()
+
+    def _expand(self, url):
+        ytdlp_path = "yt-dlp"
+        if os.path.exists(self.ytdlp_path):
+            ytdlp_path = self.ytdlp_path
+
+        cmd = [ytdlp_path, "--encoding", "utf-8", url]
+        cmd += ytdlp_protocol.flat_playlist_args()
+        self.message_signal.emit(f"📃 Đang liệt kê playlist: {url}", "")
+        try:
+            self.process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, bufsize=1, encoding="utf-8",
+                **popen_group_kwargs())
+        except OSError as e:
+            self.expand_failed.emit(url, str(e))
+            return
+
+        batch = []
+        total = 0
+        last_error = ""
+        for line in self.process.stdout:
+            if self.stop_flag:
+                kill_process_tree(self.process)
+                break
+            kind, data = ytdlp_protocol.parse_line(line.strip())
+            if kind == "entry":
+                entry_url = data.get("webpage_url") or data.get("url")
+                if not entry_url:
+                    continue
+                data["entry_url"] = entry_url
+                batch.append(data)
+                if len(batch) >= self.BATCH_SIZE:
+                    total += len(batch)
+                    self.entries_found.emit(url, batch)
+                    batch = []
+            elif kind is None and data.startswith("ERROR"):
+                last_error = data
+        self.process.wait()
+
+        if batch:
+            total += len(batch)
+            self.entries_found.emit(url, batch)
+        if total == 0 and not self.stop_flag:
+            self.expand_failed.emit(
+                url, last_error or "Không tìm thấy video nào trong playlist")
+            return
+        self.message_signal.emit(f"📃 Playlist có {total} video: {url}", "")
@@ -0,0 +1,170 @@
+import os
+import subprocess
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from ui_setting import resource_path
+from process_utils import kill_process_tree, popen_group_kwargs
+
+AUDIO_MP3 = "mp3"                   # yt-dlp chuyển mã MP3 ngay khi tải
+AUDIO_ORIGINAL = "original"         # Giữ luồng âm thanh gốc (m4a/opus), chỉ remux
+AUDIO_ORIGINAL_MP3 = "original+mp3" # Tải âm thanh gốc, chuyển MP3 ở bước riêng
+
+AUDIO_FORMATS = [
+    ("MP3 (chuyển mã khi tải)", AUDIO_MP3),
+    ("⚡ Âm thanh gốc (m4a/opus)", AUDIO_ORIGINAL),
+    ("⚡ Âm thanh gốc + MP3 sau", AUDIO_ORIGINAL_MP3),
+]
+
+TASK_MP3 = "mp3"
+TASK_MERGE = "merge"
+TASK_SUBS = "subs"
+
+# Chế độ pool CPU: tải video và âm thanh thành hai file riêng (dấu "," thay vì
+# "+" nên yt-dlp không merge), đặt tên giống file tạm của yt-dlp (.fNNN.ext)
+DEFERRED_VIDEO_FORMAT = "bv*,ba/b"
+DEFERRED_PARTS_TEMPLATE = "%(title)s.f%(format_id)s.%(ext)s"
+# Không sửa lỗi container (fixup) trong slot tải, không ghi đè file đã xử lý
+DEFERRED_ARGS = ["--fixup", "never", "--no-post-overwrites"]
+
+SUBTITLE_EXTS = (".vtt", ".ass", ".ttml", ".srv1", ".srv2", ".srv3")
+AUDIO_EXTS = (".m4a", ".webm", ".opus", ".ogg", ".mp3", ".aac", ".mka", ".flac", ".mp4")
+
+
+def audio_args(audio_format, deferred=False):
+    """Tham số yt-dlp cho chế độ chỉ tải âm thanh.
+
+    deferred=True: chỉ tải luồng gốc, việc chuyển MP3 làm ở pool CPU.
+    """
+    if deferred:
+        return ["-f", "ba[ext=m4a]/ba[acodec^=opus]/ba/b"]
+    if audio_format == AUDIO_MP3:
+        return ["-f", "ba/b", "--extract-audio", "--audio-format", "mp3"]
+    # best: giữ nguyên codec, ffmpeg chỉ tách/remux (-c copy), không chuyển mã
+    return ["-f", "ba[ext=m4a]/ba[acodec^=opus]/ba/b",
+            "--extract-audio", "--audio-format", "best"]
+
+
+def ffmpeg_path():
+    bundled = resource_path(os.path.join("data", "ffmpeg.exe"))
+    return bundled if os.path.exists(bundled) else "ffmpeg"
+
+
+def plan_tasks(folder, prefix, format_id, audio_only, audio_format):
+    """Các bước ffmpeg cần làm cho file vừa tải (chế độ pool CPU riêng).
+
+    Trả về danh sách (kind, [file nguồn]). format_id là các định dạng đã tải
+    nối bằng "+", vd "137+140".
+    """
+    try:
+        names = sorted(n for n in os.listdir(folder) if n.startswith(prefix)
+                       and not n.endswith((".part", ".ytdl", ".info.json")))
+    except OSError:
+        return []
+    paths = [os.path.join(folder, n) for n in names]
+    tasks = []
+    # Nguồn chỉ có một định dạng (bv* và b trùng nhau): "merge" một file = remux sang mp4
+    format_ids = list(dict.fromkeys(f for f in (format_id or "").split("+") if f))
+    parts = []
+    for fid in format_ids:
+        marker = f".f{fid}."
+        parts += [p for p in paths if marker in os.path.basename(p)][:1]
+    if format_ids and len(parts) == len(format_ids):
+        tasks.append((TASK_MERGE, parts))
+    elif audio_only and audio_format != AUDIO_ORIGINAL:
+        tasks += [(TASK_MP3, [p]) for p in paths
+                  if p.lower().endswith(AUDIO_EXTS) and not p.lower().endswith(".mp3")]
+    tasks += [(TASK_SUBS, [p]) for p in paths if p.lower().endswith(SUBTITLE_EXTS)]
+    return tasks
+
+
+class PostProcessTask(QObject):
+    """Một bước xử lý ffmpeg chạy sau khi tải (merge, phụ đề, MP3).
+
+    Giống DownloadVideo: run() chạy đồng bộ trong thread slot của pool CPU,
+    stop() kill cả cây tiến trình.
+    """
+    message_signal = Signal(str, str)
+
+    def __init__(self, kind, sources, worker_id=0, remove_source=True):
+        super().__init__()
+        self.kind = kind
+        self.sources = [sources] if isinstance(sources, str) else list(sources)
+        self.worker_id = worker_id
+        self.remove_source = remove_source
+        self.output = ""
+        self.log_sink = None
+        self.stop_flag = False
+        self.process = None
+        self._process_lock = threading.Lock()
+
+    def _log(self, message, level=""):
+        if self.log_sink is not None:
+            self.log_sink.write(message, level)
+        else:
+            self.message_signal.emit(message, level)
+
+    def stop(self, cleanup=True):
+        with self._process_lock:
+            self.stop_flag = True
+            process = self.process
+        kill_process_tree(process, wait=False)
+
+    def _build_command(self):
+        cmd = [ffmpeg_path(), "-hide_banner", "-nostdin", "-loglevel", "error", "-y"]
+        source = self.sources[0]
+        if self.kind == TASK_MP3:
+            self.output = os.path.splitext(source)[0] + ".mp3"
+            return cmd + ["-i", source, "-vn", "-map_metadata", "0",
+                          "-codec:a", "libmp3lame", "-q:a", "2", self.output]
+        if self.kind == TASK_MERGE:
+            # "01.Tên.f137.mp4" -> "01.Tên.mp4"
+            base = os.path.splitext(os.path.splitext(source)[0])[0]
+            self.output = base + ".mp4"
+            for path in self.sources:
+                cmd += ["-i", path]
+            if len(self.sources) == 1:
+                # Nguồn chỉ có một file (đã gồm cả hình và tiếng): chỉ remux
+                cmd += ["-map", "0:v?", "-map", "0:a?"]
+            else:
+                # Hình lấy từ file video (bv* có thể kèm tiếng), tiếng chỉ từ
+                # file âm thanh để không ra hai track âm thanh
+                cmd += ["-map", "0:v"]
+                for index in range(1, len(self.sources)):
+                    cmd += ["-map", f"{index}:a"]
+            return cmd + ["-c", "copy", "-movflags", "+faststart", self.output]
+        if self.kind == TASK_SUBS:
+            self.output = os.path.splitext(source)[0] + ".srt"
+            return cmd + ["-i", source, self.output]
+        raise ValueError(f"Không hỗ trợ bước xử lý: {self.kind}")
+
+    def run(self):
+        """Chạy ffmpeg, trả về True nếu thành công"""
+        prefix = f"[CPU {self.worker_id}]"
+        name = os.path.basename(self.sources[0])
+        missing = [p for p in self.sources if not os.path.exists(p)]
+        if missing:
+            self._log(f"{prefix} ❌ Không thấy file: {os.path.basename(missing[0])}", "error")
+            return False
+        cmd = self._build_command()
+        self._log(f"{prefix} ⚙️ {self.kind}: {name}")
+        with self._process_lock:
+            if self.stop_flag:
+                return False
+            self.process = subprocess.Popen(
+                cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                text=True, encoding="utf-8", errors="replace", **popen_group_kwargs())
+        output = self.process.communicate()[0]
+        if self.stop_flag or self.process.returncode != 0:
+            if os.path.exists(self.output):
+                os.remove(self.output)
+            if not self.stop_flag:
+                self._log(f"{prefix} ❌ ffmpeg lỗi: {output.strip()[-300:]}", "error")
+            return False
+        if self.remove_source:
+            for path in self.sources:
+                if os.path.abspath(path) != os.path.abspath(self.output):
+                    os.remove(path)
+        self._log(f"{prefix} ✅ Xong: {os.path.basename(self.output)}")
+        return True
@@ -0,0 +1,123 @@
+import os
+import re
+import signal
+import subprocess
+import sys
+import time
+
+# Đuôi file tạm của yt-dlp / ffmpeg khi tải dở
+_PARTIAL_RE = re.compile(
+    r"(\.part(-Frag\d+)?|\.ytdl|\.part\.aria2|\.aria2|\.temp\.\w+|\.f\d+(-\d+)?\.\w+)$")
+
+
+def popen_group_kwargs():
+    """Tham số Popen để tiến trình con chạy trong process group riêng.
+
+    Nhờ đó kill_process_tree() dừng được cả ffmpeg/aria2c do yt-dlp sinh ra.
+    """
+    if sys.platform == "win32":
+        return {"creationflags": subprocess.CREATE_NO_WINDOW
+                | subprocess.CREATE_NEW_PROCESS_GROUP}
+    return {"start_new_session": True}
+
+
+def kill_process_tree(process, wait=True, timeout=5):
+    """Dừng tiến trình và toàn bộ tiến trình con của nó.
+
+    wait=False: chỉ gửi lệnh dừng, không chờ (dùng từ GUI thread).
+    """
+    if process is None or process.poll() is not None:
+        return
+    if sys.platform == "win32":
+        try:
+            killer = subprocess.Popen(
+                ["taskkill", "/F", "/T", "/PID", str(process.pid)],
+                stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+                creationflags=subprocess.CREATE_NO_WINDOW)
+        except OSError:
+            killer = None
+            process.kill()
+        if wait and killer is not None:
+            try:
+                killer.wait(timeout)
+            except subprocess.TimeoutExpired:
+                process.kill()
+    else:
+        try:
+            os.killpg(process.pid, signal.SIGKILL)
+        except (ProcessLookupError, PermissionError):
+            process.kill()
+    if wait:
+        try:
+            process.wait(timeout)
+        except subprocess.TimeoutExpired:
+            pass
+
+
+def remove_partial_files(folder, prefix, retries=3):
+    """Xoá file tạm (.part, .ytdl, .temp.*, .fNNN.*) bắt đầu bằng prefix.
+
+    Trả về danh sách file đã xoá. File hoàn chỉnh không bị động tới.
+    """
+    if not folder or not os.path.isdir(folder):
+        return []
+    removed = []
+    for name in os.listdir(folder):
+        if not name.startswith(prefix) or not _PARTIAL_RE.search(name):
+            continue
+        path = os.path.join(folder, name)
+        for attempt in range(retries):
+            try:
+                os.remove(path)
+                removed.append(name)
+                break
+            except FileNotFoundError:
+                break
+            except OSError:
+                # Windows: handle của tiến trình vừa bị kill có thể chưa đóng
+                time.sleep(0.2 * (attempt + 1))
+    return removed
+
+
+def _windows_rss():
+    """WorkingSetSize qua GetProcessMemoryInfo (Windows không có psutil)"""
+    import ctypes
+    from ctypes import wintypes
+
+    class PROCESS_MEMORY_COUNTERS(ctypes.Structure):
+        _fields_ = [("cb", wintypes.DWORD), ("PageFaultCount", wintypes.DWORD)] + [
+            (name, ctypes.c_size_t) for name in (
+                "PeakWorkingSetSize", "WorkingSetSize", "QuotaPeakPagedPoolUsage",
+                "QuotaPagedPoolUsage", "QuotaPeakNonPagedPoolUsage",
+                "QuotaNonPagedPoolUsage", "PagefileUsage", "PeakPagefileUsage")]
+
+    kernel32 = ctypes.WinDLL("kernel32")
+    psapi = ctypes.WinDLL("psapi")
+    kernel32.GetCurrentProcess.restype = wintypes.HANDLE
+    psapi.GetProcessMemoryInfo.argtypes = [
+        wintypes.HANDLE, ctypes.POINTER(PROCESS_MEMORY_COUNTERS), wintypes.DWORD]
+    counters = PROCESS_MEMORY_COUNTERS()
+    counters.cb = ctypes.sizeof(counters)
+    if not psapi.GetProcessMemoryInfo(kernel32.GetCurrentProcess(),
+                                      ctypes.byref(counters), counters.cb):
+        return None
+    return counters.WorkingSetSize
+
+
+def rss_bytes():
+    """Bộ nhớ RSS của tiến trình hiện tại, None nếu không đo được"""
+    try:
+        import psutil
+        return psutil.Process().memory_info().rss
+    except ImportError:
+        pass
+    if sys.platform == "win32":
+        try:
+            return _windows_rss()
+        except (OSError, AttributeError):
+            return None
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, AttributeError):
+        return None
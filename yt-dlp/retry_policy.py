@@ -0,0 +1,68 @@
+import random
+import re
+
+ERROR_NETWORK = "network"           # Lỗi mạng tạm thời: nên thử lại
+ERROR_UNAVAILABLE = "unavailable"   # Video riêng tư/bị xoá/chặn vùng: không thử lại
+ERROR_BROKEN = "broken"             # Extractor/yt-dlp hỏng: cần cập nhật, không thử lại
+ERROR_UNKNOWN = "unknown"
+
+ERROR_LABELS = {
+    ERROR_NETWORK: "Lỗi mạng",
+    ERROR_UNAVAILABLE: "Video không khả dụng",
+    ERROR_BROKEN: "yt-dlp không xử lý được (hãy cập nhật yt-dlp)",
+    ERROR_UNKNOWN: "Lỗi không xác định",
+}
+
+_PATTERNS = [
+    (ERROR_UNAVAILABLE, re.compile(
+        r"private video|video unavailable|this video is unavailable|"
+        r"has been removed|no longer available|members[- ]only|"
+        r"sign in to confirm your age|not available in your country|"
+        r"geo.?restrict|copyright|account .* terminated|"
+        r"this live event will begin|premieres in|http error 404|http error 410|"
+        r"unsupported url", re.I)),
+    (ERROR_BROKEN, re.compile(
+        r"unable to extract|please report this issue|nsig extraction failed|"
+        r"signature extraction failed|requested format is not available|"
+        r"extractorerror|keyerror|typeerror|is not a valid url", re.I)),
+    (ERROR_NETWORK, re.compile(
+        r"http error (429|5\d\d)|timed out|timeout|connection (reset|refused|aborted)|"
+        r"remote end closed|temporary failure in name resolution|getaddrinfo failed|"
+        r"name or service not known|network is unreachable|unable to download webpage|"
+        r"incompleteread|ssl|eof occurred|got error|did not get any data|"
+        r"unable to download video data|giving up after", re.I)),
+]
+
+
+def classify_error(lines):
+    """Phân loại lỗi từ các dòng ERROR của yt-dlp (dòng cuối quan trọng nhất)"""
+    for line in reversed(list(lines)):
+        for kind, pattern in _PATTERNS:
+            if pattern.search(line):
+                return kind
+    return ERROR_UNKNOWN
+
+
+class RetryPolicy:
+    """Số lần thử lại và thời gian chờ (backoff luỹ thừa + jitter) theo loại lỗi"""
+
+    def __init__(self, max_attempts=None, base_delay=5.0, factor=3.0, max_delay=180.0):
+        # Số lần chạy tối đa (kể cả lần đầu) cho từng loại lỗi
+        self.max_attempts = max_attempts or {
+            ERROR_NETWORK: 4,
+            ERROR_UNKNOWN: 2,
+            ERROR_UNAVAILABLE: 1,
+            ERROR_BROKEN: 1,
+        }
+        self.base_delay = base_delay
+        self.factor = factor
+        self.max_delay = max_delay
+
+    def should_retry(self, kind, attempt):
+        """attempt: số lần đã chạy (1 = vừa chạy lần đầu)"""
+        return attempt < self.max_attempts.get(kind, 1)
+
+    def delay(self, attempt):
+        """Thời gian chờ trước lần chạy thứ attempt + 1"""
+        delay = min(self.base_delay * self.factor ** (attempt - 1), self.max_delay)
+        return delay * random.uniform(0.8, 1.2)
@@ -0,0 +1,241 @@
+"""Tải một file lớn bằng nhiều kết nối Range song song.
+
+File đích được cấp phát đủ kích thước từ đầu, mỗi đoạn ghi thẳng vào đúng
+vị trí của nó (không ghép file tạm). Tiến độ từng đoạn lưu trong file .json
+đi kèm nên dừng/mất mạng xong vẫn tải tiếp được. Không dùng Qt.
+
+SHA-256 của cả file phải băm theo thứ tự byte: con trỏ băm đi từ byte 0,
+đoạn đang chứa con trỏ được băm ngay khi nhận. Phần về trước khi con trỏ
+tới (đoạn sau tải nhanh hơn, hoặc phần đã tải ở lần chạy trước) phải đọc
+lại từ đĩa, thường vẫn nằm trong cache của hệ điều hành.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+
+import requests
+
+SEGMENTS = 4
+MIN_SEGMENT = 4 * 1024 * 1024
+CHUNK_SIZE = 256 * 1024
+MAX_ATTEMPTS = 5
+SAVE_INTERVAL = 1.0
+
+_NETWORK_ERRORS = (requests.exceptions.ConnectionError,
+                   requests.exceptions.Timeout,
+                   requests.exceptions.ChunkedEncodingError)
+
+
+class ProbeFailed(Exception):
+    """Không hỏi được server (lỗi mạng) sau MAX_ATTEMPTS lần"""
+
+
+class RangeNotSupported(Exception):
+    """Server không trả 206 cho Range (không có ETag/Last-Modified, hoặc file quá nhỏ để chia)"""
+
+
+class DownloadChanged(Exception):
+    """File trên server đã đổi giữa chừng (If-Range trả 200)"""
+
+
+def probe(url, timeout=30):
+    """(kích thước, validator) nếu server hỗ trợ Range, ngược lại RangeNotSupported"""
+    with requests.get(url, headers={"Range": "bytes=0-0"}, stream=True,
+                      timeout=timeout) as response:
+        response.raise_for_status()
+        validator = response.headers.get("ETag") or response.headers.get("Last-Modified")
+        content_range = response.headers.get("Content-Range", "")
+        if response.status_code != 206 or "/" not in content_range or not validator:
+            raise RangeNotSupported(url)
+        total = content_range.rsplit("/", 1)[1]
+        if not total.isdigit():
+            raise RangeNotSupported(url)
+        return int(total), validator
+
+
+def split_ranges(total, segments=SEGMENTS, min_segment=MIN_SEGMENT):
+    """[[start, end]] (end là byte cuối, gồm cả end) chia đều, mỗi đoạn >= min_segment"""
+    count = max(1, min(segments, total // min_segment))
+    size = -(-total // count)
+    return [[start, min(start + size, total) - 1] for start in range(0, total, size)]
+
+
+class SegmentedDownload:
+    """Tải url vào path bằng `segments` kết nối song song.
+
+    run() trả về True khi xong, False nếu bị dừng; lỗi mạng quá số lần thử
+    thì ném exception (file .part và tiến độ được giữ lại để lần sau tải tiếp).
+    on_progress(đã tải, tổng) được gọi từ các thread tải.
+    """
+
+    def __init__(self, url, path, segments=SEGMENTS, on_progress=None, should_stop=None):
+        self.url = url
+        self.path = path
+        self.meta_path = path + ".json"
+        self.segments = segments
+        self.on_progress = on_progress
+        self.should_stop = should_stop or (lambda: False)
+        self.total = 0
+        self.validator = None
+        self.ranges = []      # [[start, end, đã tải]]
+        self.resumed = 0
+        # Byte phải đọc lại từ đĩa để băm (không băm được lúc nhận)
+        self.rehashed = 0
+        self._lock = threading.Lock()
+        self._saved_at = 0
+        self._error = None
+        self._digest = hashlib.sha256()
+        self._hashed = 0
+        self._hash_lock = threading.Lock()
+
+    @property
+    def sha256(self):
+        """SHA-256 của file, chỉ đúng sau khi run() trả về True"""
+        return self._digest.hexdigest()
+
+    def _probe(self):
+        """probe() có thử lại khi lỗi mạng; None nếu bị dừng trong lúc chờ"""
+        for attempt in range(MAX_ATTEMPTS):
+            if self.should_stop():
+                return None
+            try:
+                return probe(self.url)
+            except _NETWORK_ERRORS as e:
+                if attempt + 1 == MAX_ATTEMPTS:
+                    raise ProbeFailed(str(e)) from e
+                time.sleep(min(2 ** attempt, 30))
+
+    def run(self):
+        probed = self._probe()
+        if probed is None:
+            return False
+        total, validator = probed
+        if total < 2 * MIN_SEGMENT:
+            # Chỉ được một đoạn: tải một luồng như thường
+            raise RangeNotSupported(self.url)
+        self._prepare(total, validator)
+        threads = [threading.Thread(target=self._worker, args=(segment,), daemon=True)
+                   for segment in self.ranges if segment[2] < segment[1] - segment[0] + 1]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self._save(force=True)
+        if self._error is not None:
+            raise self._error
+        if self.should_stop():
+            return False
+        self._hash_until(self.total)
+        os.remove(self.meta_path)
+        return True
+
+    @property
+    def downloaded(self):
+        return sum(segment[2] for segment in self.ranges)
+
+    def _prepare(self, total, validator):
+        """Dùng lại tiến độ cũ nếu cùng URL/validator, không thì cấp phát file mới"""
+        meta = {}
+        try:
+            with open(self.meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+        except (OSError, ValueError):
+            pass
+        self.total, self.validator = total, validator
+        if (meta.get("url") == self.url and meta.get("validator") == validator
+                and meta.get("size") == total and meta.get("segments")
+                and os.path.exists(self.path) and os.path.getsize(self.path) == total):
+            self.ranges = meta["segments"]
+            self.resumed = self.downloaded
+            return
+        self.ranges = [r + [0] for r in split_ranges(total, self.segments)]
+        with open(self.path, "wb") as f:
+            f.truncate(total)
+        self._save(force=True)
+
+    def _save(self, force=False):
+        with self._lock:
+            now = time.monotonic()
+            if not force and now - self._saved_at < SAVE_INTERVAL:
+                return
+            self._saved_at = now
+            data = {"url": self.url, "validator": self.validator, "size": self.total,
+                    "segments": [list(segment) for segment in self.ranges]}
+        with open(self.meta_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+
+    def _hash_until(self, position):
+        """Đọc từ đĩa để băm tiếp tới position (gọi khi giữ _hash_lock hoặc sau khi tải xong)"""
+        if self._hashed >= position:
+            return
+        with open(self.path, "rb") as f:
+            f.seek(self._hashed)
+            while self._hashed < position:
+                chunk = f.read(min(CHUNK_SIZE, position - self._hashed))
+                if not chunk:
+                    break
+                self._digest.update(chunk)
+                self._hashed += len(chunk)
+                self.rehashed += len(chunk)
+
+    def _hash_chunk(self, f, start, position, chunk):
+        """Băm chunk vừa ghi tại position nếu con trỏ băm đang ở trong đoạn này"""
+        with self._hash_lock:
+            if not start <= self._hashed <= position:
+                return
+            if self._hashed < position:
+                # Con trỏ vừa tới đoạn này: đọc phần đã ghi trước đó
+                f.flush()
+                self._hash_until(position)
+            self._digest.update(chunk)
+            self._hashed += len(chunk)
+
+    def _worker(self, segment):
+        for attempt in range(MAX_ATTEMPTS):
+            if self.should_stop() or self._error is not None:
+                return
+            try:
+                self._fetch(segment)
+                return
+            except _NETWORK_ERRORS as e:
+                if attempt + 1 == MAX_ATTEMPTS:
+                    self._error = e
+                    return
+                time.sleep(min(2 ** attempt, 30))
+            except Exception as e:
+                self._error = e
+                return
+
+    def _fetch(self, segment):
+        start, end, done = segment
+        if start + done > end:
+            return
+        headers = {"Range": f"bytes={start + done}-{end}", "If-Range": self.validator}
+        with requests.get(self.url, headers=headers, stream=True, timeout=30) as response:
+            response.raise_for_status()
+            if response.status_code != 206:
+                raise DownloadChanged(self.url)
+            with open(self.path, "r+b") as f:
+                f.seek(start + done)
+                for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                    if self.should_stop() or self._error is not None:
+                        return
+                    if not chunk:
+                        continue
+                    # Server gửi thừa thì cắt ở cuối đoạn
+                    position = start + segment[2]
+                    chunk = chunk[:end + 1 - position]
+                    f.write(chunk)
+                    self._hash_chunk(f, start, position, chunk)
+                    with self._lock:
+                        segment[2] += len(chunk)
+                    if self.on_progress is not None:
+                        self.on_progress(self.downloaded, self.total)
+                    self._save()
+                    if start + segment[2] > end:
+                        return
+        # Server đóng kết nối trước khi gửi hết đoạn: thử lại phần còn thiếu
+        raise requests.exceptions.ConnectionError(
+            f"Kết nối đóng sớm ở byte {start + segment[2]}/{end + 1}")
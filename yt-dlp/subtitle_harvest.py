@@ -0,0 +1,236 @@
+import os
+import subprocess
+import tempfile
+import threading
+
+from PySide6.QtCore import QObject, Signal
+
+from ui_setting import resource_path
+import ytdlp_protocol
+from download_archive import canonical_video_id
+from job_scheduler import Job
+from process_utils import kill_process_tree, popen_group_kwargs
+from retry_policy import ERROR_BROKEN, ERROR_UNAVAILABLE, classify_error
+
+# Số URL mỗi tiến trình yt-dlp: đủ lớn để khỏi tốn thời gian khởi động,
+# đủ nhỏ để các slot chia đều việc và một tiến trình lỗi không kéo theo cả lô
+HARVEST_CHUNK = 50
+
+
+def chunk_entries(entries, size=HARVEST_CHUNK):
+    """Chia [(video_index, url)] thành các lô liên tiếp"""
+    entries = list(entries)
+    return [entries[i:i + size] for i in range(0, len(entries), size)]
+
+
+def finish_harvest_job(job, harvest, retry_policy):
+    """Gộp kết quả từng URL vào job.options["results"], trả về trạng thái job.
+
+    URL lỗi được phép thử lại (vd: lỗi mạng) ở lại job.options["entries"] và
+    cả lô được xếp lại với Job.RETRY; URL đã xong không chạy lại.
+    """
+    results = job.options.setdefault("results", [])
+    retry = []
+    for result in harvest.results:
+        index, url, ok, detail, kind = result
+        if not ok and not job.stop_flag and retry_policy.should_retry(kind, job.attempt):
+            retry.append((index, url))
+            job.error_kind, job.error_message = kind, detail
+        else:
+            results.append(result)
+    if job.stop_flag:
+        return Job.STOPPED
+    if retry:
+        job.options["entries"] = retry
+        job.retry_delay = retry_policy.delay(job.attempt)
+        return Job.RETRY
+    return Job.DONE if all(r[2] for r in results) else Job.FAILED
+
+
+class SubtitleHarvest(QObject):
+    """Tải phụ đề cho nhiều URL bằng MỘT tiến trình yt-dlp (--batch-file).
+
+    Chạy đồng bộ trong thread slot giống DownloadVideo. Kết quả từng URL nằm
+    trong `results`: [(video_index, url, ok, file hoặc lỗi, error_kind)].
+    URL được nhận diện qua original_url mà yt-dlp in ra (xem
+    ytdlp_protocol.harvest_print_args); URL lỗi lúc phân tích không in gì nên
+    được suy ra từ thứ tự trong batch file.
+    """
+    message_signal = Signal(str, str)
+
+    def __init__(self, entries, worker_id, sub_mode, sub_lang, folder):
+        super().__init__()
+        self.entries = list(entries)
+        self.worker_id = worker_id
+        self.sub_mode = sub_mode
+        self.sub_lang = sub_lang
+        self.folder = folder
+        self.ffmpeg_path = resource_path(os.path.join("data", "ffmpeg.exe"))
+        self.ytdlp_path = resource_path(os.path.join("data", "yt-dlp.exe"))
+        self.log_sink = None
+        self.progress_sink = None
+        self.job_id = None
+        self.rate_limit = 0
+        self.stop_flag = False
+        self.process = None
+        self._process_lock = threading.Lock()
+        self.results = []
+        self._reported = set()
+        # video_index -> id video (để gán dòng ERROR: [extractor] id: ... cho đúng URL)
+        self._ids = {}
+        for index, url in self.entries:
+            video = canonical_video_id(url)
+            if video:
+                self._ids[index] = video[1]
+
+    def _log(self, message, level=""):
+        if self.log_sink is not None:
+            self.log_sink.write(message, level)
+        else:
+            self.message_signal.emit(message, level)
+
+    def stop(self, cleanup=True):
+        with self._process_lock:
+            self.stop_flag = True
+            process = self.process
+        kill_process_tree(process, wait=False)
+
+    def _build_command(self, ytdlp_path, batch_file):
+        cmd = [ytdlp_path, "--encoding", "utf-8",
+               "--batch-file", batch_file,
+               "--no-playlist",
+               "--ignore-errors",        # Một URL lỗi không dừng cả lô
+               "--skip-download"]
+        cmd += ytdlp_protocol.harvest_print_args()
+        if self.rate_limit:
+            cmd += ["--limit-rate", str(int(self.rate_limit))]
+        if os.path.exists(self.ffmpeg_path):
+            cmd += ["--ffmpeg-location", self.ffmpeg_path]
+        if self.sub_mode == "1":
+            cmd += ["--write-subs"]
+        else:
+            cmd += ["--write-auto-subs"]
+        cmd += ["--sub-langs", self.sub_lang, "--sub-format", "srt/best",
+                "--convert-subs", "srt", "--no-warnings"]
+        # Có id trong tên để hai video trùng tiêu đề không ghi đè nhau,
+        # đổi lại thành "NN.Tiêu đề.lang.srt" khi gán được URL
+        cmd += ["-o", os.path.join(self.folder, "%(title)s [%(id)s].%(ext)s")]
+        return cmd
+
+    def run(self):
+        """Chạy cả lô, trả về True nếu mọi URL đều có phụ đề"""
+        prefix = f"[Thread {self.worker_id}] [Phụ đề {len(self.entries)} URL]"
+        ytdlp_path = self.ytdlp_path if os.path.exists(self.ytdlp_path) else "yt-dlp"
+        fd, batch_file = tempfile.mkstemp(prefix="ht_subs_", suffix=".txt")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.writelines(url + "\n" for _, url in self.entries)
+            with self._process_lock:
+                if self.stop_flag:
+                    return False
+                self.process = subprocess.Popen(
+                    self._build_command(ytdlp_path, batch_file),
+                    stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                    text=True, bufsize=1, encoding="utf-8", errors="replace",
+                    **popen_group_kwargs())
+            self._log(f"{prefix} 📝 Bắt đầu tải phụ đề")
+            self._read_output(prefix)
+        except OSError as e:
+            for index, url in self.entries:
+                self._finish(prefix, index, url, False, str(e), ERROR_BROKEN)
+        finally:
+            kill_process_tree(self.process)
+            os.remove(batch_file)
+        ok = sum(1 for r in self.results if r[2])
+        self._log(f"{prefix} ✅ {ok}/{len(self.entries)} URL có phụ đề")
+        return ok == len(self.entries)
+
+    def _read_output(self, prefix):
+        position = {url: i for i, (_, url) in enumerate(self.entries)}
+        next_pos = 0        # URL tiếp theo chưa được yt-dlp bắt đầu
+        current = None      # URL đang xử lý (đã in pre_process)
+        errors = []
+        for line in self.process.stdout:
+            if self.stop_flag:
+                break
+            line = line.strip()
+            if not line:
+                continue
+            kind, data = ytdlp_protocol.parse_line(line)
+            if kind == "start":
+                pos = position.get(data.get("original_url"), next_pos)
+                if pos < next_pos:
+                    continue
+                errors = self._settle(prefix, current, next_pos, pos, errors)
+                current, next_pos = pos, pos + 1
+            elif kind == "subs":
+                url, files = data
+                pos = position.get(url, current)
+                if pos is None:
+                    continue
+                index, url = self.entries[pos]
+                files = [self._rename(index, path) for path in files if os.path.exists(path)]
+                if files:
+                    self._finish(prefix, index, url, True, files[0])
+                else:
+                    self._finish(prefix, index, url, False,
+                                 errors[-1] if errors else
+                                 f"Không có phụ đề '{self.sub_lang}'",
+                                 classify_error(errors) if errors else ERROR_UNAVAILABLE)
+                if pos == current:
+                    current, errors = None, []
+            elif line.startswith("ERROR:"):
+                errors.append(line)
+        if self.stop_flag:
+            return
+        self.process.wait()
+        self._settle(prefix, current, next_pos, len(self.entries), errors)
+
+    def _settle(self, prefix, current, start, end, errors):
+        """Đánh dấu lỗi cho URL đang xử lý chưa xong và các URL [start, end) bị bỏ qua.
+
+        Dòng ERROR có id video thì gán đúng URL, còn lại gán theo thứ tự.
+        """
+        pending = ([current] if current is not None else []) + list(range(start, end))
+        pending = [pos for pos in pending if self.entries[pos][0] not in self._reported]
+        if not pending:
+            return []
+        by_pos = {pos: [] for pos in pending}
+        unmatched = []
+        for line in errors:
+            pos = next((p for p in pending
+                        if self._ids.get(self.entries[p][0]) and
+                        f" {self._ids[self.entries[p][0]]}:" in line), None)
+            (by_pos[pos] if pos is not None else unmatched).append(line)
+        for pos in pending:
+            lines = by_pos[pos] or (unmatched if len(pending) == 1 else [])
+            index, url = self.entries[pos]
+            message = lines[-1] if lines else "yt-dlp không xử lý được URL này"
+            self._finish(prefix, index, url, False, message, classify_error(lines))
+        return []
+
+    def _finish(self, prefix, index, url, ok, detail, error_kind=None):
+        if index in self._reported:
+            return
+        self._reported.add(index)
+        self.results.append((index, url, ok, detail, error_kind))
+        if ok:
+            self._log(f"{prefix} ({index}) ✅ {os.path.basename(detail)}")
+        else:
+            self._log(f"{prefix} ({index}) ❌ {detail}: {url}", "error")
+        if self.progress_sink is not None:
+            self.progress_sink.update(self.job_id, {
+                "downloaded_bytes": len(self.results), "total_bytes": len(self.entries)})
+
+    def _rename(self, index, path):
+        """'Tiêu đề [id].vi.srt' -> 'NN.Tiêu đề.vi.srt' giống chế độ tải từng URL"""
+        folder, name = os.path.split(path)
+        head, sep, tail = name.rpartition(" [")
+        if sep and "]" in tail:
+            name = head + tail[tail.index("]") + 1:]
+        target = os.path.join(folder, f"{index:02d}.{name}")
+        try:
+            os.replace(path, target)
+        except OSError:
+            return path
+        return target
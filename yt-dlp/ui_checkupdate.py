@@ -1,7 +1,32 @@
+import json
+import time
+
 import requests
 from PySide6.QtCore import QThread, Signal
 
-from ui_setting import UPDATE_CHECK_URL, APP_VERSION
+from ui_setting import UPDATE_CHECK_URL, APP_VERSION, UPDATE_CHECK_INTERVAL
+
+# Response lần kiểm tra trước (ETag/Last-Modified + nội dung) để hỏi lại có điều kiện
+UPDATE_CACHE = "update_cache.json"
+# (kết nối, đọc): server không phản hồi thì bỏ qua sớm
+CHECK_TIMEOUT = (3, 10)
+
+
+def _load_cache():
+    try:
+        with open(UPDATE_CACHE, "r", encoding="utf-8") as f:
+            cache = json.load(f)
+    except (OSError, ValueError):
+        return {}
+    return cache if cache.get("url") == UPDATE_CHECK_URL else {}
+
+
+def _save_cache(cache):
+    try:
+        with open(UPDATE_CACHE, "w", encoding="utf-8") as f:
+            json.dump(cache, f, ensure_ascii=False)
+    except OSError:
+        pass
 
 
 class UI_CheckUpdate(QThread):
@@ -13,8 +38,45 @@ class UI_CheckUpdate(QThread):
     error_occurred = Signal(str)
     progress_update = Signal(int, str)  # progress, message
 
-    def __init__(self):
+    def __init__(self, force=False):
         super().__init__()
+        # force: kiểm tra thủ công, bỏ qua khoảng cách tối thiểu giữa hai lần hỏi server
+        self.force = force
+
+    def _fetch_release(self):
+        """Thông tin release mới nhất, dùng cache nếu vừa kiểm tra hoặc server trả 304"""
+        cache = _load_cache()
+        if (not self.force and cache.get("data") is not None
+                and time.time() - cache.get("checked_at", 0) < UPDATE_CHECK_INTERVAL):
+            return cache["data"]
+
+        headers = {}
+        if cache.get("data") is not None:
+            if cache.get("etag"):
+                headers["If-None-Match"] = cache["etag"]
+            if cache.get("last_modified"):
+                headers["If-Modified-Since"] = cache["last_modified"]
+        # Gửi request để lấy thông tin release mới nhất
+        response = requests.get(UPDATE_CHECK_URL, timeout=CHECK_TIMEOUT, headers=headers)
+
+        self.progress_update.emit(60, "📥 Đang xử lý response...")
+        if response.status_code == 304:
+            cache["checked_at"] = time.time()
+            _save_cache(cache)
+            return cache["data"]
+        if response.status_code != 200:
+            self.error_occurred.emit(
+                f"HTTP {response.status_code}: Không thể kết nối đến server")
+            return None
+        release_data = response.json()
+        _save_cache({
+            "url": UPDATE_CHECK_URL,
+            "etag": response.headers.get("ETag"),
+            "last_modified": response.headers.get("Last-Modified"),
+            "checked_at": time.time(),
+            "data": release_data,
+        })
+        return release_data
 
     def run(self):
         """Kiểm tra phiên bản mới"""
@@ -22,55 +84,56 @@ class UI_CheckUpdate(QThread):
 
             self.progress_update.emit(30, "🔄 Đang kiểm tra...")
 
-            # Gửi request để lấy thông tin release mới nhất
-            response = requests.get(UPDATE_CHECK_URL, timeout=10)
-
-            self.progress_update.emit(60, "📥 Đang xử lý response...")
-
-            if response.status_code == 200:
-                # print("✅ Kết nối thành công đến server")
-                release_data = response.json()
-                latest_version = release_data.get(
-                    'tag_name', '').replace('v', '')
-                release_name = release_data.get('name', '')
-                release_notes = release_data.get('body', '')
-                # Lấy download URL từ JSON response
-                download_url = release_data.get('download_url', '')
+            release_data = self._fetch_release()
+            if release_data is None:
+                return
+
+            # print("✅ Kết nối thành công đến server")
+            latest_version = release_data.get(
+                'tag_name', '').replace('v', '')
+            release_name = release_data.get('name', '')
+            release_notes = release_data.get('body', '')
+            # Lấy download URL từ JSON response
+            download_url = release_data.get('download_url', '')
+            if not download_url:
+                # Fallback nếu không có download_url, có thể thử các key khác
+                download_url = release_data.get('html_url', '')
                 if not download_url:
-                    # Fallback nếu không có download_url, có thể thử các key khác
-                    download_url = release_data.get('html_url', '')
-                    if not download_url:
-                        download_url = release_data.get('zipball_url', '')
-
-                # Kiểm tra tính hợp lệ của download URL
-                if not download_url or not download_url.startswith(('http://', 'https://')):
-                    self.error_occurred.emit(
-                        "Không tìm thấy URL download hợp lệ trong response")
-                    return
-
-                published_at = release_data.get('published_at', '')
-
-                self.progress_update.emit(80, "🔍 Đang so sánh phiên bản...")
-                # So sánh phiên bản
-                if self._is_newer_version(latest_version, APP_VERSION):
-                    update_info = {
-                        'version': latest_version,
-                        # 'version': 'v2.0.1',  # Placeholder for actual version
-                        'name': release_name,
-                        'notes': release_notes,
-                        # 'download_url': download_url,
-                        'download_url': "http://192.168.20.103:8000/download/update_v1.6.0.zip",
-                        'published_at': published_at
-                    }
-                    self.progress_update.emit(100, "🎉 Tìm thấy phiên bản mới!")
-                    self.update_available.emit(update_info)
-                else:
-                    self.progress_update.emit(
-                        100, "✅ Phiên bản hiện tại là mới nhất")
-                    self.no_update.emit()
-            else:
+                    download_url = release_data.get('zipball_url', '')
+
+            # Kiểm tra tính hợp lệ của download URL
+            if not download_url or not download_url.startswith(('http://', 'https://')):
                 self.error_occurred.emit(
-                    f"HTTP {response.status_code}: Không thể kết nối đến server")
+                    "Không tìm thấy URL download hợp lệ trong response")
+                return
+
+            published_at = release_data.get('published_at', '')
+            # Manifest từng file (tuỳ chọn) để chỉ tải file thay đổi
+            manifest_url = release_data.get('manifest_url', '')
+            # Kích thước/SHA-256 của gói zip để kiểm tra sau khi tải
+            package_size = release_data.get('size')
+            package_sha256 = release_data.get('sha256', '')
+
+            self.progress_update.emit(80, "🔍 Đang so sánh phiên bản...")
+            # So sánh phiên bản
+            if self._is_newer_version(latest_version, APP_VERSION):
+                update_info = {
+                    'version': latest_version,
+                    # 'version': 'v2.0.1',  # Placeholder for actual version
+                    'name': release_name,
+                    'notes': release_notes,
+                    'download_url': download_url,
+                    'published_at': published_at,
+                    'manifest_url': manifest_url,
+                    'size': package_size,
+                    'sha256': package_sha256
+                }
+                self.progress_update.emit(100, "🎉 Tìm thấy phiên bản mới!")
+                self.update_available.emit(update_info)
+            else:
+                self.progress_update.emit(
+                    100, "✅ Phiên bản hiện tại là mới nhất")
+                self.no_update.emit()
 
         except requests.exceptions.Timeout:
             self.error_occurred.emit(
@@ -1,10 +1,48 @@
+import hashlib
+import json
 import os
+import time
 
 import shutil
 import zipfile
 import requests
 from PySide6.QtCore import QThread, Signal
 
+from segmented_download import (
+    SEGMENTS, DownloadChanged, ProbeFailed, RangeNotSupported, SegmentedDownload)
+from update_manifest import (
+    DELETE_LIST, INSTALLED_MANIFEST, delta_size, file_url, plan_delta)
+
+CHUNK_SIZE = 1024 * 1024  # 1MB
+MAX_ATTEMPTS = 5
+
+
+def _range_start(response):
+    """Byte đầu của response 206 (Content-Range: bytes 100-199/1000)"""
+    try:
+        return int(response.headers["Content-Range"].split()[1].split("-")[0])
+    except (KeyError, IndexError, ValueError):
+        return None
+
+
+def _read_json(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def _write_json(path, data):
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f)
+
+
+def _remove(*paths):
+    for path in paths:
+        if os.path.exists(path):
+            os.remove(path)
+
 
 class DownloadUpdateWorker(QThread):
     """Worker thread để tải về và giải nén update"""
@@ -12,12 +50,21 @@ class DownloadUpdateWorker(QThread):
     message_signal = Signal(str)
     finished_signal = Signal(bool, str)  # success, message
 
-    def __init__(self, download_url, version, zip_path):
+    def __init__(self, download_url, version, zip_path, manifest_url=None, app_dir=None,
+                 expected_size=None, expected_sha256=None, segments=SEGMENTS):
         super().__init__()
         self.download_url = download_url
         self.version = version
         self.stop_flag = False
         self.zip_path = zip_path
+        # Có manifest + thư mục app thì chỉ tải file thay đổi (gói delta)
+        self.manifest_url = manifest_url
+        self.app_dir = app_dir
+        # Kích thước/SHA-256 của gói đầy đủ (từ update.json) để kiểm tra sau khi tải
+        self.expected_size = int(expected_size) if expected_size else None
+        self.expected_sha256 = expected_sha256
+        # Số kết nối song song khi server hỗ trợ Range
+        self.segments = segments
 
     def run(self):
         """Thực hiện download và extract"""
@@ -32,10 +79,18 @@ class DownloadUpdateWorker(QThread):
             # # extract_to = "temp_update"
             # output_file = rf"C:\Users\HT\Desktop\Test_Update\update_v{self.version}.zip"
             # Bước 1: Download file
-            self.message_signal.emit("⬇️ Đang tải file cập nhật...")
-            # print("Start download and extract")
-            if not self._download_with_progress(self.download_url, self.zip_path):
-                return
+            delta = None
+            if self.manifest_url and self.app_dir:
+                delta = self._download_delta()
+                if self.stop_flag:
+                    return
+            if not delta:
+                self.message_signal.emit("⬇️ Đang tải file cập nhật...")
+                # print("Start download and extract")
+                if not self._download_with_progress(self.download_url, self.zip_path):
+                    if not self.stop_flag:
+                        self.finished_signal.emit(False, "Tải gói cập nhật không thành công")
+                    return
 
             # if self.stop_flag:
             #     self._cleanup(output_file, extract_to)
@@ -60,45 +115,230 @@ class DownloadUpdateWorker(QThread):
             self.finished_signal.emit(False, f"Lỗi cập nhật: {str(e)}")
 
     def _download_with_progress(self, url, output_file):
-        """Tải file với thanh tiến trình"""
-        try:
-            response = requests.get(url, stream=True, timeout=30)
-            response.raise_for_status()
-
-            total_size = int(response.headers.get('content-length', 0))
-            total_mb = total_size / (1024 * 1024)
-
-            downloaded = 0
-            chunk_size = 1024 * 1024  # 1MB
+        """Tải file với thanh tiến trình, tải tiếp được sau lỗi mạng.
 
-            with open(output_file, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=chunk_size):
-                    if self.stop_flag:
-                        f.close()
+        Dữ liệu ghi vào output_file + ".part" và được băm SHA-256 ngay khi
+        nhận; lần thử sau (hoặc lần mở app sau) gửi Range + If-Range nên chỉ
+        tải phần còn thiếu. Xong thì so kích thước/SHA-256 với thông tin bản
+        phát hành rồi mới đổi tên thành output_file.
+        """
+        part_file = output_file + ".part"
+        meta_file = part_file + ".json"
+        segmented = self._download_segmented(url, output_file, part_file)
+        if segmented is not None:
+            return segmented
+        digest, offset, validator = self._resume_state(url, part_file, meta_file)
+        total = self.expected_size or 0
+        for attempt in range(MAX_ATTEMPTS):
+            if self.stop_flag:
+                self.message_signal.emit("⏹ Đã dừng tải")
+                return False
+            headers = {}
+            if offset and validator:
+                # Server đã đổi file (ETag/Last-Modified khác) thì trả 200 cả file
+                headers = {"Range": f"bytes={offset}-", "If-Range": validator}
+            try:
+                with requests.get(url, stream=True, timeout=30, headers=headers) as response:
+                    if response.status_code == 416:
+                        if total and offset >= total:
+                            break
+                        # Phần đã tải không khớp file trên server: tải lại từ đầu
+                        digest, offset, validator = hashlib.sha256(), 0, None
+                        continue
+                    response.raise_for_status()
+                    if response.status_code != 206 or _range_start(response) != offset:
+                        digest, offset = hashlib.sha256(), 0
+                    length = int(response.headers.get("content-length", 0))
+                    total = self.expected_size or (offset + length if length else 0)
+                    validator = (response.headers.get("ETag")
+                                 or response.headers.get("Last-Modified"))
+                    _write_json(meta_file, {"url": url, "validator": validator})
+                    if offset:
+                        self.message_signal.emit(
+                            f"↪️ Tải tiếp từ {offset / (1024 * 1024):.1f} MB")
+                    offset = self._stream_to(response, part_file, offset, digest, total)
+                    if offset is None:
                         self.message_signal.emit("⏹ Đã dừng tải")
                         return False
+                    break
+            except (requests.exceptions.ConnectionError,
+                    requests.exceptions.Timeout,
+                    requests.exceptions.ChunkedEncodingError) as e:
+                if attempt + 1 == MAX_ATTEMPTS:
+                    self.message_signal.emit(f"❌ Lỗi tải xuống: {str(e)}")
+                    return False
+                offset = os.path.getsize(part_file) if os.path.exists(part_file) else 0
+                delay = min(2 ** attempt, 30)
+                self.message_signal.emit(
+                    f"⚠️ Mất kết nối, thử lại sau {delay}s ({attempt + 1}/{MAX_ATTEMPTS})")
+                time.sleep(delay)
+            except Exception as e:
+                self.message_signal.emit(f"❌ Lỗi tải xuống: {str(e)}")
+                return False
 
-                    if chunk:
-                        f.write(chunk)
-                        downloaded += len(chunk)
-                        downloaded_mb = downloaded / (1024 * 1024)
-
-                        if total_mb > 0:
-                            # 50% cho download
-                            percent = int((downloaded_mb / total_mb) * 100)
-                            self.progress_signal.emit(percent)
-                            self.message_signal.emit(
-                                f"⬇️ Đang tải: {downloaded_mb:.1f}/{total_mb:.1f} MB ({percent}%)")
-                        else:
-                            self.message_signal.emit(
-                                f"⬇️ Đã tải: {downloaded_mb:.1f} MB")
-
-            self.message_signal.emit("✅ Tải xuống hoàn tất!")
-            return True
+        if not self._verify(offset, digest.hexdigest(), total):
+            _remove(part_file, meta_file)
+            return False
+        os.replace(part_file, output_file)
+        _remove(meta_file)
+        self.message_signal.emit("✅ Tải xuống hoàn tất!")
+        return True
+
+    def _download_segmented(self, url, output_file, part_file):
+        """Tải bằng nhiều kết nối Range song song vào file cấp phát sẵn.
 
+        Trả về True/False như _download_with_progress, None nếu server không
+        hỗ trợ Range (hoặc file quá nhỏ) hay không hỏi được server để tải một
+        luồng như cũ.
+        """
+        def on_progress(downloaded, total):
+            percent = min(int(downloaded * 100 / total), 100) if total else 0
+            if percent != self._last_percent:
+                self._last_percent = percent
+                self.progress_signal.emit(percent)
+                self.message_signal.emit(
+                    f"⬇️ Đang tải ({download.segments} luồng): "
+                    f"{downloaded / (1024 * 1024):.1f}/{total / (1024 * 1024):.1f} MB ({percent}%)")
+
+        self._last_percent = -1
+        download = SegmentedDownload(url, part_file, segments=self.segments,
+                                     on_progress=on_progress,
+                                     should_stop=lambda: self.stop_flag)
+        try:
+            if not download.run():
+                self.message_signal.emit("⏹ Đã dừng tải")
+                return False
+        except RangeNotSupported:
+            return None
+        except ProbeFailed as e:
+            # Lỗi mạng ngay từ đầu: để chế độ một luồng (có thử lại riêng) xử lý
+            self.message_signal.emit(f"⚠️ Không tải nhiều luồng được ({e}), tải một luồng")
+            return None
+        except DownloadChanged:
+            # Gói trên server đã đổi: bỏ phần đã tải, tải lại một luồng
+            _remove(part_file, download.meta_path)
+            return None
         except Exception as e:
             self.message_signal.emit(f"❌ Lỗi tải xuống: {str(e)}")
             return False
+        if download.resumed:
+            self.message_signal.emit(
+                f"↪️ Đã tải tiếp từ {download.resumed / (1024 * 1024):.1f} MB")
+        # SHA-256 băm trong lúc tải; chỉ phần về trước con trỏ băm phải đọc lại
+        if download.rehashed:
+            self.message_signal.emit(
+                f"🔍 Đã đọc lại {download.rehashed / (1024 * 1024):.1f} MB để kiểm tra SHA-256")
+        if not self._verify(download.total, download.sha256, download.total):
+            _remove(part_file)
+            return False
+        os.replace(part_file, output_file)
+        self.message_signal.emit("✅ Tải xuống hoàn tất!")
+        return True
+
+    def _resume_state(self, url, part_file, meta_file):
+        """(digest, offset, validator) của file .part còn lại từ lần trước"""
+        digest = hashlib.sha256()
+        meta = _read_json(meta_file)
+        # File dở của chế độ nhiều luồng có lỗ trống, không tải tiếp một luồng được
+        if (not os.path.exists(part_file) or meta.get("url") != url
+                or not meta.get("validator") or "segments" in meta):
+            _remove(part_file, meta_file)
+            return digest, 0, None
+        # Băm lại phần đã có một lần duy nhất; trong cùng lần chạy digest được giữ nguyên
+        with open(part_file, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                digest.update(chunk)
+        return digest, os.path.getsize(part_file), meta["validator"]
+
+    def _stream_to(self, response, part_file, offset, digest, total):
+        """Ghi response vào part_file từ offset; trả về offset mới, None nếu bị dừng"""
+        total_mb = total / (1024 * 1024)
+        # Bắt đầu lại từ đầu thì ghi đè, tải tiếp thì ghi nối
+        with open(part_file, "ab" if offset else "wb") as f:
+            f.truncate(offset)
+            for chunk in response.iter_content(chunk_size=CHUNK_SIZE):
+                if self.stop_flag:
+                    return None
+                if not chunk:
+                    continue
+                f.write(chunk)
+                digest.update(chunk)
+                offset += len(chunk)
+                downloaded_mb = offset / (1024 * 1024)
+                if total_mb > 0:
+                    percent = min(int(offset * 100 / total), 100)
+                    self.progress_signal.emit(percent)
+                    self.message_signal.emit(
+                        f"⬇️ Đang tải: {downloaded_mb:.1f}/{total_mb:.1f} MB ({percent}%)")
+                else:
+                    self.message_signal.emit(f"⬇️ Đã tải: {downloaded_mb:.1f} MB")
+        return offset
+
+    def _verify(self, size, sha256, total):
+        """So file đã tải với kích thước/SHA-256 của bản phát hành"""
+        expected_size = self.expected_size or total
+        if expected_size and size != expected_size:
+            self.message_signal.emit(
+                f"❌ File tải về sai kích thước ({size}/{expected_size} byte)")
+            return False
+        if self.expected_sha256 and sha256 != self.expected_sha256.lower():
+            self.message_signal.emit("❌ File tải về sai SHA-256, đã xoá")
+            return False
+        return True
+
+    def _download_delta(self):
+        """Tải các file khác bản đang cài vào self.zip_path (gói cùng định dạng gói đầy đủ).
+
+        Trả về False nếu không làm được (thiếu manifest, lỗi mạng, sai hash...)
+        để run() chuyển sang tải gói đầy đủ.
+        """
+        try:
+            response = requests.get(self.manifest_url, timeout=30)
+            response.raise_for_status()
+            manifest = response.json()
+            self.message_signal.emit("🔍 Đang so sánh với bản đang cài...")
+            changed, deleted = plan_delta(manifest, self.app_dir)
+            total = delta_size(manifest, changed)
+            total_mb = total / (1024 * 1024)
+            self.message_signal.emit(
+                f"📦 Cập nhật {len(changed)}/{len(manifest['files'])} file "
+                f"({total_mb:.1f} MB), xoá {len(deleted)} file")
+
+            downloaded = 0
+            # File đã nén sẵn (exe, pyd...) nên lưu thẳng, không nén lại
+            with zipfile.ZipFile(self.zip_path, "w", zipfile.ZIP_STORED) as zf:
+                for rel in changed:
+                    entry = manifest["files"][rel]
+                    digest = hashlib.sha256()
+                    with requests.get(file_url(self.manifest_url, manifest, rel),
+                                      stream=True, timeout=30) as r:
+                        r.raise_for_status()
+                        with zf.open(rel, "w", force_zip64=entry["size"] > 2 ** 31) as dst:
+                            for chunk in r.iter_content(chunk_size=1024 * 1024):
+                                if self.stop_flag:
+                                    self.message_signal.emit("⏹ Đã dừng tải")
+                                    return False
+                                dst.write(chunk)
+                                digest.update(chunk)
+                                downloaded += len(chunk)
+                                if total:
+                                    percent = int(downloaded * 100 / total)
+                                    self.progress_signal.emit(percent)
+                                    self.message_signal.emit(
+                                        f"⬇️ Đang tải: {downloaded / (1024 * 1024):.1f}"
+                                        f"/{total_mb:.1f} MB ({percent}%)")
+                    if digest.hexdigest() != entry["sha256"]:
+                        raise ValueError(f"Sai SHA-256: {rel}")
+                if deleted:
+                    zf.writestr(DELETE_LIST, "\n".join(deleted))
+                # Ghi cuối cùng: mtime của manifest >= mọi file vừa giải nén
+                zf.writestr(INSTALLED_MANIFEST, json.dumps(manifest, ensure_ascii=False))
+            return True
+        except Exception as e:
+            self.message_signal.emit(f"⚠️ Không cập nhật từng file được ({e}), tải gói đầy đủ")
+            if os.path.exists(self.zip_path):
+                os.remove(self.zip_path)
+            return False
 
     def _cleanup(self, zip_file, extract_to):
         """Dọn dẹp files tạm"""
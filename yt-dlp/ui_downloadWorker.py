@@ -1,10 +1,14 @@
 from PySide6.QtCore import Qt, Signal, QThread
-import sys
 import os
 import glob
 from datetime import datetime
 import subprocess
 from ui_setting import resource_path
+import ytdlp_protocol
+from download_progress import ProgressAggregator
+from download_archive import DownloadArchive, dedupe_urls
+from process_utils import kill_process_tree, popen_group_kwargs
+from postprocess import AUDIO_MP3, audio_args
 
 
 class DownloadWorker(QThread):
@@ -13,11 +17,13 @@ class DownloadWorker(QThread):
     progress_signal = Signal(int)
     finished = Signal(str)
 
-    def __init__(self, urls, video_mode, audio_only, sub_mode, sub_lang, sub_lang_name, include_thumb, subtitle_only, custom_folder_name=""):
+    def __init__(self, urls, video_mode, audio_only, sub_mode, sub_lang, sub_lang_name, include_thumb, subtitle_only, custom_folder_name="", use_archive=False, audio_format=AUDIO_MP3):
         super().__init__()
-        self.urls = urls
+        # Bỏ URL trùng video ngay trong lượt tải
+        self.urls, self.duplicate_count = dedupe_urls(urls)
         self.video_mode = video_mode
         self.audio_only = audio_only
+        self.audio_format = audio_format
         self.sub_mode = sub_mode
         self.sub_lang = sub_lang
 
@@ -26,6 +32,11 @@ class DownloadWorker(QThread):
         self.custom_folder_name = custom_folder_name.strip()
         self.stop_flag = False
         self.process = None
+        self.archive = None
+        if use_archive and not subtitle_only:
+            self.archive = DownloadArchive.shared()
+        self.aggregator = ProgressAggregator()
+        self._last_percent = -1
         self.ffmpeg_path = resource_path(os.path.join("data", "ffmpeg.exe"))
         self.ytdlp_path = resource_path(os.path.join("data", "yt-dlp.exe"))
         languages = [
@@ -41,7 +52,8 @@ class DownloadWorker(QThread):
         """Dừng quá trình download"""
         self.stop_flag = True
         if self.process:
-            self.process.terminate()
+            # Kill cả cây tiến trình (yt-dlp + ffmpeg đang merge)
+            kill_process_tree(self.process, wait=False)
             self.message.emit("⏹ Dừng tải...")
 
     def run(self):
@@ -49,19 +61,32 @@ class DownloadWorker(QThread):
         try:
             download_folder = self._create_download_folder()
             download_folder = download_folder.replace('\\', '/')
+            if self.duplicate_count:
+                self.message.emit(f"♻️ Bỏ {self.duplicate_count} URL trùng lặp")
+            self.aggregator.reset()
+            for i in range(1, len(self.urls) + 1):
+                self.aggregator.add_job(i)
             for i, url in enumerate(self.urls, 1):
                 if self.stop_flag:
                     self.message.emit("⏹ Đã dừng tải.")
                     break
 
+                if self.archive is not None and self.archive.contains(url):
+                    self.message.emit(f"⏭️ [{i}] Đã tải trước đó (archive): {url}")
+                    self.aggregator.finish_job(i)
+                    self._emit_overall_progress()
+                    continue
+
                 self.message.emit(f"🔗 [{i}] Đang tải: {url}")
 
                 if self._download_single_url(url, download_folder, i):
+                    self.aggregator.finish_job(i)
                     self.message.emit(f"✅ Hoàn thành link URL: {url}")
                 else:
+                    self.aggregator.remove_job(i)
                     self.message.emit(f"❌ Lỗi khi tải link: {url}")
 
-                self.progress_signal.emit(int(i / len(self.urls) * 100))
+                self._emit_overall_progress()
 
             self.finished.emit(f"📂 Video được lưu tại: {download_folder}")
 
@@ -116,26 +141,30 @@ class DownloadWorker(QThread):
         """Download một URL đơn"""
         cmd = self._build_command(url, download_folder, index)
         print(cmd)
-        # Thiết lập creation flags để ẩn console window trên Windows
-        creation_flags = 0
-        if sys.platform == "win32":
-            creation_flags = subprocess.CREATE_NO_WINDOW
-
+        # Ẩn console trên Windows, chạy trong process group riêng để dừng được cả cây
         self.process = subprocess.Popen(
             cmd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
-            text=True, bufsize=1, creationflags=creation_flags
+            text=True, bufsize=1, **popen_group_kwargs()
         )
         for line in self.process.stdout:
             if self.stop_flag:
-                self.process.terminate()
+                kill_process_tree(self.process)
                 self.message.emit("⏹ Đang dừng...")
                 break
 
             line = line.strip()
             # print(line)
-            if line:
+            if not line:
+                continue
+            kind, data = ytdlp_protocol.parse_line(line)
+            if kind == "download":
+                self.aggregator.update(index, data)
+                self._emit_overall_progress()
+            elif kind == "meta":
+                self.aggregator.set_expected(index, data.get("filesize_approx"))
+                self.message.emit(f"🎯 Tiêu đề: {data.get('title', '')}")
+            elif kind is None:
                 self.message.emit(line)
-                self._update_progress_from_line(line)
 
         self.process.wait()
 
@@ -151,7 +180,11 @@ class DownloadWorker(QThread):
         if os.path.exists(self.ytdlp_path):
             cmd = [self.ytdlp_path]
         cmd += ["--encoding", "utf-8"]
-        cmd += [url, "--progress"]
+        cmd += [url]
+        if self.archive is not None:
+            cmd += self.archive.ytdlp_args()
+        cmd += ytdlp_protocol.progress_args()
+        cmd += ytdlp_protocol.print_args()
         # Thêm đường dẫn ffmpeg nếu tồn tại
         if os.path.exists(self.ffmpeg_path):
             cmd += ["--ffmpeg-location", self.ffmpeg_path]
@@ -159,6 +192,8 @@ class DownloadWorker(QThread):
         if self.subtitle_only:
             cmd.append("--skip-download")
             self.message.emit("📝 Chế độ: Chỉ tải phụ đề")
+        elif self.audio_only:
+            cmd += audio_args(self.audio_format)
         else:
             cmd += ["-f", "bv*+ba/b", "--merge-output-format", "mp4"]
 
@@ -177,9 +212,6 @@ class DownloadWorker(QThread):
                 cmd.append("--yes-playlist")
         cmd += ["-o", os.path.join(download_folder, output_template)]
 
-        if self.audio_only and not self.subtitle_only:
-            cmd += ["--extract-audio", "--audio-format", "mp3"]
-
         # Xử lý phụ đề
         if self.sub_mode != "":
             self._add_subtitle_options(cmd)
@@ -217,14 +249,9 @@ class DownloadWorker(QThread):
         # Debug: In ra lệnh phụ đề
         # self.message.emit(f"🔧 Debug: Lệnh phụ đề = --sub-langs {lang_string}")
 
-    def _update_progress_from_line(self, line):
-        """Cập nhật progress từ output line"""
-        if "%" in line:
-            try:
-                percent_str = line.split(
-                    "%", 1)[0].split()[-1].replace(".", "").strip()
-                percent = int(percent_str)
-                if 0 <= percent <= 100:
-                    self.progress_signal.emit(percent)
-            except:
-                pass
+    def _emit_overall_progress(self):
+        """Phát % tổng (tính theo byte) khi có thay đổi"""
+        percent = int(self.aggregator.snapshot()["percent"])
+        if percent != self._last_percent:
+            self._last_percent = percent
+            self.progress_signal.emit(percent)
@@ -1,10 +1,11 @@
 # File: Ui_setting.py
-from PySide6.QtWidgets import QMessageBox
 import sys
 import os
 from pathlib import Path
 # Version of the application
 UPDATE_CHECK_URL = "https://raw.githubusercontent.com/huynhtrancntt/auto_update/main/update.json"
+# Tự kiểm tra cập nhật tối đa một lần mỗi khoảng này (giây); kiểm tra thủ công luôn hỏi server
+UPDATE_CHECK_INTERVAL = 6 * 3600
 APP_VERSION = "1.6.0"  # Placeholder for actual version, replace with your app's version
 ABOUT_TEMPLATE = """
 <h3>🎬 HT DownloadVID v{version}</h3>
@@ -37,6 +38,8 @@ def resource_path(rel: str) -> str:
 
 
 def show_about_ui(self):
+    # Import tại chỗ: các module không giao diện (cli.py) cũng dùng resource_path
+    from PySide6.QtWidgets import QMessageBox
     about_text = ABOUT_TEMPLATE.format(version=self.version)
     QMessageBox.about(self, "Về ứng dụng", about_text)
 
@@ -194,7 +197,7 @@ def _init_addStyle(self):
         QRadioButton::indicator:checked {{
             background-color: #05ff8f;
         }}
-        QListWidget {{
+        QListWidget, QListView {{
             background-color: #1e293b;
             color: #e2e8f0;
             border: 1px solid #334155;
@@ -205,16 +208,16 @@ def _init_addStyle(self):
             selection-background-color: #4299e1;
             outline: none;
         }}
-        QListWidget::item {{
+        QListWidget::item, QListView::item {{
             padding: 6px 8px;
             border-bottom: 1px solid #4a5568;
             min-height: 20px;
             word-wrap: break-word;
         }}
-        QListWidget::item:hover {{
+        QListWidget::item:hover, QListView::item:hover {{
             background-color: #4a5568;
         }}
-        QListWidget::item:selected {{
+        QListWidget::item:selected, QListView::item:selected {{
             background-color: #4299e1;
             color: #ffffff;
         }}    
@@ -124,13 +124,28 @@ class UI_UpdateDialog(QDialog):
         self.update_progress_bar.setVisible(True)
         # print(self.update_info['download_url'])
         # Tải về tự động
-        tmpdir = tempfile.mkdtemp(prefix="upd_")  # Tạo thư mục tạm
+        # Thư mục cố định để lần sau tải tiếp được file .part còn dở
+        tmpdir = os.path.join(tempfile.gettempdir(), "ht_update")
+        os.makedirs(tmpdir, exist_ok=True)
         # Ghép đường dẫn file zip
         self.zip_path = os.path.join(
             tmpdir, f"update_v{self.version_update}.zip")
-
+        # Bỏ file dở của các phiên bản khác
+        for name in os.listdir(tmpdir):
+            if not name.startswith(os.path.basename(self.zip_path)):
+                try:
+                    os.remove(os.path.join(tmpdir, name))
+                except OSError:
+                    pass
+
+        # Bản đóng gói mới so được từng file với thư mục đang cài
+        manifest_url = self.update_info.get('manifest_url')
+        delta_dir = app_dir if getattr(sys, "frozen", False) else None
         self.download_worker = DownloadUpdateWorker(
-            self.update_info['download_url'], self.update_info['version'], self.zip_path)
+            self.update_info['download_url'], self.update_info['version'], self.zip_path,
+            manifest_url=manifest_url, app_dir=delta_dir,
+            expected_size=self.update_info.get('size'),
+            expected_sha256=self.update_info.get('sha256'))
         self.download_worker.progress_signal.connect(
             self.update_download_progress)
         # self.download_worker.message_signal.connect(self.add_download_log)
@@ -157,6 +172,10 @@ class UI_UpdateDialog(QDialog):
         #     f.write(f"Download File Name: {download_file_name}\n")
         #     f.write(f"zip_path: {zip_path}\n")
 
+        if not success:
+            # Gói tải về chưa qua kiểm tra kích thước/SHA-256: không chạy Update.exe
+            QMessageBox.warning(self, "Lỗi", f"❌ {message}")
+            return
         if success:
             # self.add_log("✅ Cập nhật thanh cong!")
             QMessageBox.information(self, "Cập nhật",
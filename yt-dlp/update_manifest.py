@@ -0,0 +1,124 @@
+"""Manifest bản phát hành: danh sách từng file kèm kích thước + SHA-256.
+
+Máy khách so manifest với thư mục đã cài, chỉ tải các file khác rồi gói
+thành zip cập nhật (kèm danh sách file cần xoá) để Update.exe giải nén như
+gói đầy đủ. Không dùng Qt: dùng chung cho app, script build và server.
+
+    python update_manifest.py dist --version 1.7.0
+"""
+import hashlib
+import json
+import os
+import sys
+import time
+from urllib.parse import quote, urljoin
+
+# Manifest của bản đang cài, nằm trong thư mục app (gói zip mang theo)
+INSTALLED_MANIFEST = "update_manifest.json"
+# Danh sách file Update.exe phải xoá sau khi giải nén (mỗi dòng một đường dẫn)
+DELETE_LIST = "update_delete.txt"
+HASH_CHUNK = 1024 * 1024
+
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def build_manifest(root, version):
+    """{"version", "created", "files": {"thư/mục/file": {"size", "sha256"}}}"""
+    root = os.path.abspath(root)
+    files = {}
+    for folder, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(folder, name)
+            rel = os.path.relpath(path, root).replace(os.sep, "/")
+            if rel in (INSTALLED_MANIFEST, DELETE_LIST):
+                continue
+            files[rel] = {"size": os.path.getsize(path), "sha256": file_sha256(path)}
+    return {"version": version, "created": int(time.time()), "files": files}
+
+
+def write_manifest(root, version, output=None):
+    manifest = build_manifest(root, version)
+    output = output or os.path.join(root, INSTALLED_MANIFEST)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1, sort_keys=True)
+    return manifest
+
+
+def load_manifest(path):
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def file_url(manifest_url, manifest, rel):
+    """URL tải một file: base_url trong manifest, mặc định là thư mục chứa manifest"""
+    return urljoin(manifest.get("base_url") or manifest_url, quote(rel))
+
+
+def _safe_path(app_dir, rel):
+    """Đường dẫn tuyệt đối của rel, None nếu rel trỏ ra ngoài app_dir"""
+    path = os.path.abspath(os.path.join(app_dir, rel))
+    if os.path.commonpath([path, os.path.abspath(app_dir)]) != os.path.abspath(app_dir):
+        return None
+    return path
+
+
+def plan_delta(manifest, app_dir):
+    """So manifest mới với thư mục đã cài.
+
+    Trả về (file cần tải, file cần xoá). File khác kích thước là đổi ngay;
+    cùng kích thước thì tin manifest đã cài nếu file chưa bị sửa sau lần cập
+    nhật trước, còn lại mới băm. File cần xoá chỉ lấy từ manifest đã cài nên
+    không bao giờ đụng tới dữ liệu người dùng (Video, settings...).
+    """
+    installed_path = os.path.join(app_dir, INSTALLED_MANIFEST)
+    installed = load_manifest(installed_path) or {}
+    installed_files = installed.get("files") or {}
+    installed_mtime = os.path.getmtime(installed_path) if installed_files else 0
+    changed = []
+    for rel, entry in manifest["files"].items():
+        path = _safe_path(app_dir, rel)
+        if path is None:
+            raise ValueError(f"Đường dẫn không hợp lệ trong manifest: {rel}")
+        try:
+            stat = os.stat(path)
+        except OSError:
+            changed.append(rel)
+            continue
+        if stat.st_size != entry["size"]:
+            changed.append(rel)
+            continue
+        old = installed_files.get(rel)
+        if old and old == entry and stat.st_mtime <= installed_mtime:
+            continue
+        if file_sha256(path) != entry["sha256"]:
+            changed.append(rel)
+    deleted = [rel for rel in installed_files
+               if rel not in manifest["files"] and _safe_path(app_dir, rel)]
+    return changed, deleted
+
+
+def delta_size(manifest, changed):
+    return sum(manifest["files"][rel]["size"] for rel in changed)
+
+
+if __name__ == "__main__":
+    import argparse
+
+    p = argparse.ArgumentParser(description="Tạo manifest cho thư mục bản phát hành")
+    p.add_argument("root", help="thư mục bản phát hành (vd: dist)")
+    p.add_argument("--version", required=True)
+    p.add_argument("-o", "--output", help=f"mặc định: <root>/{INSTALLED_MANIFEST}")
+    args = p.parse_args()
+    result = write_manifest(args.root, args.version, args.output)
+    total = sum(entry["size"] for entry in result["files"].values())
+    print(f"✅ {len(result['files'])} file, {total / (1024 * 1024):.1f} MB")
+    sys.exit(0)
@@ -27,6 +27,25 @@ def extract_overwrite(zip_path: str, target_dir: str):
             with z.open(m, 'r') as src, open(extract_path, 'wb') as dst:
                 shutil.copyfileobj(src, dst)
 
+# Gói delta (xem update_manifest.py) kèm danh sách file bị bỏ ở bản mới
+DELETE_LIST = "update_delete.txt"
+
+
+def apply_delete_list(target_dir: str):
+    list_path = os.path.join(target_dir, DELETE_LIST)
+    if not os.path.isfile(list_path):
+        return
+    root = os.path.abspath(target_dir)
+    with open(list_path, "r", encoding="utf-8") as f:
+        for rel in f.read().splitlines():
+            path = os.path.abspath(os.path.join(root, rel.strip()))
+            # Chỉ xoá file nằm trong thư mục app
+            if rel.strip() and os.path.commonpath([path, root]) == root and os.path.isfile(path):
+                os.remove(path)
+                print(f"🗑️ Đã xóa file cũ: {rel.strip()}")
+    os.remove(list_path)
+
+
 def main():
    
     # python update_tool.py --app "C:\MyApp\main.exe" --zip "update.zip" --dir "C:\MyApp" --restart
@@ -70,6 +89,7 @@ def main():
                 zip_ref.extractall(args.dir)
         # Xóa file zip
         print("✅ Đã giải nén gói cập nhật.")
+        apply_delete_list(args.dir)
     
     except RuntimeError:
         print("❌ Mật khẩu không đúng hoặc file zip bị lỗi.")
@@ -0,0 +1,117 @@
+"""Engine tải: yt-dlp.exe (tiến trình riêng), thư viện yt_dlp ngay trong app,
+hoặc pool tiến trình yt-dlp khởi động sẵn.
+
+Engine trong tiến trình dùng progress_hooks / postprocessor_hooks nên nhận
+tiến trình dạng dict, không phải đọc chữ và không tốn thời gian khởi động
+yt-dlp cho mỗi URL. Engine pool giữ các tiến trình worker đã nạp sẵn yt_dlp
+và giao job qua pipe (xem ytdlp_pool), dừng job vẫn kill được cả cây tiến trình.
+"""
+from downloadWorker import DownloadVideo
+import ytdlp_protocol
+from ytdlp_pool import YtdlpProcessPool
+from ytdlp_runner import installed, load_yt_dlp, run_ytdlp
+
+ENGINE_SUBPROCESS = "subprocess"
+ENGINE_INPROCESS = "inprocess"
+ENGINE_POOL = "pool"
+
+ENGINES = [
+    ("yt-dlp.exe (tiến trình riêng)", ENGINE_SUBPROCESS),
+    ("⚡ Thư viện yt_dlp (trong ứng dụng)", ENGINE_INPROCESS),
+    ("⚡ Pool yt-dlp khởi động sẵn", ENGINE_POOL),
+]
+
+
+def inprocess_available():
+    return load_yt_dlp() is not None
+
+
+def inprocess_installed():
+    """Kiểm tra nhanh (không import) để dựng giao diện"""
+    return installed()
+
+
+def downloader_class(engine):
+    """Lớp DownloadVideo ứng với engine đã chọn (thiếu yt_dlp thì dùng yt-dlp.exe)"""
+    if engine == ENGINE_POOL and inprocess_installed():
+        return PooledDownloadVideo
+    if engine == ENGINE_INPROCESS and inprocess_available():
+        return InProcessDownloadVideo
+    return DownloadVideo
+
+
+class InProcessDownloadVideo(DownloadVideo):
+    """DownloadVideo chạy yt_dlp.YoutubeDL trong thread slot.
+
+    Dùng chung _build_command với engine tiến trình riêng (yt_dlp.parse_options
+    đổi tham số dòng lệnh thành ydl_opts) nên mọi tuỳ chọn giữ nguyên; chỉ
+    metadata, tiến trình và tên file cuối nhận qua hook thay vì --print.
+    Dừng: hook/logger ném DownloadCancelled ở lần gọi kế tiếp; ffmpeg/aria2c
+    con vẫn là tiến trình riêng.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.machine_output = False
+
+    def _execute(self, message_thread, download_cmd):
+        return run_ytdlp(
+            download_cmd[1:],
+            on_line=lambda line: self._handle_log_line(message_thread, line),
+            on_meta=lambda info: self._handle_meta(message_thread, info),
+            on_progress=lambda data: self._handle_progress(message_thread, data),
+            on_postprocess=lambda data: self._handle_postprocess(message_thread, data),
+            on_file=self.final_files.append,
+            should_stop=lambda: self.stop_flag)
+
+
+class PooledDownloadVideo(DownloadVideo):
+    """DownloadVideo giao job cho một worker trong YtdlpProcessPool.
+
+    Worker in đúng giao thức của ytdlp_protocol nên phần đọc output dùng lại
+    _handle_output_line. Dừng job = kill worker đó (stop() của DownloadVideo),
+    pool tự thay bằng worker mới.
+    """
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.machine_output = False
+
+    def _execute(self, message_thread, download_cmd):
+        pool = YtdlpProcessPool.shared()
+        with self._process_lock:
+            if self.stop_flag:
+                return None
+            worker = pool.acquire()
+            self.process = worker.popen
+        returncode = None
+        try:
+            if not worker.wait_ready(lambda line: self._handle_log_line(message_thread, line)):
+                if self.stop_flag:
+                    return None
+                raise OSError("Không khởi động được worker yt-dlp")
+            worker.send(download_cmd[1:])
+            for line in worker.popen.stdout:
+                if self.stop_flag:
+                    return None
+                line = line.strip()
+                if not line:
+                    continue
+                kind, data = ytdlp_protocol.parse_line(line)
+                if kind == "done":
+                    worker.finish_job(data)
+                    if data.get("rss") is None and pool.rss_unavailable():
+                        self._log(
+                            f"{message_thread} ⚠️ Không đo được bộ nhớ worker yt-dlp,"
+                            f" chỉ thay worker sau {pool.max_jobs} job", "")
+                    returncode = data.get("returncode")
+                    return returncode
+                self._handle_output_line(message_thread, line, kind, data)
+            if self.stop_flag:
+                return None
+            raise OSError(f"Worker yt-dlp thoát giữa chừng (mã {worker.popen.poll()})")
+        finally:
+            with self._process_lock:
+                # Worker còn dùng được thì trả về pool, run() không được kill nó
+                self.process = None
+            pool.release(worker, reusable=returncode is not None and not self.stop_flag)
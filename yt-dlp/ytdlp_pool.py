@@ -0,0 +1,187 @@
+"""Pool tiến trình yt-dlp khởi động sẵn, nhận job qua pipe.
+
+yt-dlp.exe bản onefile phải giải nén và nạp toàn bộ extractor ở mỗi lần chạy
+(~1.5 giây/URL trước khi có byte mạng nào). Worker ở đây nạp yt_dlp một lần
+rồi chạy lần lượt nhiều job:
+
+    stdin  <- {"argv": [...]}                       (một dòng JSON mỗi job)
+    stdout -> dòng log + dòng máy của ytdlp_protocol (__HT_META__, __HT_DL__...)
+              __HT_DONE__{"returncode", "rss", "jobs"} khi job xong
+
+Worker được thay mới sau MAX_JOBS job hoặc khi bộ nhớ vượt MAX_RSS. Module
+này không dùng Qt để worker khởi động nhanh.
+"""
+import json
+import os
+import subprocess
+import sys
+import threading
+
+from process_utils import kill_process_tree, popen_group_kwargs, rss_bytes
+from ytdlp_protocol import (
+    DONE_PREFIX, DOWNLOAD_PREFIX, FILE_PREFIX, META_PREFIX, POSTPROCESS_PREFIX, READY_PREFIX)
+
+WORKER_FLAG = "--ytdlp-worker"
+MAX_JOBS = 50
+MAX_RSS = 600 * 1024 * 1024
+
+
+def worker_command():
+    """Lệnh chạy worker: bản đóng gói gọi lại chính app với WORKER_FLAG"""
+    if getattr(sys, "frozen", False):
+        return [sys.executable, WORKER_FLAG]
+    return [sys.executable, os.path.abspath(__file__)]
+
+
+class PooledProcess:
+    """Một tiến trình worker (phía app)"""
+
+    def __init__(self):
+        env = dict(os.environ, PYTHONIOENCODING="utf-8", PYTHONUNBUFFERED="1")
+        self.popen = subprocess.Popen(
+            worker_command(),
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.STDOUT,
+            text=True,
+            bufsize=1,
+            encoding="utf-8",
+            errors="replace",
+            env=env,
+            **popen_group_kwargs())
+        self.ready = False
+        self.jobs = 0
+        self.rss = 0
+
+    def alive(self):
+        return self.popen.poll() is None
+
+    def wait_ready(self, on_line):
+        """Chờ worker nạp xong yt_dlp (chỉ chờ ở lần dùng đầu tiên)"""
+        if self.ready:
+            return True
+        for line in self.popen.stdout:
+            line = line.strip()
+            if line.startswith(READY_PREFIX):
+                self.ready = True
+                return True
+            if line:
+                on_line(line)
+        return False
+
+    def send(self, argv):
+        self.popen.stdin.write(json.dumps({"argv": argv}) + "\n")
+        self.popen.stdin.flush()
+
+    def finish_job(self, data):
+        self.jobs = data.get("jobs") or self.jobs + 1
+        self.rss = data.get("rss") or 0
+
+    def close(self):
+        try:
+            self.popen.stdin.close()
+        except OSError:
+            pass
+        kill_process_tree(self.popen, wait=False)
+
+
+class YtdlpProcessPool:
+    """Các worker rảnh, đã nạp sẵn yt_dlp. Thread-safe"""
+
+    _shared = None
+    _shared_lock = threading.Lock()
+
+    def __init__(self, max_jobs=MAX_JOBS, max_rss=MAX_RSS):
+        self.max_jobs = max_jobs
+        self.max_rss = max_rss
+        self._idle = []
+        self._lock = threading.Lock()
+        self._rss_warned = False
+
+    @classmethod
+    def shared(cls):
+        with cls._shared_lock:
+            if cls._shared is None:
+                cls._shared = cls()
+            return cls._shared
+
+    def warm(self, count):
+        """Khởi động trước cho đủ `count` worker rảnh (không chờ chúng sẵn sàng)"""
+        with self._lock:
+            self._idle = [p for p in self._idle if p.alive()]
+            while len(self._idle) < count:
+                self._idle.append(PooledProcess())
+
+    def acquire(self):
+        with self._lock:
+            while self._idle:
+                process = self._idle.pop(0)
+                if process.alive():
+                    return process
+        return PooledProcess()
+
+    def rss_unavailable(self):
+        """True ở lần đầu worker không đo được bộ nhớ (để ghi log một lần)"""
+        with self._lock:
+            warned, self._rss_warned = self._rss_warned, True
+            return not warned
+
+    def release(self, process, reusable=True):
+        """Trả worker về pool, hoặc đóng nếu đã chạy đủ job/quá bộ nhớ/đã chết"""
+        if (reusable and process.alive() and process.jobs < self.max_jobs
+                and (not process.rss or process.rss < self.max_rss)):
+            with self._lock:
+                self._idle.append(process)
+            return
+        process.close()
+
+    def shutdown(self):
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for process in idle:
+            process.close()
+
+
+def worker_main():
+    """Vòng lặp của tiến trình worker: đọc job từ stdin, in kết quả ra stdout"""
+    from ytdlp_runner import load_yt_dlp, run_ytdlp
+
+    lock = threading.Lock()
+
+    def emit(line):
+        with lock:
+            sys.stdout.write(line + "\n")
+            sys.stdout.flush()
+
+    yt_dlp = load_yt_dlp()
+    if yt_dlp is None:
+        emit("ERROR: Chưa cài thư viện yt_dlp")
+        return 2
+    # Nạp sẵn mọi extractor để job đầu tiên không phải chờ
+    list(yt_dlp.extractor.gen_extractor_classes())
+    emit(READY_PREFIX)
+
+    jobs = 0
+    for request in sys.stdin:
+        if not request.strip():
+            continue
+        try:
+            returncode = run_ytdlp(
+                json.loads(request)["argv"],
+                on_line=emit,
+                on_meta=lambda info: emit(META_PREFIX + json.dumps(info)),
+                on_progress=lambda data: emit(DOWNLOAD_PREFIX + json.dumps(data)),
+                on_postprocess=lambda data: emit(POSTPROCESS_PREFIX + json.dumps(data)),
+                on_file=lambda path: emit(FILE_PREFIX + str(path)))
+        except (Exception, SystemExit) as e:
+            # SystemExit: tham số sai (parse_options gọi parser.error)
+            emit(f"ERROR: {e!r}")
+            returncode = 1
+        jobs += 1
+        emit(DONE_PREFIX + json.dumps(
+            {"returncode": returncode, "rss": rss_bytes(), "jobs": jobs}))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(worker_main())
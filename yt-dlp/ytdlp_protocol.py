@@ -0,0 +1,104 @@
+"""Giao thức đọc output máy của yt-dlp (--print / --progress-template).
+
+Mỗi dòng có tiền tố riêng để tách khỏi log thường mà không cần regex.
+"""
+import json
+
+META_PREFIX = "__HT_META__"
+FILE_PREFIX = "__HT_FILE__"
+DOWNLOAD_PREFIX = "__HT_DL__"
+POSTPROCESS_PREFIX = "__HT_PP__"
+ENTRY_PREFIX = "__HT_ENTRY__"
+START_PREFIX = "__HT_START__"
+SUBS_PREFIX = "__HT_SUBS__"
+# Worker của ytdlp_pool: sẵn sàng nhận job / job xong (mã thoát, bộ nhớ)
+READY_PREFIX = "__HT_READY__"
+DONE_PREFIX = "__HT_DONE__"
+
+META_FIELDS = "id,title,duration,filesize_approx,extractor_key,format_id"
+DOWNLOAD_FIELDS = ("status,downloaded_bytes,total_bytes,total_bytes_estimate,"
+                   "speed,eta,fragment_index,fragment_count")
+POSTPROCESS_FIELDS = "status,postprocessor"
+ENTRY_FIELDS = "id,ie_key,url,webpage_url,title,duration,playlist_index,playlist_title"
+START_FIELDS = "id,original_url,title"
+
+_PREFIXES = (
+    (META_PREFIX, "meta"),
+    (DOWNLOAD_PREFIX, "download"),
+    (POSTPROCESS_PREFIX, "postprocess"),
+    (ENTRY_PREFIX, "entry"),
+    (START_PREFIX, "start"),
+    (DONE_PREFIX, "done"),
+)
+
+
+def print_args():
+    """Tham số yt-dlp để in metadata trước khi tải và tên file cuối cùng"""
+    return [
+        "--no-simulate",
+        "--newline",
+        "--print", f"before_dl:{META_PREFIX}%(.{{{META_FIELDS}}})j",
+        "--print", f"after_move:{FILE_PREFIX}%(filepath)s",
+    ]
+
+
+def progress_args():
+    """Tham số yt-dlp để in tiến trình dạng JSON thay cho thanh tiến trình chữ"""
+    return [
+        "--progress",
+        "--progress-template",
+        f"download:{DOWNLOAD_PREFIX}%(progress.{{{DOWNLOAD_FIELDS}}})j",
+        "--progress-template",
+        f"postprocess:{POSTPROCESS_PREFIX}%(progress.{{{POSTPROCESS_FIELDS}}})j",
+    ]
+
+
+def flat_playlist_args():
+    """Tham số yt-dlp để liệt kê các mục của playlist/kênh mà không tải"""
+    return [
+        "--flat-playlist",
+        "--yes-playlist",
+        "--ignore-errors",
+        "--print", f"{ENTRY_PREFIX}%(.{{{ENTRY_FIELDS}}})j",
+    ]
+
+
+def harvest_print_args():
+    """Tham số yt-dlp để biết URL nào trong --batch-file đang xử lý và phụ đề của nó.
+
+    pre_process: sau khi phân tích xong một video (lỗi phân tích thì không in).
+    after_video: sau khi ghi phụ đề, kèm danh sách file (chạy cả với --skip-download).
+    """
+    return [
+        "--no-simulate",
+        "--newline",
+        "--print", f"pre_process:{START_PREFIX}%(.{{{START_FIELDS}}})j",
+        "--print", f"after_video:{SUBS_PREFIX}%(original_url)s\t%(requested_subtitles.:.filepath)j",
+    ]
+
+
+def parse_line(line):
+    """Tách dòng output thành (loại, dữ liệu).
+
+    Trả về ("meta" | "download" | "postprocess" | "entry" | "start" | "done", dict),
+    ("file", str), ("subs", (url, [file phụ đề])) hoặc (None, line) với dòng
+    thường. Chỉ so sánh tiền tố, không dùng regex.
+    """
+    if not line.startswith("__HT_"):
+        return None, line
+    if line.startswith(FILE_PREFIX):
+        return "file", line[len(FILE_PREFIX):]
+    if line.startswith(SUBS_PREFIX):
+        url, _, files = line[len(SUBS_PREFIX):].partition("\t")
+        try:
+            files = json.loads(files)
+        except ValueError:
+            files = None    # "NA": video không có phụ đề được chọn
+        return "subs", (url, [f for f in files or [] if f])
+    for prefix, kind in _PREFIXES:
+        if line.startswith(prefix):
+            try:
+                return kind, json.loads(line[len(prefix):])
+            except ValueError:
+                return None, line
+    return None, line
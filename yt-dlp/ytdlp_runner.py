@@ -0,0 +1,133 @@
+"""Chạy yt_dlp.YoutubeDL với hook thay cho --print / --progress-template.
+
+Không phụ thuộc Qt: dùng cho engine trong ứng dụng (ytdlp_engine) và tiến
+trình worker khởi động sẵn (ytdlp_pool).
+"""
+import importlib.util
+import threading
+
+from ytdlp_protocol import DOWNLOAD_FIELDS, META_FIELDS, POSTPROCESS_FIELDS
+
+_yt_dlp = None
+_import_lock = threading.Lock()
+_local = threading.local()
+
+
+def load_yt_dlp():
+    """Import yt_dlp một lần (mất ~1 giây), None nếu chưa cài"""
+    global _yt_dlp
+    with _import_lock:
+        if _yt_dlp is None:
+            try:
+                import yt_dlp
+                import yt_dlp.postprocessor
+                _yt_dlp = yt_dlp
+            except ImportError:
+                _yt_dlp = False
+        return _yt_dlp or None
+
+
+def installed():
+    """Kiểm tra nhanh (không import) để dựng giao diện"""
+    return importlib.util.find_spec("yt_dlp") is not None
+
+
+def _pick(data, fields):
+    return {field: data.get(field) for field in fields.split(",")}
+
+
+class _HookLogger:
+    """Nhận log của YoutubeDL thay cho stdout; dừng job ngay ở dòng log kế tiếp"""
+
+    def __init__(self, on_line, check_stop):
+        self.on_line = on_line
+        self.check_stop = check_stop
+
+    def debug(self, message):
+        self.check_stop()
+        if not message.startswith("[debug] "):
+            self.on_line(message)
+
+    def info(self, message):
+        self.debug(message)
+
+    def warning(self, message):
+        self.check_stop()
+        self.on_line(message)
+
+    def error(self, message):
+        self.on_line(message)
+
+
+def _info_hook(yt_dlp, callback):
+    """PostProcessor gọi callback(info) ở mốc đã đăng ký (thay cho --print)"""
+    class InfoHookPP(yt_dlp.postprocessor.PostProcessor):
+        def run(self, info):
+            callback(info)
+            return [], info
+    return InfoHookPP()
+
+
+def _reuse_extractors(ydl):
+    """Dùng lại extractor (cache player JS, token...) của job trước trong cùng thread"""
+    extractors = getattr(_local, "extractors", None)
+    if extractors is None:
+        extractors = _local.extractors = {}
+    for ie in extractors.values():
+        ie.set_downloader(ydl)
+    # Extractor mới tạo trong job này cũng được ghi vào cùng dict
+    ydl._ies_instances = extractors
+
+
+def run_ytdlp(argv, on_line, on_meta, on_progress, on_postprocess, on_file,
+              should_stop=lambda: False):
+    """Chạy yt-dlp với tham số dòng lệnh argv (không gồm tên chương trình).
+
+    Callback nhận dữ liệu giống output máy của ytdlp_protocol: on_meta(dict
+    META_FIELDS), on_progress(dict DOWNLOAD_FIELDS), on_postprocess(dict),
+    on_file(đường dẫn), on_line(dòng log). Trả về mã thoát, None nếu bị dừng.
+    """
+    yt_dlp = load_yt_dlp()
+    cancelled = yt_dlp.utils.DownloadCancelled
+
+    def check_stop():
+        if should_stop():
+            raise cancelled("Đã dừng")
+
+    def progress_hook(data):
+        check_stop()
+        on_progress(_pick(data, DOWNLOAD_FIELDS))
+
+    def postprocess_hook(data):
+        check_stop()
+        if data.get("postprocessor") != "InfoHook":
+            on_postprocess(_pick(data, POSTPROCESS_FIELDS))
+
+    parsed = yt_dlp.parse_options(argv)
+    params = dict(parsed.ydl_opts)
+    params.update({
+        "logger": _HookLogger(on_line, check_stop),
+        "noprogress": True,
+        "color": {"stdout": "no_color", "stderr": "no_color"},
+        "progress_hooks": [progress_hook],
+        "postprocessor_hooks": [postprocess_hook],
+    })
+    if should_stop():
+        return None
+    try:
+        with yt_dlp.YoutubeDL(params) as ydl:
+            _reuse_extractors(ydl)
+            ydl.add_post_processor(
+                _info_hook(yt_dlp, lambda info: on_meta(_pick(info, META_FIELDS))),
+                when="before_dl")
+            ydl.add_post_processor(
+                _info_hook(yt_dlp, lambda info: on_file(info.get("filepath"))),
+                when="after_move")
+            if parsed.options.load_info_filename:
+                return ydl.download_with_info_file(parsed.options.load_info_filename)
+            return ydl.download(parsed.urls)
+    except cancelled:
+        return None
+    except yt_dlp.utils.DownloadError:
+        # Dòng ERROR: đã qua logger.error
+        return 1